@@ -8,28 +8,50 @@ from flask import Flask, render_template, request, jsonify
 from flask_socketio import SocketIO, emit
 import sqlite3
 import pandas as pd
-import plotly.graph_objects as go
 import plotly.express as px
-from plotly.utils import PlotlyJSONEncoder
 import json
 import os
-from datetime import datetime, timedelta
+import importlib.util
+import copy
+import threading
+import weakref
+import time
+from datetime import datetime, date, timedelta
+from concurrent.futures import ThreadPoolExecutor
 import random
-import numpy as np
 import logging
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple, Iterator
 import requests
-from PIL import Image
 import io
 import base64
 
-# LLM imports - Ollama required
+from db_pool import ConnectionPool
+from db_catalog import TableCatalog
+from frame_cache import FrameCache, compact_frame
+from columnar_mirror import ColumnarMirror, source_version
+from chunked_reader import iter_table_chunks, reduce_daily_means, DEFAULT_CHUNK_SIZE
+from user_router import UserRouter
+from data_context import DataContext
+from downsample import MIN_POINTS
+from plot_cache import PlotCache, plot_key
+from plot_batch import SharedLoads, render_batch, MAX_BATCH_PLOTS
+from plot_images import (RendererPool, ImageCache, PlotImages, IMAGE_FORMATS, DEFAULT_IMAGE_SIZE,
+                         parse_image_options)
+from plot_stream import PlotStreams, PlotSubscription
+from chat_stream import ChatStreams
+from llm_executor import LLMExecutor, ExecutorBusy
+from ollama_service import OllamaService, CircuitOpen
+from response_cache import ResponseCache, response_key
+from plot_specs import (PLOT_SPECS, spec_tables, spec_columns, custom_spec, build_figure, figure_json,
+                        parse_plot_format, dumps)
+
+# LLM imports - Ollama required; the client is only imported when first built (see ollama_service)
 try:
-    from langchain_ollama import ChatOllama
     from langchain.schema import HumanMessage, SystemMessage
-    OLLAMA_AVAILABLE = True
+    OLLAMA_AVAILABLE = importlib.util.find_spec("langchain_ollama") is not None
 except ImportError:
     OLLAMA_AVAILABLE = False
+if not OLLAMA_AVAILABLE:
     print("❌ Ollama libraries not available. Please install: pip install langchain-ollama")
 
 # Initialize Flask app
@@ -40,25 +62,138 @@ socketio = SocketIO(app, cors_allowed_origins="*")
 # Database path
 DB_PATH = "data/db/processed_apple_health_data.db"
 
+# Per-user databases (<user_id>.db), selected with X-User-Id or a user_id field
+USER_DB_DIR = "data/db/users"
+
+# Give each user database its own .npy columnar mirror too (a full copy on disk
+# per user, rebuilt in the background when stale); off by default so cost stays
+# flat as users grow, and only the default database is mirrored
+USER_DB_MIRRORS = os.environ.get("FITTRACK_USER_MIRRORS", "0") == "1"
+
+# Serialized plots evicted from memory are kept here
+PLOT_SPILL_DIR = "data/cache/plots"
+
+# Threads rendering the plots of /api/plots batches
+PLOT_WORKERS = min(8, os.cpu_count() or 1)
+
+# Rendered plot images, stored by content address
+IMAGE_CACHE_DIR = "data/cache/images"
+
+# Long-lived Kaleido processes rendering plot images
+IMAGE_RENDERERS = 2
+
+# Chat requests run at once: match Ollama's OLLAMA_NUM_PARALLEL
+LLM_WORKERS = int(os.environ.get("OLLAMA_NUM_PARALLEL", "1"))
+
+# Chat requests waiting for a worker before new ones are refused as busy
+LLM_QUEUE_DEPTH = 16
+
+# Seconds a chat request may take, queueing included
+LLM_TIMEOUT = 120.0
+
+# LLM answers reused for repeated questions about unchanged data
+LLM_CACHE_PATH = "data/cache/llm_responses.db"
+
+# Estimated tokens of data context in a chat prompt; tables beyond it are summarized or counted
+CONTEXT_TOKEN_BUDGET = 1000
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def parse_date(value) -> Optional[date]:
+    """Parse a YYYY-MM-DD string (or date/datetime) into a date."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+def parse_date_window(params: Dict[str, Any]) -> Tuple[Optional[date], Optional[date]]:
+    """Read an optional date window (start/end, or the last N days) from request parameters."""
+    start = parse_date(params.get('start'))
+    end = parse_date(params.get('end'))
+    days = params.get('days')
+    if days is not None and start is None:
+        days = int(days)
+        if days <= 0:
+            raise ValueError("days must be positive")
+        start = (end or date.today()) - timedelta(days=days - 1)
+    if start and end and start > end:
+        raise ValueError("start must not be after end")
+    return start, end
+
+# Time buckets for aggregated queries; each maps a date to the first day of its bucket
+BUCKET_EXPRESSIONS = {
+    "day": """date("date")""",
+    "week": """date("date", 'weekday 0', '-6 days')""",
+    "month": """strftime('%Y-%m-01', "date")""",
+    "year": """strftime('%Y-01-01', "date")""",
+}
+RESOLUTIONS = ["auto"] + list(BUCKET_EXPRESSIONS)
+AGGREGATES = {"sum": "SUM", "mean": "AVG", "min": "MIN", "max": "MAX", "count": "COUNT"}
+
+def choose_resolution(start: Optional[date], end: Optional[date]) -> str:
+    """Pick a time bucket so that a date range plots as at most a few hundred points."""
+    if start is None or end is None:
+        return "day"
+    span = (end - start).days
+    if span <= 120:
+        return "day"
+    elif span <= 2 * 365:
+        return "week"
+    elif span <= 12 * 365:
+        return "month"
+    return "year"
+
+def parse_plot_options(params: Dict[str, Any]) -> Tuple[str, str]:
+    """Read the plot resolution and per-bucket aggregate from request parameters."""
+    resolution = params.get('resolution') or "auto"
+    agg = params.get('agg') or "mean"
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"resolution must be one of {', '.join(RESOLUTIONS)}")
+    if agg not in AGGREGATES:
+        raise ValueError(f"agg must be one of {', '.join(AGGREGATES)}")
+    return resolution, agg
+
+def parse_max_points(params: Dict[str, Any]) -> Optional[int]:
+    """Read the optional per-trace point budget of a plot request."""
+    max_points = params.get('max_points')
+    if max_points in (None, ""):
+        return None
+    max_points = int(max_points)
+    if max_points < MIN_POINTS:
+        raise ValueError(f"max_points must be at least {MIN_POINTS}")
+    return max_points
+
 class DataManager:
     """Manages database operations and data retrieval."""
     
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, pool_size: int = 8, cache_bytes: int = 256 * 1024 * 1024,
+                 mirror: ColumnarMirror = None, frame_cache: FrameCache = None,
+                 cache_partition: str = None):
+        """Set up pooled access to one database.
+        
+        Managers for different users can share one ``frame_cache``; each keeps
+        its entries under its own ``cache_partition`` (the database path by default).
+        """
         self.db_path = db_path
+        self.pool = ConnectionPool(db_path, max_size=pool_size)
+        self.catalog = TableCatalog(self.pool)
+        self.frame_cache = frame_cache or FrameCache(max_bytes=cache_bytes)
+        self.cache_partition = cache_partition or db_path
+        self.mirror = mirror
+    
+    def data_version(self) -> Optional[tuple]:
+        """Get a token that changes whenever the database contents change."""
+        return self.catalog.version()
     
     def get_tables(self) -> List[str]:
         """Get list of all tables in the database."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-            tables = [row[0] for row in cursor.fetchall()]
-            conn.close()
-            return tables
+            return self.catalog.table_names()
         except Exception as e:
             logger.error(f"Error getting tables: {e}")
             return []
@@ -66,10 +201,9 @@ class DataManager:
     def get_table_data(self, table_name: str, limit: int = 100) -> pd.DataFrame:
         """Get data from a specific table."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            query = f"SELECT * FROM {table_name} LIMIT {limit}"
-            df = pd.read_sql_query(query, conn)
-            conn.close()
+            with self.pool.connection() as conn:
+                query = f"SELECT * FROM {table_name} LIMIT {limit}"
+                df = pd.read_sql_query(query, conn)
             return df
         except Exception as e:
             logger.error(f"Error getting data from {table_name}: {e}")
@@ -77,472 +211,476 @@ class DataManager:
     
     def get_all_table_data(self, table_name: str) -> pd.DataFrame:
         """Get all data from a specific table."""
+        return self.query(table_name)
+    
+    def query(self, table_name: str, columns: List[str] = None, start=None, end=None,
+              order_by: str = None, descending: bool = False) -> pd.DataFrame:
+        """Get rows from a table, filtering and projecting inside SQLite.
+        
+        ``start``/``end`` are inclusive dates applied to the ``date`` column.
+        Results are cached per database version and returned copy-on-write,
+        so callers may modify them freely.
+        """
         try:
-            conn = sqlite3.connect(self.db_path)
-            query = f"SELECT * FROM {table_name}"
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-            return df
+            sql, params = self.build_query(table_name, columns, start, end, order_by, descending)
+            return self._read_cached(
+                table_name, sql, params,
+                lambda: self._read_mirror(table_name, columns, start, end, order_by, descending))
+        except Exception as e:
+            logger.error(f"Error querying {table_name}: {e}")
+            return pd.DataFrame()
+    
+    def query_buckets(self, table_name: str, columns: List[str], resolution: str = "day",
+                      agg: str = "mean", start=None, end=None) -> pd.DataFrame:
+        """Get per-bucket aggregates of columns, computed inside SQLite.
+        
+        Returns one row per day/week/month/year with ``date`` set to the first
+        day of the bucket (weeks start on Monday), ordered by date.
+        """
+        try:
+            sql, params = self.build_bucket_query(table_name, columns, resolution, agg, start, end)
+            return self._read_cached(table_name, sql, params)
         except Exception as e:
-            logger.error(f"Error getting all data from {table_name}: {e}")
+            logger.error(f"Error querying {resolution} buckets of {table_name}: {e}")
             return pd.DataFrame()
     
+    def _read_cached(self, table_name: str, sql: str, params: List[Any],
+                     fast_path=None) -> pd.DataFrame:
+        """Run a query through the frame cache, trying ``fast_path`` before SQLite.
+        
+        Results are converted to the compact typed schema (datetime64 dates,
+        narrowed numbers, categorical text) once, before they are cached.
+        """
+        version = self.data_version()
+        key = (self.cache_partition, table_name, version, sql, tuple(params))
+        df = self.frame_cache.get(key)
+        if df is not None:
+            return df
+        
+        df = fast_path() if fast_path else None
+        if df is None:
+            with self.pool.connection() as conn:
+                df = pd.read_sql_query(sql, conn, params=params)
+        df = compact_frame(df)
+        
+        if version is None:
+            return df
+        partition = self.cache_partition
+        self.frame_cache.invalidate(lambda k: k[0] == partition and k[1] == table_name and k[2] != version)
+        return self.frame_cache.put(key, df)
+    
+    def _read_mirror(self, table_name: str, columns: List[str], start, end,
+                     order_by: str, descending: bool) -> Optional[pd.DataFrame]:
+        """Answer a query from the columnar mirror, or return None to fall back to SQLite.
+        
+        Applies the same window and ordering as the SQL built by build_query.
+        """
+        if self.mirror is None:
+            return None
+        start, end = parse_date(start), parse_date(end)
+        needed = None
+        if columns:
+            needed = list(columns)
+            if (start or end) and 'date' not in needed:
+                needed.append('date')
+            if order_by and order_by not in needed:
+                needed.append(order_by)
+        
+        df = self.mirror.load(table_name, needed)
+        if df is None:
+            if not self.mirror.is_fresh():
+                self.mirror.rebuild_in_background()
+            return None
+        
+        if start or end:
+            mask = df['date'].notna()
+            if start:
+                mask &= df['date'] >= start.isoformat()
+            if end:
+                mask &= df['date'] < (end + timedelta(days=1)).isoformat()
+            df = df[mask]
+        if order_by:
+            df = df.sort_values(order_by, ascending=not descending, kind='stable',
+                                na_position='last' if descending else 'first')
+        if columns:
+            df = df[list(columns)]
+        return df.reset_index(drop=True)
+    
+    def _validate(self, table_name: str, columns: List[str] = None) -> Dict[str, Any]:
+        """Check a table and its columns against the catalog, returning the table metadata."""
+        info = self.catalog.get(table_name)
+        if info is None:
+            raise ValueError(f"Unknown table: {table_name}")
+        for col in columns or []:
+            if col not in info["columns"]:
+                raise ValueError(f"Unknown column {col} in {table_name}")
+        return info
+    
+    def _window_conditions(self, info: Dict[str, Any], start, end) -> Tuple[List[str], List[Any]]:
+        """Build WHERE conditions for an inclusive date window."""
+        conditions, params = [], []
+        start, end = parse_date(start), parse_date(end)
+        if (start or end) and 'date' not in info["columns"]:
+            raise ValueError(f"Table {info['name']} has no date column")
+        if start:
+            conditions.append('"date" >= ?')
+            params.append(start.isoformat())
+        if end:
+            conditions.append('"date" < ?')
+            params.append((end + timedelta(days=1)).isoformat())
+        return conditions, params
+    
+    def build_query(self, table_name: str, columns: List[str] = None, start=None, end=None,
+                    order_by: str = None, descending: bool = False) -> Tuple[str, List[Any]]:
+        """Build a parameterized SELECT, validating identifiers against the catalog."""
+        info = self._validate(table_name, list(columns or []) + ([order_by] if order_by else []))
+        
+        select = ", ".join(f'"{col}"' for col in columns) if columns else "*"
+        sql = f'SELECT {select} FROM "{table_name}"'
+        
+        conditions, params = self._window_conditions(info, start, end)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        if order_by:
+            sql += f' ORDER BY "{order_by}"' + (" DESC" if descending else "")
+        return sql, params
+    
+    def build_bucket_query(self, table_name: str, columns: List[str], resolution: str = "day",
+                           agg: str = "mean", start=None, end=None) -> Tuple[str, List[Any]]:
+        """Build a parameterized GROUP BY query aggregating columns per time bucket."""
+        if resolution not in BUCKET_EXPRESSIONS:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        if agg not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate: {agg}")
+        info = self._validate(table_name, ['date'] + list(columns))
+        
+        func = AGGREGATES[agg]
+        bucket = BUCKET_EXPRESSIONS[resolution]
+        select = ", ".join(f'{func}("{col}") AS "{col}"' for col in columns)
+        sql = f'SELECT {bucket} AS "date", {select} FROM "{table_name}"'
+        
+        conditions, params = self._window_conditions(info, start, end)
+        conditions.append('"date" IS NOT NULL')
+        sql += " WHERE " + " AND ".join(conditions)
+        sql += ' GROUP BY 1 ORDER BY 1'
+        return sql, params
+    
+    def numeric_columns(self, table_name: str) -> List[str]:
+        """Get the columns declared with a numeric type (INTEGER/REAL/NUMERIC affinity)."""
+        info = self.catalog.get(table_name) or {}
+        numeric = []
+        for col, declared in info.get("column_types", {}).items():
+            declared = (declared or "").upper()
+            if col != 'date' and any(t in declared for t in ("INT", "REAL", "FLOA", "DOUB", "NUM", "DEC")):
+                numeric.append(col)
+        return numeric
+    
+    def iter_table_chunks(self, table_name: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                          columns: List[str] = None, start=None, end=None,
+                          as_records: bool = False) -> Iterator[pd.DataFrame]:
+        """Stream a table in bounded chunks (DataFrames or NumPy record arrays).
+        
+        Uses keyset pagination on (date, rowid), so peak memory depends on
+        ``chunk_size`` rather than on the size of the table. Chunks bypass
+        the frame cache.
+        """
+        info = self._validate(table_name, columns)
+        where, params = self._window_conditions(info, start, end)
+        return iter_table_chunks(self.pool, table_name, info["columns"], chunk_size,
+                                 select=columns, where=where, params=params,
+                                 as_records=as_records)
+    
+    def ensure_date_indexes(self) -> List[str]:
+        """Create indexes on the date column of the Daily* tables if missing."""
+        created = []
+        if not os.path.exists(self.db_path):
+            return created
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                existing = {row[0] for row in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type='index'")}
+                for table, info in self.catalog.tables().items():
+                    index_name = f"idx_{table}_date"
+                    if (table.startswith("Daily") and 'date' in info["columns"]
+                            and index_name not in existing):
+                        conn.execute(f'CREATE INDEX IF NOT EXISTS "{index_name}" ON "{table}"(date)')
+                        created.append(index_name)
+                conn.commit()
+            finally:
+                conn.close()
+            if created:
+                logger.info(f"Created date indexes: {', '.join(created)}")
+        except sqlite3.Error as e:
+            logger.warning(f"Could not create date indexes: {e}")
+        return created
+    
+    def close(self):
+        """Close pooled connections and drop this manager's cache partition."""
+        partition = self.cache_partition
+        self.frame_cache.invalidate(lambda k: k[0] == partition)
+        self.pool.close()
+    
+    def source_version(self) -> Optional[str]:
+        """Get the cross-process version of the database, after the pool's one-time WAL switch."""
+        self.pool._ensure_wal()
+        return source_version(self.db_path)
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Get connection pool and frame cache statistics."""
+        return {
+            "pool": self.pool.stats(),
+            "frames": self.frame_cache.stats()
+        }
+    
     def get_database_summary(self) -> Dict[str, Any]:
         """Get a summary of the database contents."""
         try:
-            tables = self.get_tables()
-            summary = {
-                "total_tables": len(tables),
-                "tables": []
-            }
-            
-            for table in tables:
-                df = self.get_table_data(table, limit=1)
-                summary["tables"].append({
-                    "name": table,
-                    "record_count": len(self.get_all_table_data(table)),
-                    "columns": list(df.columns) if not df.empty else []
-                })
-            
-            return summary
+            return self.catalog.summary()
         except Exception as e:
             logger.error(f"Error getting database summary: {e}")
             return {"total_tables": 0, "tables": []}
 
 class PlotGenerator:
-    """Generates interactive plots using Plotly."""
+    """Generates interactive plots using Plotly.
+    
+    Generators given the same ``loads`` (the plots of one batch) load each
+    table slice once between them.
+    """
     
-    def __init__(self, data_manager: DataManager):
+    def __init__(self, data_manager: DataManager, loads: SharedLoads = None):
         self.data_manager = data_manager
+        self.loads = loads
     
-    def generate_plot(self, plot_type: str, table_name: str = None, **kwargs) -> Dict[str, Any]:
-        """Generate a plot based on the specified type."""
+    def generate_plot(self, plot_type: str, table_name: str = None, start=None, end=None,
+                      resolution: str = "auto", agg: str = "mean", plot_format: str = "json",
+                      max_points: int = None, **kwargs) -> Dict[str, Any]:
+        """Generate a plot based on the specified type.
+        
+        ``start``/``end`` optionally restrict the plot to an inclusive date window.
+        ``resolution`` plots one point per day/week/month/year, aggregated
+        with ``agg`` in SQLite; "auto" picks it from the span of the range.
+        With ``plot_format`` "binary", "plot" is the figure itself with
+        typed arrays rather than a JSON string. ``max_points`` downsamples
+        each line trace to that many points with LTTB.
+        """
         try:
             if plot_type == "daily_steps":
-                return self._daily_steps_plot()
+                return self._daily_steps_plot(start, end, resolution, agg, plot_format, max_points)
             elif plot_type == "sleep_analysis":
-                return self._sleep_analysis_plot()
+                return self._sleep_analysis_plot(start, end, resolution, agg, plot_format, max_points)
             elif plot_type == "calories_burned":
-                return self._calories_plot()
+                return self._calories_plot(start, end, resolution, agg, plot_format, max_points)
             elif plot_type == "distance_walked":
-                return self._distance_plot()
+                return self._distance_plot(start, end, resolution, agg, plot_format, max_points)
             elif plot_type == "flights_climbed":
-                return self._flights_plot()
+                return self._flights_plot(start, end, resolution, agg, plot_format, max_points)
             elif plot_type == "walking_metrics":
-                return self._walking_metrics_plot()
+                return self._walking_metrics_plot(start, end, resolution, agg, plot_format, max_points)
             elif plot_type == "custom" and table_name:
-                return self._custom_plot(table_name, **kwargs)
+                return self._custom_plot(table_name, start, end, resolution, agg, plot_format, max_points,
+                                         **kwargs)
             else:
                 return {"error": f"Unknown plot type: {plot_type}"}
         except Exception as e:
             logger.error(f"Error generating plot {plot_type}: {e}")
             return {"error": f"Error generating plot: {str(e)}"}
     
-    def _daily_steps_plot(self) -> Dict[str, Any]:
-        """Generate daily steps plot with moving average."""
-        df = self.data_manager.get_all_table_data("DailyStepCount")
-        if df.empty:
-            return {"error": "No step data available"}
-        
-        df['date'] = pd.to_datetime(df['date'])
-        df = df.sort_values('date')
-        
-        # Calculate 7-day moving average
-        df['moving_avg'] = df['total_value'].rolling(window=7, min_periods=1).mean()
-        
-        fig = go.Figure()
-        
-        # Add step count line
-        fig.add_trace(go.Scatter(
-            x=df['date'],
-            y=df['total_value'],
-            mode='lines+markers',
-            name='Daily Steps',
-            line=dict(color='#6366f1', width=2),
-            marker=dict(size=6, color='#6366f1')
-        ))
-        
-        # Add moving average line
-        fig.add_trace(go.Scatter(
-            x=df['date'],
-            y=df['moving_avg'],
-            mode='lines',
-            name='7-Day Moving Average',
-            line=dict(color='#ef4444', width=3, dash='dash')
-        ))
-        
-        fig.update_layout(
-            title="Daily Step Count with Moving Average",
-            xaxis_title="Date",
-            yaxis_title="Steps",
-            hovermode='x unified',
-            template='plotly_white',
-            height=500
-        )
+    def _resolve_resolution(self, resolution: str, tables: List[str], start=None, end=None) -> str:
+        """Turn "auto" into a concrete resolution from the span of the requested range.
         
-        return {
-            "plot": json.dumps(fig, cls=PlotlyJSONEncoder),
-            "type": "daily_steps",
-            "title": "Daily Step Count"
-        }
+        Open ends of the range are taken from the tables' date ranges in the catalog.
+        """
+        if resolution != "auto":
+            return resolution
+        start, end = parse_date(start), parse_date(end)
+        if start is None or end is None:
+            bounds = [self.data_manager.catalog.get(table) for table in tables]
+            bounds = [(info["min_date"], info["max_date"]) for info in bounds if info and info["min_date"]]
+            if not bounds:
+                return "day"
+            start = start or min(parse_date(low) for low, _ in bounds)
+            end = end or max(parse_date(high) for _, high in bounds)
+        return choose_resolution(start, end)
     
-    def _sleep_analysis_plot(self) -> Dict[str, Any]:
-        """Generate sleep analysis plot."""
-        df = self.data_manager.get_all_table_data("DailySleepSummary")
-        if df.empty:
-            return {"error": "No sleep data available"}
-        
-        df['date'] = pd.to_datetime(df['date'])
-        df['sleep_hours'] = df['sleep_minutes'] / 60
-        
-        # Categorize sleep quality
-        def categorize_sleep(hours):
-            if hours >= 8: return 'Excellent'
-            elif hours >= 7: return 'Good'
-            elif hours >= 6: return 'Fair'
-            else: return 'Poor'
-        
-        df['quality'] = df['sleep_hours'].apply(categorize_sleep)
-        colors = {'Excellent': '#10b981', 'Good': '#3b82f6', 'Fair': '#f59e0b', 'Poor': '#ef4444'}
-        
-        fig = go.Figure()
-        
-        for quality in ['Excellent', 'Good', 'Fair', 'Poor']:
-            quality_data = df[df['quality'] == quality]
-            if not quality_data.empty:
-                fig.add_trace(go.Bar(
-                    x=quality_data['date'],
-                    y=quality_data['sleep_hours'],
-                    name=quality,
-                    marker_color=colors[quality],
-                    opacity=0.8
-                ))
-        
-        fig.update_layout(
-            title="Sleep Duration Analysis",
-            xaxis_title="Date",
-            yaxis_title="Sleep Hours",
-            barmode='stack',
-            template='plotly_white',
-            height=500
-        )
+    def _load_series(self, table_name: str, columns: List[str], start, end,
+                     resolution: str, agg: str) -> pd.DataFrame:
+        """Load the date and value columns of a table, aggregated per bucket above day resolution."""
+        def load():
+            if resolution == "day":
+                return self.data_manager.query(table_name, ['date'] + columns, start, end, order_by='date')
+            return self.data_manager.query_buckets(table_name, columns, resolution, agg, start, end)
         
-        return {
-            "plot": json.dumps(fig, cls=PlotlyJSONEncoder),
-            "type": "sleep_analysis",
-            "title": "Sleep Analysis"
-        }
+        if self.loads is None:
+            return load()
+        key = (table_name, tuple(columns), str(start), str(end), resolution, agg)
+        return self.loads.get(key, load)
     
-    def _calories_plot(self) -> Dict[str, Any]:
-        """Generate calories plot with active and basal calories."""
-        active_df = self.data_manager.get_all_table_data("DailyActiveCalories")
-        basal_df = self.data_manager.get_all_table_data("DailyBasalCalories")
-        
-        if active_df.empty and basal_df.empty:
-            return {"error": "No calorie data available"}
-        
-        fig = go.Figure()
-        
-        if not active_df.empty:
-            active_df['date'] = pd.to_datetime(active_df['date'])
-            fig.add_trace(go.Scatter(
-                x=active_df['date'],
-                y=active_df['total_value'],
-                mode='lines+markers',
-                name='Active Calories',
-                line=dict(color='#f97316', width=2),
-                marker=dict(size=6)
-            ))
-        
-        if not basal_df.empty:
-            basal_df['date'] = pd.to_datetime(basal_df['date'])
-            fig.add_trace(go.Scatter(
-                x=basal_df['date'],
-                y=basal_df['total_value'],
-                mode='lines+markers',
-                name='Basal Calories',
-                line=dict(color='#8b5cf6', width=2),
-                marker=dict(size=6)
-            ))
-        
-        fig.update_layout(
-            title="Daily Calorie Burn",
-            xaxis_title="Date",
-            yaxis_title="Calories",
-            template='plotly_white',
-            height=500
-        )
+    def _figure(self, spec: Dict[str, Any], frames: Dict[str, pd.DataFrame], resolution: str,
+                plot_format: str, max_points: int = None):
+        """Build a spec's figure as a JSON string, or as a dict of typed arrays in binary format."""
+        figure = build_figure(spec, frames, resolution, binary=plot_format == "binary", max_points=max_points)
+        return figure if plot_format == "binary" else figure_json(figure)
+    
+    def _spec_plot(self, plot_type: str, start=None, end=None, resolution: str = "auto",
+                   agg: str = "mean", plot_format: str = "json", max_points: int = None) -> Dict[str, Any]:
+        """Generate one of the fixed plot types from its spec in PLOT_SPECS."""
+        spec = PLOT_SPECS[plot_type]
+        tables = spec_tables(spec)
+        resolution = self._resolve_resolution(resolution, tables, start, end)
+        frames = {table: self._load_series(table, spec_columns(spec, table), start, end, resolution, agg)
+                  for table in tables}
+        if "empty" in spec and all(df.empty for df in frames.values()):
+            return {"error": spec["empty"]}
         
         return {
-            "plot": json.dumps(fig, cls=PlotlyJSONEncoder),
-            "type": "calories_burned",
-            "title": "Daily Calorie Burn"
+            "plot": self._figure(spec, frames, resolution, plot_format, max_points),
+            "type": plot_type,
+            "resolution": resolution,
+            "title": spec["title"]
         }
     
-    def _distance_plot(self) -> Dict[str, Any]:
+    def _daily_steps_plot(self, start=None, end=None, resolution: str = "auto", agg: str = "mean",
+                          plot_format: str = "json", max_points: int = None) -> Dict[str, Any]:
+        """Generate daily steps plot with moving average."""
+        return self._spec_plot("daily_steps", start, end, resolution, agg, plot_format, max_points)
+    
+    def _sleep_analysis_plot(self, start=None, end=None, resolution: str = "auto", agg: str = "mean",
+                             plot_format: str = "json", max_points: int = None) -> Dict[str, Any]:
+        """Generate sleep analysis plot."""
+        return self._spec_plot("sleep_analysis", start, end, resolution, agg, plot_format, max_points)
+    
+    def _calories_plot(self, start=None, end=None, resolution: str = "auto", agg: str = "mean",
+                       plot_format: str = "json", max_points: int = None) -> Dict[str, Any]:
+        """Generate calories plot with active and basal calories."""
+        return self._spec_plot("calories_burned", start, end, resolution, agg, plot_format, max_points)
+    
+    def _distance_plot(self, start=None, end=None, resolution: str = "auto", agg: str = "mean",
+                       plot_format: str = "json", max_points: int = None) -> Dict[str, Any]:
         """Generate distance walked/run plot."""
-        df = self.data_manager.get_all_table_data("DailyDistanceWalkRun")
-        if df.empty:
-            return {"error": "No distance data available"}
-        
-        df['date'] = pd.to_datetime(df['date'])
-        df = df.sort_values('date')
-        
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=df['date'],
-            y=df['total_value'],
-            mode='lines+markers',
-            name='Distance',
-            line=dict(color='#06b6d4', width=2),
-            marker=dict(size=6)
-        ))
-        
-        fig.update_layout(
-            title="Daily Distance Walked/Run",
-            xaxis_title="Date",
-            yaxis_title="Distance (km)",
-            template='plotly_white',
-            height=500
-        )
-        
-        return {
-            "plot": json.dumps(fig, cls=PlotlyJSONEncoder),
-            "type": "distance_walked",
-            "title": "Daily Distance"
-        }
+        return self._spec_plot("distance_walked", start, end, resolution, agg, plot_format, max_points)
     
-    def _flights_plot(self) -> Dict[str, Any]:
+    def _flights_plot(self, start=None, end=None, resolution: str = "auto", agg: str = "mean",
+                      plot_format: str = "json", max_points: int = None) -> Dict[str, Any]:
         """Generate flights climbed plot."""
-        df = self.data_manager.get_all_table_data("DailyFlightsClimbed")
-        if df.empty:
-            return {"error": "No flights data available"}
-        
-        df['date'] = pd.to_datetime(df['date'])
-        
-        fig = go.Figure()
-        fig.add_trace(go.Bar(
-            x=df['date'],
-            y=df['total_value'],
-            name='Flights Climbed',
-            marker_color='#84cc16',
-            opacity=0.8
-        ))
-        
-        fig.update_layout(
-            title="Daily Flights Climbed",
-            xaxis_title="Date",
-            yaxis_title="Flights",
-            template='plotly_white',
-            height=500
-        )
-        
-        return {
-            "plot": json.dumps(fig, cls=PlotlyJSONEncoder),
-            "type": "flights_climbed",
-            "title": "Daily Flights Climbed"
-        }
+        return self._spec_plot("flights_climbed", start, end, resolution, agg, plot_format, max_points)
     
-    def _walking_metrics_plot(self) -> Dict[str, Any]:
+    def _walking_metrics_plot(self, start=None, end=None, resolution: str = "auto", agg: str = "mean",
+                              plot_format: str = "json", max_points: int = None) -> Dict[str, Any]:
         """Generate walking metrics plot."""
-        speed_df = self.data_manager.get_all_table_data("DailyWalkingSpeed")
-        steadiness_df = self.data_manager.get_all_table_data("DailyWalkingSteadiness")
-        
-        fig = go.Figure()
-        
-        if not speed_df.empty:
-            speed_df['date'] = pd.to_datetime(speed_df['date'])
-            fig.add_trace(go.Scatter(
-                x=speed_df['date'],
-                y=speed_df['avg_value'],
-                mode='lines+markers',
-                name='Walking Speed',
-                line=dict(color='#ec4899', width=2),
-                yaxis='y'
-            ))
-        
-        if not steadiness_df.empty:
-            steadiness_df['date'] = pd.to_datetime(steadiness_df['date'])
-            fig.add_trace(go.Scatter(
-                x=steadiness_df['date'],
-                y=steadiness_df['avg_value'],
-                mode='lines+markers',
-                name='Walking Steadiness',
-                line=dict(color='#f59e0b', width=2),
-                yaxis='y2'
-            ))
-        
-        fig.update_layout(
-            title="Walking Metrics",
-            xaxis_title="Date",
-            yaxis=dict(title="Speed (m/s)", side="left"),
-            yaxis2=dict(title="Steadiness (%)", side="right", overlaying="y"),
-            template='plotly_white',
-            height=500
-        )
-        
-        return {
-            "plot": json.dumps(fig, cls=PlotlyJSONEncoder),
-            "type": "walking_metrics",
-            "title": "Walking Metrics"
-        }
+        return self._spec_plot("walking_metrics", start, end, resolution, agg, plot_format, max_points)
     
-    def _custom_plot(self, table_name: str, **kwargs) -> Dict[str, Any]:
-        """Generate a custom plot for any table."""
-        df = self.data_manager.get_all_table_data(table_name)
+    def _custom_plot(self, table_name: str, start=None, end=None, resolution: str = "auto",
+                     agg: str = "mean", plot_format: str = "json", max_points: int = None,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE, **kwargs) -> Dict[str, Any]:
+        """Generate a custom plot for any table.
+        
+        Above day resolution, columns declared numeric are aggregated per
+        bucket in SQLite. Otherwise the table is streamed in chunks and
+        reduced to daily means, so raw per-sample tables plot in bounded memory.
+        """
+        resolution = self._resolve_resolution(resolution, [table_name], start, end)
+        numeric = self.data_manager.numeric_columns(table_name) if resolution != "day" else []
+        if numeric:
+            df = self._load_series(table_name, numeric, start, end, resolution, agg)
+        else:
+            resolution = "day"
+            chunks = self.data_manager.iter_table_chunks(table_name, chunk_size, start=start, end=end)
+            df = reduce_daily_means(chunks)
         if df.empty:
             return {"error": f"No data available for table: {table_name}"}
         
-        df['date'] = pd.to_datetime(df['date'])
-        
         # Find numeric columns for plotting
-        numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
-        if 'date' in numeric_cols:
-            numeric_cols.remove('date')
+        numeric_cols = [col for col in df.columns if col != 'date']
         
         if not numeric_cols:
             return {"error": f"No numeric columns found in {table_name}"}
         
-        fig = go.Figure()
-        
-        for col in numeric_cols:
-            fig.add_trace(go.Scatter(
-                x=df['date'],
-                y=df[col],
-                mode='lines+markers',
-                name=col.replace('_', ' ').title(),
-                marker=dict(size=6)
-            ))
-        
-        fig.update_layout(
-            title=f"{table_name.replace('_', ' ').title()}",
-            xaxis_title="Date",
-            yaxis_title="Value",
-            template='plotly_white',
-            height=500
-        )
-        
+        spec = custom_spec(table_name, numeric_cols)
         return {
-            "plot": json.dumps(fig, cls=PlotlyJSONEncoder),
+            "plot": self._figure(spec, {table_name: df}, resolution, plot_format, max_points),
             "type": "custom",
+            "resolution": resolution,
             "title": table_name.replace('_', ' ').title()
         }
 
 class AdvancedAI:
     """AI system powered by Ollama LLM with deep data understanding."""
     
-    def __init__(self, data_manager: DataManager):
+    def __init__(self, data_manager: DataManager, ollama: OllamaService = None, responses: ResponseCache = None,
+                 context_budget: int = CONTEXT_TOKEN_BUDGET):
         self.data_manager = data_manager
-        self.ollama_client = None
-        self._initialize_ollama()
+        # Built lazily and health-checked in the background, so startup never waits for Ollama
+        self.ollama = ollama or OllamaService()
+        self.responses = responses
+        self.context_budget = context_budget
+        # Data contexts per database, shared with bound copies and dropped with their manager
+        self._contexts: "weakref.WeakKeyDictionary[DataManager, DataContext]" = weakref.WeakKeyDictionary()
+        self._contexts_lock = threading.Lock()
+    
+    def bind(self, data_manager: DataManager) -> "AdvancedAI":
+        """Get this AI system over another user's data, sharing the Ollama client."""
+        bound = copy.copy(self)
+        bound.data_manager = data_manager
+        return bound
     
-    def _initialize_ollama(self):
-        """Initialize Ollama client - required for AI functionality."""
-        if not OLLAMA_AVAILABLE:
-            raise RuntimeError("❌ Ollama libraries not available. Please install: pip install langchain-ollama")
+    def _get_detailed_data_context(self, message: str = None) -> str:
+        """Get comprehensive data context for intelligent responses.
         
+        Cached per database version; only tables that changed are analyzed again.
+        Given the user's ``message``, only the tables it is about are described
+        in full, within the context token budget.
+        """
         try:
-            # Try to connect to Ollama
-            self.ollama_client = ChatOllama(
-                model="llama2",
-                base_url="http://localhost:11434"
-            )
-            
-            # Test the connection
-            test_response = self.ollama_client.invoke([
-                HumanMessage(content="Hello, are you working?")
-            ])
-            
-            logger.info("✅ Ollama initialized successfully")
-            logger.info(f"🤖 Using model: llama2")
-            
-        except Exception as e:
-            logger.error(f"❌ Failed to initialize Ollama: {e}")
-            logger.error("💡 Make sure Ollama is installed and running:")
-            logger.error("   1. Install Ollama: https://ollama.ai/download")
-            logger.error("   2. Start Ollama: ollama serve")
-            logger.error("   3. Download model: ollama pull llama2")
-            raise RuntimeError(f"Ollama initialization failed: {e}")
-    
-    def _get_detailed_data_context(self) -> str:
-        """Get comprehensive data context for intelligent responses."""
-        try:
-            tables = self.data_manager.get_tables()
-            context = f"📊 Database Overview:\n"
-            context += f"Total tables: {len(tables)}\n\n"
-            
-            for table in tables:
-                df = self.data_manager.get_all_table_data(table)
-                if not df.empty:
-                    record_count = len(df)
-                    columns = list(df.columns)
-                    
-                    # Get date range if date column exists
-                    date_range = ""
-                    if 'date' in columns:
-                        df['date'] = pd.to_datetime(df['date'])
-                        min_date = df['date'].min().strftime('%Y-%m-%d')
-                        max_date = df['date'].max().strftime('%Y-%m-%d')
-                        date_range = f" ({min_date} to {max_date})"
-                    
-                    # Get statistical insights for numeric columns
-                    insights = self._analyze_table_data(df, table)
-                    
-                    context += f"📋 {table}:\n"
-                    context += f"  • Records: {record_count}{date_range}\n"
-                    context += f"  • Columns: {', '.join(columns)}\n"
-                    if insights:
-                        context += f"  • Insights: {insights}\n"
-                    context += "\n"
-            
-            return context
+            if message is not None:
+                return self._data_context().plan(message, self.context_budget)
+            return self._data_context().text()
         except Exception as e:
             logger.error(f"Error getting data context: {e}")
             return "Database information unavailable"
     
-    def _analyze_table_data(self, df: pd.DataFrame, table_name: str) -> str:
-        """Analyze table data and return insights."""
+    def _data_context(self) -> DataContext:
+        """Get the data context of the bound database."""
+        with self._contexts_lock:
+            context = self._contexts.get(self.data_manager)
+            if context is None:
+                context = self._contexts[self.data_manager] = DataContext(
+                    self.data_manager.catalog, self.data_manager.pool, AdvancedAI._analyze_table_data)
+            return context
+    
+    @staticmethod
+    def _analyze_table_data(numeric_analysis: Dict[str, Dict[str, float]], table_name: str) -> str:
+        """Turn a table's column statistics (see table_stats) into insights."""
         try:
             insights = []
             
-            # Get numeric columns (excluding date)
-            numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
-            if 'date' in numeric_cols:
-                numeric_cols.remove('date')
-            
-            for col in numeric_cols:
-                col_data = df[col].dropna()
-                if len(col_data) > 0:
-                    avg_val = col_data.mean()
-                    max_val = col_data.max()
-                    min_val = col_data.min()
-                    
-                    # Format based on column type
-                    if 'step' in col.lower():
-                        insights.append(f"Avg {col}: {avg_val:.0f} steps (max: {max_val:.0f})")
-                    elif 'sleep' in col.lower():
-                        hours = avg_val / 60 if avg_val > 60 else avg_val
-                        max_hours = max_val / 60 if max_val > 60 else max_val
-                        insights.append(f"Avg {col}: {hours:.1f} hours (max: {max_hours:.1f}h)")
-                    elif 'calorie' in col.lower():
-                        insights.append(f"Avg {col}: {avg_val:.0f} calories (max: {max_val:.0f})")
-                    elif 'distance' in col.lower():
-                        insights.append(f"Avg {col}: {avg_val:.2f} km (max: {max_val:.2f}km)")
-                    else:
-                        insights.append(f"Avg {col}: {avg_val:.1f} (max: {max_val:.1f})")
+            for col, col_stats in numeric_analysis.items():
+                avg_val = col_stats["mean"]
+                max_val = col_stats["max"]
+                min_val = col_stats["min"]
+                
+                # Format based on column type
+                if 'step' in col.lower():
+                    insights.append(f"Avg {col}: {avg_val:.0f} steps (max: {max_val:.0f})")
+                elif 'sleep' in col.lower():
+                    hours = avg_val / 60 if avg_val > 60 else avg_val
+                    max_hours = max_val / 60 if max_val > 60 else max_val
+                    insights.append(f"Avg {col}: {hours:.1f} hours (max: {max_hours:.1f}h)")
+                elif 'calorie' in col.lower():
+                    insights.append(f"Avg {col}: {avg_val:.0f} calories (max: {max_val:.0f})")
+                elif 'distance' in col.lower():
+                    insights.append(f"Avg {col}: {avg_val:.2f} km (max: {max_val:.2f}km)")
+                else:
+                    insights.append(f"Avg {col}: {avg_val:.1f} (max: {max_val:.1f})")
             
             return "; ".join(insights) if insights else ""
         except Exception as e:
             logger.error(f"Error analyzing table data: {e}")
             return ""
     
-    def _generate_llm_response(self, message: str, context: str = "") -> str:
-        """Generate response using Ollama LLM."""
-        if not self.ollama_client:
-            raise RuntimeError("Ollama client not initialized")
-        
-        try:
-            system_prompt = f"""You are FitTrackAI, an AI health data assistant. You help users understand their Apple Health data through natural conversation.
+    def _build_messages(self, message: str, context: str = "") -> List[Any]:
+        """Build the LLM conversation: the system prompt with the data context, then the message."""
+        system_prompt = f"""You are FitTrackAI, an AI health data assistant. You help users understand their Apple Health data through natural conversation.
 
 {context}
 
@@ -558,26 +696,84 @@ Be friendly, helpful, and use emojis to make responses engaging. Keep responses
 
 Always respond in a conversational, helpful manner. If asked about data that's not available, politely explain what data is available instead."""
 
-            messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=message)
-            ]
-            
-            response = self.ollama_client.invoke(messages)
+        return [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=message)
+        ]
+    
+    def _response_slot(self, message: str, context: str) -> Optional[Tuple[str, Any, str]]:
+        """Get the (scope, data version, key) a response is cached under, or None if it is not cached."""
+        if self.responses is None:
+            return None
+        # The file version, not the catalog's per-connection one, so processes sharing the cache agree
+        version = self.data_manager.source_version()
+        if version is None:
+            return None
+        return self.data_manager.db_path, version, response_key(message, context, self.ollama.model)
+    
+    def _generate_llm_response(self, message: str, context: str = "") -> str:
+        """Generate response using Ollama LLM, reusing the answer to the same question about the same data."""
+        slot = self._response_slot(message, context)
+        if slot:
+            cached = self.responses.get(*slot)
+            if cached is not None:
+                return cached
+        
+        try:
+            messages = self._build_messages(message, context)
+            response = self.ollama.call(lambda client: client.invoke(messages))
+            if slot:
+                self.responses.put(*slot, response.content)
             return response.content
             
+        except CircuitOpen:
+            raise
         except Exception as e:
             logger.error(f"Error generating LLM response: {e}")
             raise RuntimeError(f"Failed to generate response: {e}")
     
-    def chat(self, message: str) -> Dict[str, Any]:
-        """Main chat method - uses Ollama LLM."""
+    def _stream_llm_response(self, message: str, context: str = "") -> Iterator[str]:
+        """Generate response using Ollama LLM, yielding text as the tokens arrive.
+        
+        A cached answer comes back as a single piece; a generated one is cached
+        only if it was read to the end.
+        """
+        slot = self._response_slot(message, context)
+        if slot:
+            cached = self.responses.get(*slot)
+            if cached is not None:
+                yield cached
+                return
+        
+        text = []
+        try:
+            messages = self._build_messages(message, context)
+            for chunk in self.ollama.stream(lambda client: client.stream(messages)):
+                if chunk.content:
+                    text.append(chunk.content)
+                    yield chunk.content
+        except CircuitOpen:
+            raise
+        except Exception as e:
+            logger.error(f"Error streaming LLM response: {e}")
+            raise RuntimeError(f"Failed to generate response: {e}")
+        if slot and text:
+            self.responses.put(*slot, "".join(text))
+    
+    def chat(self, message: str, start=None, end=None, plot_format: str = "json",
+             max_points: int = None) -> Dict[str, Any]:
+        """Main chat method - uses Ollama LLM.
+        
+        ``start``/``end`` optionally restrict generated plots to a date window,
+        ``plot_format`` picks their payload format and ``max_points`` their
+        per-trace point budget.
+        """
         try:
             # Check for plot requests first
-            plot_result = self._handle_plot_request(message)
+            plot_result = self._handle_plot_request(message, start, end, plot_format, max_points)
             if plot_result:
                 # Generate LLM response for the plot
-                context = self._get_detailed_data_context()
+                context = self._get_detailed_data_context(message)
                 llm_response = self._generate_llm_response(
                     f"Generate a response for showing {message} visualization",
                     context
@@ -590,7 +786,7 @@ Always respond in a conversational, helpful manner. If asked about data that's n
                 }
             
             # Generate text response using Ollama
-            context = self._get_detailed_data_context()
+            context = self._get_detailed_data_context(message)
             response = self._generate_llm_response(message, context)
             
             return {
@@ -605,52 +801,255 @@ Always respond in a conversational, helpful manner. If asked about data that's n
                 "provider": "ERROR"
             }
     
-    def _handle_plot_request(self, message: str) -> Optional[Dict[str, Any]]:
-        """Handle plot generation requests."""
-        message_lower = message.lower()
+    def stream_chat(self, message: str, start=None, end=None, plot_format: str = "json",
+                    max_points: int = None) -> Iterator[Dict[str, Any]]:
+        """Chat like ``chat``, yielding ``{"delta": text}`` as the LLM produces tokens.
         
+        The last item is the final response with the full text, the plot (if
+        one was asked for) and the provider. The plot is built after the text,
+        so it does not delay the first token; closing the iterator early stops
+        the generation.
+        """
+        text = []
         try:
-            plot_generator = PlotGenerator(self.data_manager)
-            
-            if any(word in message_lower for word in ["step", "steps"]):
-                return plot_generator.generate_plot("daily_steps")
-            
-            elif any(word in message_lower for word in ["sleep", "sleeping"]):
-                return plot_generator.generate_plot("sleep_analysis")
-            
-            elif any(word in message_lower for word in ["calorie", "calories"]):
-                return plot_generator.generate_plot("calories_burned")
-            
-            elif any(word in message_lower for word in ["distance", "walk", "run"]):
-                return plot_generator.generate_plot("distance_walked")
+            plot_type = self._match_plot_type(message)
+            prompt = f"Generate a response for showing {message} visualization" if plot_type else message
+            for delta in self._stream_llm_response(prompt, self._get_detailed_data_context(message)):
+                text.append(delta)
+                yield {"delta": delta}
             
-            elif any(word in message_lower for word in ["flight", "stairs"]):
-                return plot_generator.generate_plot("flights_climbed")
-            
-            elif any(word in message_lower for word in ["walking", "speed", "steadiness"]):
-                return plot_generator.generate_plot("walking_metrics")
-            
-            return None
+            response = {"response": "".join(text), "provider": "OLLAMA"}
+            if plot_type:
+                response["plot"] = self._generate_plot(plot_type, start, end, plot_format, max_points)
+            yield response
             
+        except Exception as e:
+            logger.error(f"Error in chat: {e}")
+            yield {
+                "response": f"Sorry, I encountered an error: {str(e)}. Please make sure Ollama is running.",
+                "provider": "ERROR"
+            }
+    
+    @staticmethod
+    def _match_plot_type(message: str) -> Optional[str]:
+        """Get the plot type a message asks for, if any."""
+        message_lower = message.lower()
+        
+        if any(word in message_lower for word in ["step", "steps"]):
+            return "daily_steps"
+        
+        elif any(word in message_lower for word in ["sleep", "sleeping"]):
+            return "sleep_analysis"
+        
+        elif any(word in message_lower for word in ["calorie", "calories"]):
+            return "calories_burned"
+        
+        elif any(word in message_lower for word in ["distance", "walk", "run"]):
+            return "distance_walked"
+        
+        elif any(word in message_lower for word in ["flight", "stairs"]):
+            return "flights_climbed"
+        
+        elif any(word in message_lower for word in ["walking", "speed", "steadiness"]):
+            return "walking_metrics"
+        
+        return None
+    
+    def _generate_plot(self, plot_type: str, start=None, end=None, plot_format: str = "json",
+                       max_points: int = None) -> Optional[Dict[str, Any]]:
+        """Generate a plot of the bound database, or None if that fails."""
+        try:
+            plot_generator = PlotGenerator(self.data_manager)
+            return plot_generator.generate_plot(plot_type, start=start, end=end, plot_format=plot_format,
+                                                max_points=max_points)
         except Exception as e:
             logger.error(f"Error generating plot: {e}")
             return None
+    
+    def _handle_plot_request(self, message: str, start=None, end=None, plot_format: str = "json",
+                             max_points: int = None) -> Optional[Dict[str, Any]]:
+        """Handle plot generation requests."""
+        plot_type = self._match_plot_type(message)
+        if plot_type is None:
+            return None
+        return self._generate_plot(plot_type, start, end, plot_format, max_points)
 
 # Initialize components
-data_manager = DataManager(DB_PATH)
+frame_cache = FrameCache()
+data_manager = DataManager(DB_PATH, mirror=ColumnarMirror(DB_PATH), frame_cache=frame_cache)
+data_manager.ensure_date_indexes()
+plot_images = PlotImages(RendererPool(max_size=IMAGE_RENDERERS), ImageCache(IMAGE_CACHE_DIR))
 plot_generator = PlotGenerator(data_manager)
 
-# Initialize AI system (Ollama required)
-try:
-    ai_system = AdvancedAI(data_manager)
-    logger.info("✅ AI system initialized with Ollama")
-except Exception as e:
-    logger.error(f"❌ Failed to initialize AI system: {e}")
-    logger.error("💡 Please ensure Ollama is installed and running:")
-    logger.error("   1. Install Ollama: https://ollama.ai/download")
-    logger.error("   2. Start Ollama: ollama serve")
-    logger.error("   3. Download model: ollama pull llama2")
-    ai_system = None
+def open_user_data(db_path: str) -> DataManager:
+    """Open a user's database with a small pool, sharing the process-wide frame cache.
+    
+    Reads go straight to SQLite unless USER_DB_MIRRORS turns on per-user mirrors.
+    """
+    mirror = ColumnarMirror(db_path) if USER_DB_MIRRORS else None
+    manager = DataManager(db_path, pool_size=2, mirror=mirror, frame_cache=frame_cache)
+    manager.ensure_date_indexes()
+    return manager
+
+user_router = UserRouter(USER_DB_DIR, open_user_data)
+plot_cache = PlotCache(spill_dir=PLOT_SPILL_DIR)
+plot_executor = ThreadPoolExecutor(max_workers=PLOT_WORKERS, thread_name_prefix="plot")
+plot_streams = PlotStreams(lambda event, data, sid: socketio.emit(event, data, to=sid))
+chat_streams = ChatStreams()
+llm_executor = LLMExecutor(max_workers=LLM_WORKERS, max_queue=LLM_QUEUE_DEPTH, timeout=LLM_TIMEOUT)
+
+# Initialize AI system (Ollama required, checked in the background)
+ollama_service = OllamaService()
+response_cache = ResponseCache(LLM_CACHE_PATH)
+ai_system = AdvancedAI(data_manager, ollama_service, response_cache)
+
+def start_background_tasks():
+    """Start the work that runs beside the server: renderer warm-up and Ollama health checks."""
+    threading.Thread(target=plot_images.pool.warm, daemon=True).start()
+    ollama_service.start(lambda run, sleep: threading.Thread(target=run, args=(sleep,), daemon=True).start(),
+                         time.sleep)
+
+def user_data_manager(data: Dict[str, Any] = None) -> DataManager:
+    """Get the data manager for the user a request names, or the default database.
+    
+    Raises ValueError for a malformed user ID and FileNotFoundError for an unknown user.
+    """
+    user_id = request.headers.get('X-User-Id') or (data or {}).get('user_id') or request.args.get('user_id')
+    if not user_id:
+        return data_manager
+    return user_router.get(user_id)
+
+def user_error(e: Exception):
+    """Build the error response for a user that cannot be resolved."""
+    return jsonify({"error": str(e)}), 404 if isinstance(e, FileNotFoundError) else 400
+
+def parse_plot_request(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Read the parameters of one plot from request fields.
+    
+    Raises ValueError with a message fit for a 400 response.
+    """
+    if not data or 'type' not in data:
+        raise ValueError("No plot type provided")
+    try:
+        start, end = parse_date_window(data)
+    except ValueError as e:
+        raise ValueError(f"Invalid date window: {e}")
+    try:
+        resolution, agg = parse_plot_options(data)
+        plot_format = parse_plot_format(data)
+        max_points = parse_max_points(data)
+    except ValueError as e:
+        raise ValueError(f"Invalid plot options: {e}")
+    return {"type": data['type'], "table_name": data.get('table_name'), "start": start, "end": end,
+            "resolution": resolution, "agg": agg, "plot_format": plot_format, "max_points": max_points}
+
+def render_plot(manager: DataManager, params: Dict[str, Any],
+                loads: SharedLoads = None) -> Tuple[Optional[str], bytes]:
+    """Get the (etag, body) of a plot, from the plot cache or freshly generated.
+    
+    Errors and plots of databases without a version are not cached and have no ETag.
+    """
+    # Keyed by the cross-process file version, so spilled plots stay valid across restarts
+    version = manager.source_version()
+    key = plot_key(manager.db_path, version, params["type"], params["table_name"], params["start"], params["end"],
+                   params["resolution"], params["agg"], params["plot_format"], params["max_points"])
+    cached = plot_cache.get(key) if version is not None else None
+    if cached is not None:
+        return cached
+    
+    result = PlotGenerator(manager, loads).generate_plot(
+        params["type"], params["table_name"], start=params["start"], end=params["end"],
+        resolution=params["resolution"], agg=params["agg"], plot_format=params["plot_format"],
+        max_points=params["max_points"])
+    if "error" in result or version is None:
+        return None, dumps(result)
+    return plot_cache.put(key, dumps(result))
+
+def render_plot_image(manager: DataManager, params: Dict[str, Any], image_format: str, width: int,
+                      height: int, thumbnail: bool) -> Dict[str, Any]:
+    """Render a plot as an image, taking its JSON payload from the plot cache.
+    
+    Line traces are downsampled to the rendered width unless ``max_points``
+    is given. Returns the image bytes under "image" and their content
+    address under "key", or an "error".
+    """
+    render_width = DEFAULT_IMAGE_SIZE[0] if thumbnail else width
+    params = {**params, "plot_format": "json", "max_points": params["max_points"] or render_width}
+    result = json.loads(render_plot(manager, params)[1])
+    if "error" in result:
+        return result
+    key, image = plot_images.render(result["plot"], image_format, width, height, thumbnail)
+    return {"image": image, "key": key, "mimetype": IMAGE_FORMATS[image_format],
+            "type": result["type"], "title": result["title"]}
+
+def open_plot_subscription(data: Dict[str, Any]) -> Tuple[str, DataManager, PlotSubscription]:
+    """Read a subscribe_plot request into (plot id, data manager, subscription started at "since").
+    
+    Raises ValueError for invalid fields and FileNotFoundError for an unknown user.
+    """
+    if not data or not data.get('id'):
+        raise ValueError("No plot id provided")
+    plot_type = data.get('type')
+    if plot_type not in PLOT_SPECS:
+        raise ValueError(f"Live updates are not available for plot type: {plot_type}")
+    since = parse_date(data.get('since'))
+    if since is None:
+        raise ValueError("No since date provided")
+    traces = data.get('traces')
+    if not isinstance(traces, list):
+        raise ValueError("traces must list the names of the figure's traces")
+    start, end = parse_date_window(data)
+    resolution, agg = parse_plot_options(data)
+    manager = user_data_manager(data)
+    
+    generator = PlotGenerator(manager)
+    spec = PLOT_SPECS[plot_type]
+    resolution = generator._resolve_resolution(resolution, spec_tables(spec), start, end)
+    
+    def load(table_name, columns, load_start, load_end):
+        return generator._load_series(table_name, columns, load_start, load_end, resolution, agg)
+    
+    subscription = PlotSubscription(spec, resolution, traces, load, start, end)
+    subscription.start_from(since)
+    return str(data['id']), manager, subscription
+
+def iter_plot_batch(manager: DataManager, plots: List[Dict[str, Any]]) -> Iterator[Tuple[int, bytes]]:
+    """Render a batch of parsed plot requests in parallel, yielding (index, body) as each is ready.
+    
+    Waits with socketio.sleep, so other clients are served meanwhile.
+    """
+    loads = SharedLoads()
+    
+    def render(params):
+        if "error" in params:
+            return dumps(params)
+        try:
+            return render_plot(manager, params, loads)[1]
+        except Exception as e:
+            logger.error(f"Error rendering {params['type']} in batch: {e}")
+            return dumps({"error": f"Error generating plot: {str(e)}"})
+    
+    for index, body in render_batch(plots, render, plot_executor, socketio.sleep):
+        yield index, body or dumps({"error": "Internal server error"})
+
+def parse_plot_batch(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Read the plots of a batch request; fields outside "plots" are defaults for every plot.
+    
+    A plot with invalid fields becomes an error result rather than failing the batch.
+    """
+    plots = (data or {}).get('plots')
+    if not isinstance(plots, list) or not plots:
+        raise ValueError("No plots provided")
+    if len(plots) > MAX_BATCH_PLOTS:
+        raise ValueError(f"At most {MAX_BATCH_PLOTS} plots per batch")
+    defaults = {k: v for k, v in data.items() if k != 'plots'}
+    parsed = []
+    for plot in plots:
+        try:
+            parsed.append(parse_plot_request({**defaults, **plot} if isinstance(plot, dict) else None))
+        except ValueError as e:
+            parsed.append({"error": str(e)})
+    return parsed
 
 @app.route('/')
 def index():
@@ -663,39 +1062,155 @@ def chat():
         if not data or 'message' not in data:
             return jsonify({"error": "No message provided"}), 400
         
+        try:
+            start, end = parse_date_window(data)
+        except ValueError as e:
+            return jsonify({"error": f"Invalid date window: {e}"}), 400
+        
+        try:
+            plot_format = parse_plot_format(data)
+            max_points = parse_max_points(data)
+        except ValueError as e:
+            return jsonify({"error": f"Invalid plot options: {e}"}), 400
+        
+        try:
+            manager = user_data_manager(data)
+        except (ValueError, FileNotFoundError) as e:
+            return user_error(e)
+        
+        ai = ai_system if manager is data_manager else ai_system.bind(manager)
         message = data['message']
-        response = ai_system.chat(message)
+        try:
+            # Fail fast while Ollama is down instead of taking a worker
+            ai.ollama.raise_if_down()
+            job = llm_executor.submit(
+                lambda job: ai.chat(message, start=start, end=end, plot_format=plot_format, max_points=max_points))
+            response = llm_executor.wait(job, socketio.sleep)
+        except CircuitOpen as e:
+            down = jsonify({"error": str(e), "retry_after": e.retry_after})
+            return down, 503, {"Retry-After": str(e.retry_after)}
+        except ExecutorBusy as e:
+            busy = jsonify({"error": str(e), "retry_after": e.retry_after})
+            return busy, 429, {"Retry-After": str(e.retry_after)}
+        except TimeoutError as e:
+            return jsonify({"error": str(e)}), 504
         
-        return jsonify(response)
+        return app.response_class(dumps(response), mimetype='application/json')
     except Exception as e:
         logger.error(f"Error in chat endpoint: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
-@app.route('/api/plot', methods=['POST'])
+@app.route('/api/plot', methods=['GET', 'POST'])
 def generate_plot():
     try:
-        data = request.get_json()
-        if not data or 'type' not in data:
-            return jsonify({"error": "No plot type provided"}), 400
+        data = request.get_json() if request.method == 'POST' else request.args.to_dict()
+        try:
+            params = parse_plot_request(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        plot_type = data['type']
-        table_name = data.get('table_name')
+        try:
+            manager = user_data_manager(data)
+        except (ValueError, FileNotFoundError) as e:
+            return user_error(e)
         
-        result = ai_system.plot_generator.generate_plot(plot_type, table_name)
-        return jsonify(result)
+        etag, body = render_plot(manager, params)
+        if etag is None:
+            return app.response_class(body, mimetype='application/json')
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+        else:
+            response = app.response_class(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
     except Exception as e:
         logger.error(f"Error in plot endpoint: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
+@app.route('/api/plots', methods=['POST'])
+def generate_plots():
+    """Render a batch of plots in parallel, streaming one NDJSON line per plot as it is ready."""
+    try:
+        data = request.get_json()
+        try:
+            plots = parse_plot_batch(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        try:
+            manager = user_data_manager(data)
+        except (ValueError, FileNotFoundError) as e:
+            return user_error(e)
+        
+        def stream():
+            for index, body in iter_plot_batch(manager, plots):
+                yield b'{"index":' + str(index).encode() + b',"result":' + body + b'}\n'
+        
+        return app.response_class(stream(), mimetype='application/x-ndjson')
+    except Exception as e:
+        logger.error(f"Error in plots endpoint: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+@app.route('/api/plot_image', methods=['GET', 'POST'])
+def generate_plot_image():
+    """Render a plot as a PNG, SVG or WebP image (or a thumbnail), revalidated by ETag."""
+    try:
+        data = request.get_json() if request.method == 'POST' else request.args.to_dict()
+        try:
+            image_options = parse_image_options(data or {})
+            params = parse_plot_request({k: v for k, v in data.items() if k != 'format'} if data else data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        try:
+            manager = user_data_manager(data)
+        except (ValueError, FileNotFoundError) as e:
+            return user_error(e)
+        
+        try:
+            result = render_plot_image(manager, params, *image_options)
+        except RuntimeError as e:
+            return jsonify({"error": str(e)}), 503
+        if "error" in result:
+            return jsonify(result), 400
+        
+        if request.if_none_match.contains(result["key"]):
+            response = app.response_class(status=304)
+        else:
+            response = app.response_class(result["image"], mimetype=result["mimetype"])
+        response.set_etag(result["key"])
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    except Exception as e:
+        logger.error(f"Error in plot image endpoint: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
 @app.route('/api/data_summary')
 def data_summary():
     try:
-        summary = data_manager.get_database_summary()
+        try:
+            manager = user_data_manager()
+        except (ValueError, FileNotFoundError) as e:
+            return user_error(e)
+        
+        summary = manager.get_database_summary()
         return jsonify(summary)
     except Exception as e:
         logger.error(f"Error in data summary endpoint: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
+@app.route('/api/cache_stats')
+def cache_stats():
+    """Get data cache statistics, including the per-user routing LRU."""
+    try:
+        manager = user_data_manager()
+    except (ValueError, FileNotFoundError) as e:
+        return user_error(e)
+    return jsonify({**manager.cache_stats(), "users": user_router.stats(), "plots": plot_cache.stats(),
+                    "images": plot_images.stats(), "chat_streams": chat_streams.stats(),
+                    "llm": llm_executor.stats(), "responses": response_cache.stats()})
+
 @app.route('/api/llm_status')
 def llm_status():
     """Get status of available LLM providers."""
@@ -703,7 +1218,9 @@ def llm_status():
         "available_providers": ["ollama"] if OLLAMA_AVAILABLE else [],
         "current_provider": "ollama" if OLLAMA_AVAILABLE else "none",
         "ollama_available": OLLAMA_AVAILABLE,
-        "ollama_required": True
+        "ollama_required": True,
+        "llm_available": OLLAMA_AVAILABLE and ollama_service.available(),
+        "ollama": ollama_service.stats()
     }
     return jsonify(status)
 
@@ -713,32 +1230,112 @@ def handle_connect():
 
 @socketio.on('chat_message')
 def handle_chat_message(data):
-    """Handle incoming chat messages."""
+    """Handle incoming chat messages, streaming the response as it is generated.
+    
+    Tokens are emitted as ``chat_response_chunk`` events and the final
+    ``chat_response`` carries the full text and the plot, both with the
+    message's ``id``. While the LLM workers are busy, ``chat_queued``
+    events report the message's place in line; when the queue is full the
+    response is a busy error right away. A new message from the same client
+    cancels the response still streaming or queued.
+    """
+    message_id = (data or {}).get('id')
     try:
         message = data.get('message', '')
+        start, end = parse_date_window(data)
+        plot_format = parse_plot_format(data)
+        max_points = parse_max_points(data)
         
-        if not ai_system:
+        try:
+            ai_system.ollama.raise_if_down()
+        except CircuitOpen as e:
             emit('chat_response', {
-                'response': "❌ AI system is not available. Please ensure Ollama is installed and running:\n\n1. Install Ollama: https://ollama.ai/download\n2. Start Ollama: ollama serve\n3. Download model: ollama pull llama2",
-                'provider': 'ERROR'
+                'id': message_id,
+                'response': f"❌ AI system is not available ({e}). Please ensure Ollama is installed and running:\n\n1. Install Ollama: https://ollama.ai/download\n2. Start Ollama: ollama serve\n3. Download model: ollama pull llama2",
+                'provider': 'ERROR',
+                'retry_after': e.retry_after
             })
             return
         
-        # Get AI response
-        response = ai_system.chat(message)
+        # Get AI response from the requesting user's data
+        manager = user_data_manager(data)
+        ai = ai_system if manager is data_manager else ai_system.bind(manager)
+        chat_streams.cancel(request.sid)
+        job = llm_executor.stream(
+            lambda: ai.stream_chat(message, start=start, end=end, plot_format=plot_format, max_points=max_points))
         
-        # Emit response back to client
-        emit('chat_response', response)
+        # Stream the response back to the client, yielding between tokens so a
+        # new message or a disconnect can cancel it
+        chat_streams.relay(request.sid, message_id, llm_executor.iter_job(job, socketio.sleep), emit,
+                           pause=lambda: socketio.sleep(0))
         
+    except ExecutorBusy as e:
+        emit('chat_response', {
+            'id': message_id,
+            'response': f"⏳ {e}.",
+            'provider': 'BUSY',
+            'retry_after': e.retry_after
+        })
+    except TimeoutError as e:
+        emit('chat_response', {
+            'id': message_id,
+            'response': f"⏱️ {e}. Please try again.",
+            'provider': 'ERROR'
+        })
     except Exception as e:
         logger.error(f"Error handling chat message: {e}")
         emit('chat_response', {
+            'id': message_id,
             'response': f"Sorry, I encountered an error: {str(e)}. Please make sure Ollama is running.",
             'provider': 'ERROR'
         })
 
+@socketio.on('plot_batch')
+def handle_plot_batch(data):
+    """Render a batch of plots, emitting each one as soon as it is ready."""
+    try:
+        plots = parse_plot_batch(data)
+        manager = user_data_manager(data)
+    except (ValueError, FileNotFoundError) as e:
+        emit('plot_batch_done', {'error': str(e)})
+        return
+    
+    for index, body in iter_plot_batch(manager, plots):
+        emit('plot_result', {'index': index, 'result': json.loads(body)})
+    emit('plot_batch_done', {'count': len(plots)})
+
+@socketio.on('subscribe_plot')
+def handle_subscribe_plot(data):
+    """Subscribe to live updates of a plot the client shows, from the last date it has."""
+    try:
+        plot_id, manager, subscription = open_plot_subscription(data)
+    except (ValueError, FileNotFoundError) as e:
+        emit('plot_update', {'id': (data or {}).get('id'), 'error': str(e)})
+        return
+    
+    update = plot_streams.subscribe(request.sid, plot_id, manager, subscription)
+    plot_streams.start(socketio.start_background_task, socketio.sleep)
+    if update:
+        emit('plot_update', {'id': plot_id, **update})
+
+@socketio.on('unsubscribe_plot')
+def handle_unsubscribe_plot(data):
+    """Stop live updates of one plot."""
+    plot_streams.unsubscribe(request.sid, str((data or {}).get('id')))
+
+@socketio.on('cancel_chat')
+def handle_cancel_chat(data=None):
+    """Stop the response still streaming to this client."""
+    chat_streams.cancel(request.sid)
+
+@socketio.on('disconnect')
+def handle_disconnect():
+    plot_streams.unsubscribe(request.sid)
+    chat_streams.cancel(request.sid)
+
 if __name__ == '__main__':
     print("🚀 Starting FitTrackAI...")
     print(f"📊 Using database: {DB_PATH}")
     print("🌐 Server running at: http://localhost:5000")
+    start_background_tasks()
     socketio.run(app, debug=True, host='0.0.0.0', port=5000) 
\ No newline at end of file
@@ -0,0 +1,565 @@
+#!/usr/bin/env python3
+"""
+FitTrackAI Benchmarks
+
+Times the data loading paths against a synthetic (or your own) health database.
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import argparse
+import tempfile
+import time
+import shutil
+import statistics
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.utils import PlotlyJSONEncoder
+
+from columnar_mirror import ColumnarMirror
+from frame_cache import FrameCache, compact_frame, frame_nbytes
+from ingest import ensure_schema, INSERT_SQL
+from rollups import refresh_rollups
+from plot_specs import (PLOT_SPECS, TRACE_OPTIONS, spec_tables, spec_columns, build_figure, figure_json, dumps,
+                        custom_spec)
+from downsample import lttb
+from plot_batch import SharedLoads, render_batch
+from plot_stream import PlotSubscription
+from data_context import DataContext
+from context_planner import estimate_tokens
+from llm_executor import LLMExecutor, ExecutorBusy
+from ollama_service import OllamaService, CircuitOpen
+from response_cache import ResponseCache, response_key
+from table_stats import table_stats
+from db_pool import ConnectionPool
+from plot_images import RendererPool, ImageCache, PlotImages, KALEIDO_AVAILABLE, THUMBNAIL_SIZE
+
+DAILY_TABLES = {
+    "DailyStepCount": ("total_value", 4000, 15000),
+    "DailyActiveCalories": ("total_value", 150, 900),
+    "DailyBasalCalories": ("total_value", 1400, 1700),
+    "DailyDistanceWalkRun": ("total_value", 1.0, 15.0),
+    "DailyFlightsClimbed": ("total_value", 0, 40),
+    "DailyWalkingSpeed": ("avg_value", 0.8, 1.6),
+    "DailyWalkingSteadiness": ("avg_value", 70, 100),
+    "DailySleepSummary": ("sleep_minutes", 300, 540),
+}
+
+
+def build_synthetic_db(path: str, days: int, samples_per_day: int):
+    """Create a database with Daily* tables and one raw per-sample table."""
+    rng = np.random.default_rng(42)
+    start = date(2015, 1, 1)
+    dates = [(start + timedelta(days=i)).isoformat() for i in range(days)]
+
+    conn = sqlite3.connect(path)
+    for table, (column, low, high) in DAILY_TABLES.items():
+        conn.execute(f"CREATE TABLE {table} (date TEXT, {column} REAL)")
+        values = rng.uniform(low, high, size=days).round(0 if high > 100 else 2)
+        conn.executemany(f"INSERT INTO {table} VALUES (?, ?)", zip(dates, values.tolist()))
+
+    conn.execute("CREATE TABLE HeartRate (date TEXT, value REAL, source TEXT)")
+    seconds = np.arange(samples_per_day) * (86400 // max(samples_per_day, 1))
+    for day in dates:
+        stamps = [f"{day} {s // 3600:02d}:{s % 3600 // 60:02d}:{s % 60:02d}" for s in seconds]
+        values = rng.normal(70, 10, size=samples_per_day).round(0)
+        conn.executemany("INSERT INTO HeartRate VALUES (?, ?, 'Watch')", zip(stamps, values.tolist()))
+    conn.commit()
+    conn.close()
+
+
+def time_call(fn, repeat: int) -> float:
+    """Get the median wall time of a call in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def read_sql(db_path: str, table: str) -> pd.DataFrame:
+    """Load a table the way DataManager did before the mirror existed."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return pd.read_sql_query(f"SELECT * FROM {table}", conn)
+    finally:
+        conn.close()
+
+
+def bench_loads(db_path: str, repeat: int):
+    """Compare read_sql_query against memory-mapped loads from the columnar mirror."""
+    mirror = ColumnarMirror(db_path, tempfile.mkdtemp(prefix="fittrack_mirror_"))
+    start = time.perf_counter()
+    mirror.rebuild(force=True)
+    print(f"Mirror build: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    conn = sqlite3.connect(db_path)
+    tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+    conn.close()
+
+    print(f"\n{'Table':<26}{'Rows':>10}{'read_sql (ms)':>16}{'mirror (ms)':>14}{'speedup':>10}")
+    for table in tables:
+        rows = len(read_sql(db_path, table))
+        sql_ms = time_call(lambda: read_sql(db_path, table), repeat)
+        if mirror.load(table) is None:
+            print(f"{table:<26}{rows:>10}{sql_ms:>16.2f}{'n/a':>14}{'':>10}")
+            continue
+        mirror_ms = time_call(lambda: mirror.load(table), repeat)
+        print(f"{table:<26}{rows:>10}{sql_ms:>16.2f}{mirror_ms:>14.2f}{sql_ms / mirror_ms:>9.1f}x")
+
+
+def plot_json(df: pd.DataFrame, column: str, parse_dates: bool) -> str:
+    """Build a line plot of a daily table, parsing its dates first if asked to."""
+    if parse_dates:
+        df = df.assign(date=pd.to_datetime(df['date']))
+    fig = go.Figure(go.Scatter(x=df['date'], y=df[column], mode='lines+markers'))
+    return fig.to_json()
+
+
+def bench_schema(db_path: str, repeat: int):
+    """Compare untyped frames (parsed on every plot) against the compact typed schema."""
+    conn = sqlite3.connect(db_path)
+    tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+    conn.close()
+
+    print(f"\n{'Table':<26}{'Rows':>10}{'untyped (KB)':>15}{'typed (KB)':>13}{'saved':>8}")
+    frames = {}
+    for table in tables:
+        raw = read_sql(db_path, table)
+        typed = compact_frame(raw)
+        frames[table] = (raw, typed)
+        raw_kb, typed_kb = frame_nbytes(raw) / 1024, frame_nbytes(typed) / 1024
+        print(f"{table:<26}{len(raw):>10}{raw_kb:>15.0f}{typed_kb:>13.0f}{1 - typed_kb / raw_kb:>8.0%}")
+
+    print(f"\n{'Plot':<26}{'untyped (ms)':>14}{'typed (ms)':>12}{'saved (ms)':>12}")
+    for table, (column, _, _) in DAILY_TABLES.items():
+        if table not in frames:
+            continue
+        raw, typed = frames[table]
+        raw_ms = time_call(lambda: plot_json(raw, column, parse_dates=True), repeat)
+        typed_ms = time_call(lambda: plot_json(typed, column, parse_dates=False), repeat)
+        print(f"{table:<26}{raw_ms:>14.2f}{typed_ms:>12.2f}{raw_ms - typed_ms:>12.2f}")
+
+
+def go_plot_json(spec: dict, frames: dict) -> str:
+    """Build the same series as a spec through graph_objects, the way the plots were built before."""
+    fig = go.Figure()
+    for trace_spec in spec["traces"]:
+        df = frames[trace_spec["table"]]
+        attrs = {key: value for key, value in trace_spec.items() if key not in TRACE_OPTIONS | {"type", "name"}}
+        trace = go.Bar if trace_spec["type"] == "bar" else go.Scatter
+        fig.add_trace(trace(x=df['date'], y=df[trace_spec["column"]], name=trace_spec.get("name"), **attrs))
+    fig.update_layout(template='plotly_white', **spec["layout"])
+    return json.dumps(fig, cls=PlotlyJSONEncoder)
+
+
+def bench_figures(db_path: str, repeat: int):
+    """Compare building plot JSON through graph_objects against the plot spec builder."""
+    conn = sqlite3.connect(db_path)
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    conn.close()
+
+    print(f"\n{'Plot':<26}{'Points':>10}{'graph_objects (ms)':>20}{'specs (ms)':>12}{'speedup':>10}")
+    for plot_type, spec in PLOT_SPECS.items():
+        if not set(spec_tables(spec)) <= tables:
+            continue
+        frames = {table: compact_frame(read_sql(db_path, table))[['date'] + spec_columns(spec, table)]
+                  for table in spec_tables(spec)}
+        points = sum(len(df) for df in frames.values())
+        go_ms = time_call(lambda: go_plot_json(spec, frames), repeat)
+        spec_ms = time_call(lambda: figure_json(build_figure(spec, frames)), repeat)
+        print(f"{plot_type:<26}{points:>10}{go_ms:>20.2f}{spec_ms:>12.2f}{go_ms / spec_ms:>9.1f}x")
+
+
+def bench_payloads(db_path: str, repeat: int):
+    """Compare plot responses as JSON text against typed arrays with the fast JSON backend."""
+    conn = sqlite3.connect(db_path)
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    conn.close()
+
+    def text_payload(spec, frames):
+        return json.dumps({"plot": json.dumps(build_figure(spec, frames))}).encode()
+
+    def binary_payload(spec, frames):
+        return dumps({"plot": build_figure(spec, frames, binary=True)})
+
+    print(f"\n{'Plot':<26}{'JSON (KB)':>11}{'binary (KB)':>13}{'JSON (ms)':>11}{'binary (ms)':>13}")
+    for plot_type, spec in PLOT_SPECS.items():
+        if not set(spec_tables(spec)) <= tables:
+            continue
+        frames = {table: compact_frame(read_sql(db_path, table))[['date'] + spec_columns(spec, table)]
+                  for table in spec_tables(spec)}
+        text_kb = len(text_payload(spec, frames)) / 1024
+        binary_kb = len(binary_payload(spec, frames)) / 1024
+        text_ms = time_call(lambda: text_payload(spec, frames), repeat)
+        binary_ms = time_call(lambda: binary_payload(spec, frames), repeat)
+        print(f"{plot_type:<26}{text_kb:>11.0f}{binary_kb:>13.0f}{text_ms:>11.2f}{binary_ms:>13.2f}")
+
+
+def bench_downsampling(repeat: int, points: int = 1_000_000, max_points: int = 1500):
+    """Time LTTB over a large multi-column table and compare plot payloads with and without it."""
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame({
+        "date": pd.date_range("2015-01-01", periods=points, freq="5min"),
+        "heart_rate": 70 + np.cumsum(rng.normal(size=points)) / 50,
+        "hrv": 50 + np.cumsum(rng.normal(size=points)) / 80,
+        "spo2": 97 + rng.normal(size=points) / 2,
+    })
+    columns = ["heart_rate", "hrv", "spo2"]
+    spec = custom_spec("Vitals", columns)
+    x, ys = df["date"].to_numpy(), df[columns].to_numpy()
+
+    lttb_ms = time_call(lambda: lttb(x, ys, max_points), repeat)
+    full_kb = len(dumps(build_figure(spec, {"Vitals": df}, binary=True))) / 1024
+    small_kb = len(dumps(build_figure(spec, {"Vitals": df}, binary=True, max_points=max_points))) / 1024
+    print(f"Points: {points} x {len(columns)} columns, max_points={max_points}")
+    print(f"LTTB (all columns, one pass): {lttb_ms:.1f} ms")
+    print(f"Binary payload: {full_kb:.0f} KB -> {small_kb:.0f} KB")
+
+
+def bench_batch(db_path: str, repeat: int, workers: int = 8):
+    """Compare rendering the dashboard plots one by one against one parallel batch, from cold caches."""
+    from app import DataManager, PlotGenerator
+
+    plot_types = list(PLOT_SPECS)
+
+    def cold_manager():
+        return DataManager(db_path, frame_cache=FrameCache())
+
+    def render(manager, plot_type, loads=None):
+        return PlotGenerator(manager, loads).generate_plot(plot_type, resolution="day", plot_format="binary")
+
+    def one_by_one():
+        manager = cold_manager()
+        for plot_type in plot_types:
+            render(manager, plot_type)
+
+    def batch(executor):
+        manager, loads = cold_manager(), SharedLoads()
+        list(render_batch(plot_types, lambda plot_type: render(manager, plot_type, loads), executor,
+                          time.sleep))
+
+    slowest = max(time_call(lambda: render(cold_manager(), plot_type), repeat) for plot_type in plot_types)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        batch_ms = time_call(lambda: batch(executor), repeat)
+    print(f"Plots: {len(plot_types)}, workers: {workers}")
+    print(f"One request per plot: {time_call(one_by_one, repeat):.1f} ms")
+    print(f"One batch: {batch_ms:.1f} ms")
+    print(f"Slowest single plot: {slowest:.1f} ms")
+
+
+def bench_images(db_path: str, renderers: int = 2):
+    """Time dashboard thumbnails: a fresh renderer pool, warm renderers, then the image cache."""
+    if not KALEIDO_AVAILABLE:
+        print("⚠️ kaleido is not installed, skipping")
+        return
+    from app import DataManager, PlotGenerator
+
+    manager = DataManager(db_path, frame_cache=FrameCache())
+    pool = RendererPool(max_size=renderers)
+    images = PlotImages(pool, ImageCache(tempfile.mkdtemp(prefix="fittrack_images_")))
+    generator = PlotGenerator(manager, images=images)
+    payloads = [generator.generate_plot(plot_type, max_points=900)["plot"]
+                for plot_type in PLOT_SPECS]
+
+    def thumbnails(executor):
+        return list(executor.map(lambda payload: images.render(payload, "webp", *THUMBNAIL_SIZE, thumbnail=True),
+                                 payloads))
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(payloads)) as executor:
+            start = time.perf_counter()
+            pool.warm()
+            startup = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            results = thumbnails(executor)
+            rendered = (time.perf_counter() - start) * 1000
+            cached = time_call(lambda: thumbnails(executor), 5)
+    finally:
+        pool.close()
+    print(f"Thumbnails: {len(results)}, renderers: {renderers}, "
+          f"{sum(len(image) for _, image in results) / 1024:.1f} KB")
+    print(f"Renderer startup: {startup:.0f} ms")
+    print(f"Rendered on warm renderers: {rendered:.0f} ms")
+    print(f"From the image cache: {cached:.1f} ms")
+
+
+def bench_stream(db_path: str, repeat: int):
+    """Compare refetching the full daily steps figure with a live update, after each new day of data."""
+    from app import DataManager, PlotGenerator
+
+    path = os.path.join(tempfile.mkdtemp(prefix="fittrack_stream_"), "health.db")
+    shutil.copy(db_path, path)
+    manager = DataManager(path, frame_cache=FrameCache())
+    generator = PlotGenerator(manager)
+    spec = PLOT_SPECS["daily_steps"]
+    figure = json.loads(generator.generate_plot("daily_steps", resolution="day")["plot"])
+    subscription = PlotSubscription(spec, "day", [trace["name"] for trace in figure["data"]],
+                                    lambda table, columns, start, end: generator._load_series(
+                                        table, columns, start, end, "day", "mean"))
+    since = max(trace["x"][-1] for trace in figure["data"])
+    subscription.start_from(since)
+
+    full_ms, full_bytes, update_ms, update_bytes = [], [], [], []
+    day = date.fromisoformat(since[:10])
+    for _ in range(repeat):
+        day += timedelta(days=1)
+        conn = sqlite3.connect(path)
+        conn.execute("INSERT INTO DailyStepCount (date, total_value) VALUES (?, ?)", (day.isoformat(), 8000.0))
+        conn.commit()
+        conn.close()
+        manager.get_tables()  # the catalog refresh after a change is shared by every request
+
+        start = time.perf_counter()
+        update = subscription.update()
+        update_ms.append((time.perf_counter() - start) * 1000)
+        update_bytes.append(len(dumps(update)))
+        start = time.perf_counter()
+        full = generator.generate_plot("daily_steps", resolution="day")
+        full_ms.append((time.perf_counter() - start) * 1000)
+        full_bytes.append(len(dumps(full)))
+    manager.close()
+    print(f"Days plotted: {len(figure['data'][0]['x'])}, one new day per round")
+    print(f"Full figure: {statistics.median(full_ms):.1f} ms, {statistics.median(full_bytes) / 1024:.1f} KB")
+    print(f"Live update: {statistics.median(update_ms):.1f} ms, {statistics.median(update_bytes)} bytes")
+
+
+def bench_table_stats(db_path: str, repeat: int):
+    """Compare column statistics from a loaded table with SQLite aggregates."""
+    pool = ConnectionPool(db_path)
+
+    def in_pandas():
+        df = read_sql(db_path, "HeartRate")
+        values = df["value"].dropna()
+        return values.mean(), values.median(), values.min(), values.max(), values.std()
+
+    pandas_ms = time_call(in_pandas, repeat)
+    sql_ms = time_call(lambda: table_stats(pool, "HeartRate"), repeat)
+    no_median_ms = time_call(lambda: table_stats(pool, "HeartRate", medians=False), repeat)
+    pool.close()
+    print(f"HeartRate rows: {table_stats(ConnectionPool(db_path), 'HeartRate', medians=False)['total_records']}")
+    print(f"Load + pandas: {pandas_ms:.1f} ms")
+    print(f"SQLite aggregates: {sql_ms:.1f} ms ({no_median_ms:.1f} ms without medians)")
+
+
+def bench_llm_queue(requests: int = 60, generation: float = 0.05, workers: int = 2, max_queue: int = 8):
+    """Compare chat latency under a burst with an unbounded queue and with admission control.
+
+    The LLM is simulated by a fixed generation time per request.
+    """
+    def burst(executor):
+        latencies, rejected = [], 0
+        jobs = []
+        for _ in range(requests):
+            try:
+                jobs.append((time.perf_counter(), executor.submit(lambda job: time.sleep(generation))))
+            except ExecutorBusy:
+                rejected += 1
+        for submitted, job in jobs:
+            executor.wait(job, time.sleep, poll=0.001)
+            latencies.append((time.perf_counter() - submitted) * 1000)
+        return np.percentile(latencies, 50), np.percentile(latencies, 99), rejected
+
+    for label, depth in [("Unbounded queue", requests), (f"Queue of {max_queue}", max_queue)]:
+        p50, p99, rejected = burst(LLMExecutor(max_workers=workers, max_queue=depth))
+        print(f"{label} ({requests} requests at once, {workers} workers, {generation * 1000:.0f} ms each): "
+              f"p50 {p50:.0f} ms, p99 {p99:.0f} ms, {rejected} busy responses")
+
+
+def bench_context_plan(db_path: str, repeat: int, budget: int = 1000):
+    """Compare the prompt tokens of the full data context with the context planned for typical questions."""
+    from app import DataManager, AdvancedAI
+
+    manager = DataManager(db_path, frame_cache=FrameCache())
+    context = DataContext(manager.catalog, manager.pool, AdvancedAI._analyze_table_data)
+    print(f"Full context: {estimate_tokens(context.text())} tokens over {context.stats()['tables']} tables")
+    for message in ["How did I sleep this week?", "How far did I walk in March 2024?", "Hello!"]:
+        plan_ms = time_call(lambda: context.plan(message, budget), repeat * 20)
+        print(f"'{message}': {estimate_tokens(context.plan(message, budget))} tokens (planned in {plan_ms:.2f} ms)")
+    manager.close()
+
+def bench_ollama_down(requests: int = 20, connect: float = 0.05):
+    """Compare chat calls while Ollama is down, straight to the client and behind the circuit breaker.
+
+    The unreachable server is simulated by a client that fails after ``connect`` seconds.
+    """
+    class Unreachable:
+        def invoke(self, messages):
+            time.sleep(connect)
+            raise ConnectionError("connection refused")
+
+    def calls(invoke):
+        started = time.perf_counter()
+        for _ in range(requests):
+            try:
+                invoke()
+            except (ConnectionError, CircuitOpen):
+                pass
+        return (time.perf_counter() - started) * 1000
+
+    client = Unreachable()
+    service = OllamaService(client_factory=Unreachable)
+    startup_ms = time_call(OllamaService, 100)
+    direct_ms = calls(lambda: client.invoke(["Hello"]))
+    breaker_ms = calls(lambda: service.call(lambda llm: llm.invoke(["Hello"])))
+    print(f"Service startup: {startup_ms * 1000:.1f} µs (no connection made)")
+    print(f"{requests} calls straight to the client: {direct_ms:.0f} ms")
+    print(f"{requests} calls behind the breaker: {breaker_ms:.0f} ms "
+          f"({service.stats()['rejected']} failed fast)")
+
+def bench_context(db_path: str, repeat: int):
+    """Compare building the LLM data context with the cached text and a rebuild after one table changed."""
+    from app import DataManager, AdvancedAI
+
+    path = os.path.join(tempfile.mkdtemp(prefix="fittrack_context_"), "health.db")
+    shutil.copy(db_path, path)
+    manager = DataManager(path, frame_cache=FrameCache())
+
+    def fresh():
+        return DataContext(manager.catalog, manager.pool, AdvancedAI._analyze_table_data).text()
+
+    context = DataContext(manager.catalog, manager.pool, AdvancedAI._analyze_table_data)
+    context.text()
+    full_ms = time_call(fresh, repeat)
+    cached_ms = time_call(context.text, repeat * 100)
+
+    changed_ms = []
+    day = date.fromisoformat(str(manager.catalog.tables()["DailyStepCount"]["max_date"])[:10])
+    for _ in range(repeat):
+        day += timedelta(days=1)
+        conn = sqlite3.connect(path)
+        conn.execute("INSERT INTO DailyStepCount (date, total_value) VALUES (?, ?)", (day.isoformat(), 8000.0))
+        conn.commit()
+        conn.close()
+        manager.get_tables()  # the catalog refresh after a change is shared by every request
+        changed_ms.append(time_call(context.text, 1))
+    manager.close()
+    print(f"Tables: {context.stats()['tables']}")
+    print(f"Full build: {full_ms:.1f} ms")
+    print(f"Cached: {cached_ms * 1000:.1f} µs")
+    print(f"After one table changed: {statistics.median(changed_ms):.1f} ms")
+
+
+def bench_response_cache(db_path: str, repeat: int, generation: float = 0.5):
+    """Compare answering a repeated question with a generation and from the response cache.
+
+    The LLM is simulated by a fixed generation time; the key digests the real data context.
+    """
+    from app import DataManager, AdvancedAI
+
+    manager = DataManager(db_path, frame_cache=FrameCache())
+    context = DataContext(manager.catalog, manager.pool, AdvancedAI._analyze_table_data).text()
+    cache = ResponseCache(os.path.join(tempfile.mkdtemp(prefix="fittrack_responses_"), "responses.db"))
+
+    def answer(message):
+        key = response_key(message, context, "llama2")
+        version = manager.data_version()
+        cached = cache.get(db_path, version, key)
+        if cached is None:
+            time.sleep(generation)
+            cached = f"You slept well this week. ({message})"
+            cache.put(db_path, version, key, cached)
+        return cached
+
+    generated_ms = time_call(lambda: answer("How did I sleep this week?"), 1)
+    cached_ms = time_call(lambda: answer("how did I sleep this week"), repeat * 20)
+    manager.close()
+    print(f"Generated ({generation * 1000:.0f} ms simulated LLM): {generated_ms:.1f} ms")
+    print(f"Repeated question from the cache: {cached_ms:.2f} ms (hit rate {cache.stats()['hit_rate']:.0%})")
+
+def step_records(start: date, days: int, samples_per_day: int):
+    """Generate raw step count rows for the Record table."""
+    step = 86400 // max(samples_per_day, 1)
+    for i in range(days):
+        day = (start + timedelta(days=i)).isoformat()
+        for j in range(samples_per_day):
+            s = j * step
+            stamp = f"{day} {s // 3600:02d}:{s % 3600 // 60:02d}:{s % 60:02d}"
+            yield ("HKQuantityTypeIdentifierStepCount", "iPhone", "count", float(j % 200),
+                   None, stamp, stamp, stamp, "+0000")
+
+
+def bench_rollups(days: int, samples_per_day: int):
+    """Compare a full rollup rebuild against refreshing one newly synced day."""
+    db_path = os.path.join(tempfile.mkdtemp(prefix="fittrack_rollups_"), "health.db")
+    conn = sqlite3.connect(db_path)
+    ensure_schema(conn)
+    start = date(2015, 1, 1)
+    conn.executemany(INSERT_SQL, step_records(start, days, samples_per_day))
+    conn.commit()
+
+    full_ms = refresh_rollups(db_path, full=True)["seconds"] * 1000
+    conn.executemany(INSERT_SQL, step_records(start + timedelta(days=days), 1, samples_per_day))
+    conn.commit()
+    conn.close()
+    result = refresh_rollups(db_path)
+    print(f"Raw records: {days * samples_per_day}")
+    print(f"Full rebuild: {full_ms:.1f} ms")
+    print(f"Refresh after one day of new samples: {result['seconds'] * 1000:.1f} ms "
+          f"({result['dirty_days']} dirty days)")
+
+
+def main():
+    """Run the benchmarks."""
+    parser = argparse.ArgumentParser(description="FitTrackAI benchmarks")
+    parser.add_argument("--db", help="Benchmark an existing database instead of a synthetic one")
+    parser.add_argument("--days", type=int, default=3650, help="Days of synthetic data")
+    parser.add_argument("--samples-per-day", type=int, default=96, help="Raw samples per day")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per measurement")
+    args = parser.parse_args()
+
+    print("⏱️ FitTrackAI Benchmarks")
+    print("=" * 50)
+
+    db_path = args.db
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="fittrack_bench_"), "health.db")
+        print(f"Building synthetic database: {args.days} days, {args.samples_per_day} samples/day")
+        build_synthetic_db(db_path, args.days, args.samples_per_day)
+    elif not os.path.exists(db_path):
+        print(f"❌ Database not found at {db_path}")
+        return False
+
+    print("\n📦 Table loads")
+    bench_loads(db_path, args.repeat)
+    print("\n🧮 Typed schema")
+    bench_schema(db_path, args.repeat)
+    print("\n⚡ Figure builder")
+    bench_figures(db_path, args.repeat)
+    print("\n🗜️ Plot payloads")
+    bench_payloads(db_path, args.repeat)
+    print("\n📉 Downsampling")
+    bench_downsampling(args.repeat)
+    print("\n🧩 Dashboard batch")
+    bench_batch(db_path, args.repeat)
+    print("\n📡 Live plot updates")
+    bench_stream(db_path, args.repeat)
+    print("\n📐 Summary statistics")
+    bench_table_stats(db_path, args.repeat)
+    print("\n🧠 LLM data context")
+    bench_context(db_path, args.repeat)
+    print("\n✂️ Context planning")
+    bench_context_plan(db_path, args.repeat)
+    print("\n🚦 Chat admission under a burst")
+    bench_llm_queue()
+    print("\n🔌 Chat while Ollama is down")
+    bench_ollama_down()
+    print("\n💬 Repeated questions")
+    bench_response_cache(db_path, args.repeat)
+    print("\n🖼️ Plot images")
+    bench_images(db_path)
+    print("\n🔁 Daily rollups")
+    bench_rollups(args.days, args.samples_per_day)
+    return True
+
+
+if __name__ == "__main__":
+    if not main():
+        sys.exit(1)
@@ -0,0 +1,95 @@
+"""
+FitTrackAI Chat Streams
+
+Chat responses relayed to Socket.IO clients token by token, so the first
+words show up as soon as the LLM produces them. Each client has at most one
+response in flight; sending a new message or disconnecting cancels it.
+"""
+
+import threading
+from typing import Dict, Any, Callable, Iterator, Optional
+
+
+class ChatStreams:
+    """Registry of the chat responses being streamed, one per client session.
+
+    ``relay`` consumes the items of ``AdvancedAI.stream_chat``: ``{"delta": text}``
+    per token and then the final response, optionally interleaved with
+    ``{"queued": position}`` while the response waits for the LLM (see
+    LLMExecutor.iter_job).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active: Dict[str, threading.Event] = {}
+        self.completed = 0
+        self.cancelled = 0
+
+    def open(self, sid: str) -> threading.Event:
+        """Start a client's response, cancelling the one it already has; returns its cancel event."""
+        cancel = threading.Event()
+        with self._lock:
+            previous = self._active.get(sid)
+            self._active[sid] = cancel
+        if previous is not None:
+            previous.set()
+        return cancel
+
+    def cancel(self, sid: str) -> bool:
+        """Cancel a client's response in flight; returns whether there was one."""
+        with self._lock:
+            cancel = self._active.pop(sid, None)
+        if cancel is None:
+            return False
+        cancel.set()
+        return True
+
+    def _close(self, sid: str, cancel: threading.Event):
+        """Forget a finished response unless a newer one replaced it."""
+        with self._lock:
+            if self._active.get(sid) is cancel:
+                del self._active[sid]
+
+    def relay(self, sid: str, message_id: Any, chunks: Iterator[Dict[str, Any]],
+              emit: Callable[[str, Dict[str, Any]], None],
+              pause: Callable[[], None] = None) -> Optional[Dict[str, Any]]:
+        """Emit a response to a client until it is done or cancelled.
+
+        Deltas become ``chat_response_chunk`` events, queue positions
+        ``chat_queued`` events (when they change) and the final item the
+        ``chat_response`` event, all tagged with ``message_id``. ``pause()``
+        runs between chunks so the server can handle the client's other
+        events meanwhile. Returns the final response, or None if cancelled;
+        a cancelled response stops the generation and emits nothing more.
+        """
+        cancel = self.open(sid)
+        position = None
+        try:
+            for item in chunks:
+                if cancel.is_set():
+                    break
+                if "queued" in item:
+                    # Position 0 (generating) is only news to a client that was told it waits
+                    if item["queued"] != position and (item["queued"] or position):
+                        emit('chat_queued', {"id": message_id, "position": item["queued"]})
+                    position = item["queued"]
+                    continue
+                if "delta" not in item:
+                    emit('chat_response', {"id": message_id, **item})
+                    self.completed += 1
+                    return item
+                emit('chat_response_chunk', {"id": message_id, "delta": item["delta"]})
+                if pause:
+                    pause()
+            self.cancelled += 1
+            return None
+        finally:
+            close = getattr(chunks, "close", None)
+            if close:
+                close()
+            self._close(sid, cancel)
+
+    def stats(self) -> Dict[str, int]:
+        """Get response counters."""
+        with self._lock:
+            return {"active": len(self._active), "completed": self.completed, "cancelled": self.cancelled}
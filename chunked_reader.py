@@ -0,0 +1,106 @@
+"""
+FitTrackAI Chunked Reader
+
+Streams tables in bounded chunks using keyset pagination, plus a running
+reduction to daily means that never materializes the whole table.
+"""
+
+from typing import Any, Iterator, List, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from db_pool import ConnectionPool
+
+DEFAULT_CHUNK_SIZE = 50000
+
+
+def iter_table_chunks(pool: ConnectionPool, table_name: str, columns: Sequence[str],
+                      chunk_size: int = DEFAULT_CHUNK_SIZE, select: Sequence[str] = None,
+                      where: List[str] = None, params: Sequence[Any] = (),
+                      as_records: bool = False) -> Iterator[Union[pd.DataFrame, np.recarray]]:
+    """Yield a table in chunks of at most ``chunk_size`` rows.
+
+    ``columns`` are the table's columns; when it has a ``date`` column, rows
+    come in (date, rowid) order (NULL dates first), otherwise in rowid order.
+    Each chunk is a separate query that resumes after the last key seen, so
+    no connection or cursor is held between chunks.
+    """
+    select = list(select or columns)
+    select_sql = ", ".join(f'"{col}"' for col in select)
+    base_where = list(where or [])
+    by_date = 'date' in columns
+
+    def fetch(conditions: List[str], args: List[Any], order: str) -> pd.DataFrame:
+        clauses = base_where + conditions
+        sql = f'SELECT rowid AS "__rowid", "date" AS "__date", {select_sql} FROM "{table_name}"' \
+            if by_date else f'SELECT rowid AS "__rowid", {select_sql} FROM "{table_name}"'
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {order} LIMIT ?"
+        with pool.connection() as conn:
+            return pd.read_sql_query(sql, conn, params=list(params) + args + [chunk_size])
+
+    def emit(chunk: pd.DataFrame):
+        chunk = chunk.drop(columns=[c for c in ("__rowid", "__date") if c in chunk.columns])
+        return chunk.to_records(index=False) if as_records else chunk
+
+    # Rows without a date (or every row, for tables without one) by rowid
+    phase_where = ['"date" IS NULL'] if by_date else []
+    last_rowid = None
+    while True:
+        keyset = ['rowid > ?'] if last_rowid is not None else []
+        chunk = fetch(phase_where + keyset, [last_rowid] if last_rowid is not None else [], "rowid")
+        if chunk.empty:
+            break
+        last_rowid = int(chunk["__rowid"].iloc[-1])
+        yield emit(chunk)
+        if len(chunk) < chunk_size:
+            break
+
+    if not by_date:
+        return
+
+    # Dated rows by (date, rowid), served by the date index
+    last_key = None
+    while True:
+        if last_key is None:
+            keyset, args = ['"date" IS NOT NULL'], []
+        else:
+            keyset, args = ['("date", rowid) > (?, ?)'], list(last_key)
+        chunk = fetch(keyset, args, '"date", rowid')
+        if chunk.empty:
+            break
+        last_key = (chunk["__date"].iloc[-1], int(chunk["__rowid"].iloc[-1]))
+        yield emit(chunk)
+        if len(chunk) < chunk_size:
+            break
+
+
+def reduce_daily_means(chunks: Iterator[pd.DataFrame], date_column: str = 'date') -> pd.DataFrame:
+    """Reduce chunks to the mean of every numeric column per calendar day.
+
+    Memory stays proportional to the number of days, not the number of rows.
+    """
+    sums = None
+    counts = None
+    order: List[str] = []
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        numeric = [col for col in chunk.select_dtypes(include=[np.number]).columns if col != date_column]
+        order += [col for col in numeric if col not in order]
+        day = pd.to_datetime(chunk[date_column]).dt.normalize()
+        grouped = chunk[numeric].groupby(day)
+        part_sums, part_counts = grouped.sum(), grouped.count()
+        if sums is None:
+            sums, counts = part_sums, part_counts
+        else:
+            sums = sums.add(part_sums, fill_value=0)
+            counts = counts.add(part_counts, fill_value=0)
+
+    if sums is None:
+        return pd.DataFrame(columns=[date_column])
+    means = (sums[order] / counts[order].where(counts[order] > 0)).sort_index()
+    means.index.name = date_column
+    return means.reset_index()
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+FitTrackAI Columnar Mirror
+
+Keeps a column-per-file NumPy (.npy) copy of the health database so tables
+can be memory-mapped instead of decoded row by row through read_sql_query.
+Worker processes that map the same files share the same page-cache pages.
+"""
+
+import os
+import json
+import shutil
+import sqlite3
+import threading
+import time
+import logging
+import hashlib
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from frame_cache import compact_frame
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+LOCK_NAME = ".rebuild.lock"
+STALE_LOCK_SECONDS = 600
+
+
+def source_version(db_path: str) -> Optional[str]:
+    """Get a version string for the database file that is stable across processes.
+
+    An empty or missing WAL means the same contents, so only a non-empty WAL
+    contributes to the version.
+    """
+    try:
+        st = os.stat(db_path)
+    except OSError:
+        return None
+    parts = [str(st.st_ino), str(st.st_mtime_ns), str(st.st_size)]
+    try:
+        wal = os.stat(db_path + "-wal")
+        if wal.st_size > 0:
+            parts += [str(wal.st_mtime_ns), str(wal.st_size)]
+    except OSError:
+        pass
+    return "-".join(parts)
+
+
+class ColumnarMirror:
+    """Memory-mapped .npy mirror of every table in a SQLite database."""
+
+    def __init__(self, db_path: str, mirror_dir: str = None):
+        self.db_path = db_path
+        self.mirror_dir = mirror_dir or os.path.splitext(db_path)[0] + "_columnar"
+        self._lock = threading.Lock()
+        self._manifest: Optional[Dict[str, Any]] = None
+        self._manifest_mtime = None
+        self._rebuild_thread: Optional[threading.Thread] = None
+
+    def _read_manifest(self) -> Optional[Dict[str, Any]]:
+        """Load the manifest, re-reading it only when the file changes."""
+        path = os.path.join(self.mirror_dir, MANIFEST_NAME)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        with self._lock:
+            if mtime != self._manifest_mtime:
+                try:
+                    with open(path) as f:
+                        self._manifest = json.load(f)
+                    self._manifest_mtime = mtime
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Could not read columnar manifest: {e}")
+                    return None
+            return self._manifest
+
+    def is_fresh(self) -> bool:
+        """Check whether the mirror matches the current database contents."""
+        manifest = self._read_manifest()
+        version = source_version(self.db_path)
+        return manifest is not None and version is not None and manifest["source_version"] == version
+
+    def load(self, table_name: str, columns: List[str] = None) -> Optional[pd.DataFrame]:
+        """Memory-map a table from the mirror, or return None if it is unavailable or stale."""
+        if not self.is_fresh():
+            return None
+        manifest = self._read_manifest()
+        table = manifest["tables"].get(table_name)
+        if table is None:
+            return None
+
+        base = os.path.join(self.mirror_dir, manifest["path"], table["dir"])
+        wanted = columns or [col["name"] for col in table["columns"]]
+        by_name = {col["name"]: col for col in table["columns"]}
+        data = {}
+        try:
+            for name in wanted:
+                col = by_name[name]
+                values = np.load(os.path.join(base, col["file"]), mmap_mode="r")
+                if col["kind"] == "category":
+                    categories = np.load(os.path.join(base, col["categories"])).astype(object)
+                    values = pd.Categorical.from_codes(values, categories=categories)
+                elif col["kind"] == "text":
+                    values = values.astype(object)
+                    if col["nulls"]:
+                        nulls = np.load(os.path.join(base, col["nulls"]))
+                        values[nulls] = None
+                data[name] = values
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"Could not load {table_name} from columnar mirror: {e}")
+            return None
+        return pd.DataFrame(data, columns=wanted, copy=False)
+
+    def _acquire_build_lock(self) -> bool:
+        """Take the cross-process rebuild lock, clearing it if it is stale."""
+        os.makedirs(self.mirror_dir, exist_ok=True)
+        path = os.path.join(self.mirror_dir, LOCK_NAME)
+        try:
+            if time.time() - os.stat(path).st_mtime > STALE_LOCK_SECONDS:
+                os.remove(path)
+        except OSError:
+            pass
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            return False
+
+    def _write_table(self, conn: sqlite3.Connection, table_name: str, out_dir: str) -> Optional[Dict[str, Any]]:
+        """Write one table as one .npy file per column, in its compact typed schema.
+
+        Categorical columns are stored as their codes plus a file of categories.
+        """
+        df = compact_frame(pd.read_sql_query(f'SELECT * FROM "{table_name}"', conn))
+        os.makedirs(out_dir)
+        columns = []
+        for i, name in enumerate(df.columns):
+            series = df[name]
+            entry = {"name": name, "file": f"c{i}.npy", "nulls": None}
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                values = series.cat.codes.to_numpy()
+                entry["kind"] = "category"
+                entry["categories"] = f"c{i}.categories.npy"
+                np.save(os.path.join(out_dir, entry["categories"]),
+                        series.cat.categories.to_numpy().astype(str))
+            elif series.dtype.kind in "biufM":
+                values = series.to_numpy()
+                entry["kind"] = "numeric"
+            else:
+                nulls = series.isnull().to_numpy()
+                present = series[~nulls]
+                if not present.map(lambda v: isinstance(v, str)).all():
+                    logger.info(f"Skipping {table_name} in columnar mirror: mixed types in {name}")
+                    return None
+                values = series.where(~nulls, "").to_numpy().astype(str)
+                entry["kind"] = "text"
+                if nulls.any():
+                    entry["nulls"] = f"c{i}.nulls.npy"
+                    np.save(os.path.join(out_dir, entry["nulls"]), nulls)
+            entry["dtype"] = values.dtype.str
+            np.save(os.path.join(out_dir, entry["file"]), values)
+            columns.append(entry)
+        return {"rows": len(df), "columns": columns}
+
+    def rebuild(self, force: bool = False) -> bool:
+        """Rebuild the mirror from the database if it is stale.
+
+        Returns True if a new mirror was published.
+        """
+        if not force and self.is_fresh():
+            return False
+        if not os.path.exists(self.db_path) or not self._acquire_build_lock():
+            return False
+
+        try:
+            version = source_version(self.db_path)
+            build_name = "build-" + hashlib.sha1(f"{version}-{time.time()}".encode()).hexdigest()[:12]
+            build_dir = os.path.join(self.mirror_dir, build_name)
+            uri = f"file:{quote(os.path.abspath(self.db_path))}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True)
+            try:
+                # One read transaction so every table comes from the same snapshot
+                conn.execute("BEGIN")
+                names = [row[0] for row in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type='table'")]
+                tables = {}
+                for i, name in enumerate(names):
+                    table = self._write_table(conn, name, os.path.join(build_dir, f"t{i}"))
+                    if table is not None:
+                        table["dir"] = f"t{i}"
+                        tables[name] = table
+                conn.rollback()
+            finally:
+                conn.close()
+
+            manifest = {
+                "source_version": version,
+                "path": build_name,
+                "built_at": datetime.now().isoformat(),
+                "tables": tables,
+            }
+            tmp_path = os.path.join(self.mirror_dir, MANIFEST_NAME + ".tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(manifest, f)
+            os.replace(tmp_path, os.path.join(self.mirror_dir, MANIFEST_NAME))
+
+            # Old builds can go: processes still mapping them keep their pages
+            for entry in os.listdir(self.mirror_dir):
+                if entry.startswith("build-") and entry != build_name:
+                    shutil.rmtree(os.path.join(self.mirror_dir, entry), ignore_errors=True)
+
+            logger.info(f"Columnar mirror rebuilt with {len(tables)} tables in {build_dir}")
+            return True
+        except Exception as e:
+            logger.error(f"Error rebuilding columnar mirror: {e}")
+            return False
+        finally:
+            try:
+                os.remove(os.path.join(self.mirror_dir, LOCK_NAME))
+            except OSError:
+                pass
+
+    def rebuild_in_background(self):
+        """Start a rebuild on a background thread unless one is already running."""
+        with self._lock:
+            if self._rebuild_thread is not None and self._rebuild_thread.is_alive():
+                return
+            self._rebuild_thread = threading.Thread(target=self.rebuild, daemon=True)
+            self._rebuild_thread.start()
+
+
+def main():
+    """Build the columnar mirror for the default database."""
+    db_path = "data/db/processed_apple_health_data.db"
+    logging.basicConfig(level=logging.INFO)
+
+    mirror = ColumnarMirror(db_path)
+    if mirror.rebuild(force=True):
+        print(f"✅ Columnar mirror written to {mirror.mirror_dir}")
+    else:
+        print(f"❌ Could not build columnar mirror (is {db_path} present?)")
+
+
+if __name__ == "__main__":
+    main()
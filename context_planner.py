@@ -0,0 +1,164 @@
+"""
+FitTrackAI Context Planner
+
+Picks the part of the data context a chat message needs. Tables are scored
+against the message (metric words, their synonyms and explicit dates);
+relevant tables get their full description, the others a one-line summary,
+all within a budget of prompt tokens. Shorter prompts are evaluated faster,
+which matters most on CPU-only Ollama hosts.
+"""
+
+import re
+import math
+import calendar
+from functools import lru_cache
+from typing import Dict, Any, List, Set, Tuple
+
+# Parts of table and column names that say nothing about the metric
+GENERIC_TERMS = {"daily", "count", "total", "value", "avg", "sum", "min", "max", "date", "record", "summary",
+                 "id", "type", "unit", "source", "start", "end", "creation", "name"}
+
+# Words people use for a metric, mapped to terms found in table and column names
+SYNONYMS = {
+    "slept": ["sleep"], "nap": ["sleep"], "bed": ["sleep"],
+    "walk": ["step", "distance", "walk"], "run": ["distance", "run"], "jog": ["distance", "run"],
+    "km": ["distance"], "mile": ["distance"], "far": ["distance"],
+    "burn": ["calorie", "energy"], "burnt": ["calorie", "energy"], "kcal": ["calorie", "energy"],
+    "calorie": ["calorie", "energy"], "energy": ["calorie", "energy"],
+    "stair": ["flight"], "floor": ["flight"], "climb": ["flight"],
+    "pulse": ["heart"], "bpm": ["heart"], "heartbeat": ["heart"],
+    "pace": ["speed"], "fast": ["speed"], "balance": ["steadiness"], "steady": ["steadiness"],
+    "exercise": ["exercise", "workout"], "training": ["workout"], "weight": ["mass", "weight"],
+}
+
+MONTHS = {name.lower(): number for number, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): number for number, name in enumerate(calendar.month_abbr) if name})
+
+DATE_PATTERN = re.compile(r"\b(\d{4})-(\d{2})(?:-(\d{2}))?\b")
+MONTH_PATTERN = re.compile(r"\b(" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")\.?\s+(\d{4})\b")
+YEAR_PATTERN = re.compile(r"\b(19\d{2}|20\d{2})\b")
+
+
+def stem(word: str) -> str:
+    """Reduce a lowercase word to a crude stem, so "steps", "walked" and "walking" meet their tables."""
+    for suffix, shortest in (("ing", 3), ("ed", 4)):
+        if word.endswith(suffix) and len(word) - len(suffix) >= shortest:
+            word = word[:-len(suffix)]
+            # running -> run, but not walking -> wal
+            if word[-1] == word[-2] and word[-1] not in "aeiouls":
+                word = word[:-1]
+            return word
+    if word.endswith("s") and not word.endswith("ss") and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the prompt tokens of a text (about four characters each)."""
+    return math.ceil(len(text) / 4)
+
+
+@lru_cache(maxsize=1024)
+def table_terms(table: str, columns: Tuple[str, ...]) -> frozenset:
+    """Get the metric terms of a table: the stems of the words in its name and column names."""
+    words = re.findall(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])", table + " " + " ".join(columns).replace("_", " "))
+    return frozenset(stem(word.lower()) for word in words) - GENERIC_TERMS
+
+
+def message_terms(message: str) -> Tuple[Set[str], Set[str]]:
+    """Get the stems of a message's words and the table terms their synonyms add."""
+    words = {stem(word) for word in re.findall(r"[a-z]+", message.lower())}
+    synonyms = {term for word in words for term in SYNONYMS.get(word, ())}
+    return words, synonyms - words
+
+
+def message_dates(message: str) -> List[Tuple[str, str]]:
+    """Get the (first, last) ISO days of the dates, months and years a message names."""
+    text = message.lower()
+    dates = []
+    for year, month, day in DATE_PATTERN.findall(text):
+        if day:
+            dates.append((f"{year}-{month}-{day}", f"{year}-{month}-{day}"))
+        elif 1 <= int(month) <= 12:
+            last = calendar.monthrange(int(year), int(month))[1]
+            dates.append((f"{year}-{month}-01", f"{year}-{month}-{last:02d}"))
+    for name, year in MONTH_PATTERN.findall(text):
+        month = MONTHS[name]
+        last = calendar.monthrange(int(year), month)[1]
+        dates.append((f"{year}-{month:02d}-01", f"{year}-{month:02d}-{last:02d}"))
+    if not dates:
+        dates = [(f"{year}-01-01", f"{year}-12-31") for year in YEAR_PATTERN.findall(text)]
+    return dates
+
+
+def score_table(table: str, info: Dict[str, Any], words: Set[str], synonyms: Set[str],
+                dates: List[Tuple[str, str]]) -> int:
+    """Score a table against a message: 2 per term named, 1 per term a synonym implies, 1 if it covers a named date."""
+    terms = table_terms(table, tuple(info["columns"]))
+    score = 2 * len(terms & words) + len(terms & synonyms)
+    if dates and info["min_date"] and info["max_date"]:
+        first, last = str(info["min_date"])[:10], str(info["max_date"])[:10]
+        if any(start <= last and end >= first for start, end in dates):
+            score += 1
+    return score
+
+
+def summary_line(table: str, info: Dict[str, Any]) -> str:
+    """Describe a table in one line: its record count and date range."""
+    date_range = ""
+    if info["min_date"] and info["max_date"]:
+        date_range = f" ({str(info['min_date'])[:10]} to {str(info['max_date'])[:10]})"
+    return f"  • {table}: {info['record_count']} records{date_range}\n"
+
+
+def more_line(count: int) -> str:
+    """Count the tables left out of the summary."""
+    return f"  • … and {count} more tables\n"
+
+
+def plan_context(tables: Dict[str, Dict[str, Any]], fragments: Dict[str, str], message: str,
+                 budget: int) -> str:
+    """Build the data context for a message within ``budget`` estimated tokens.
+
+    ``tables`` is the catalog metadata of every table and ``fragments`` the
+    full descriptions of the non-empty ones (see DataContext). Tables the
+    message is relevant to are described in full, best match first, while
+    they fit; the rest are listed one line each, largest first, and those
+    that do not fit are only counted, if that line fits too.
+    """
+    words, synonyms = message_terms(message)
+    dates = message_dates(message)
+    scores = {table: score_table(table, tables[table], words, synonyms, dates) for table in fragments}
+    ranked = sorted(fragments, key=lambda table: (-scores[table], -tables[table]["record_count"], table))
+
+    context = f"📊 Database Overview:\nTotal tables: {len(tables)}\n\n"
+    used = estimate_tokens(context)
+    others = []
+    for table in ranked:
+        fragment = fragments[table]
+        if scores[table] > 0 and used + estimate_tokens(fragment) <= budget:
+            context += fragment
+            used += estimate_tokens(fragment)
+        else:
+            others.append(table)
+
+    if others:
+        heading = "📋 Other tables:\n"
+        used += estimate_tokens(heading)
+        lines = []
+        for i, table in enumerate(others):
+            line = summary_line(table, tables[table])
+            # Keep room to count the tables after this one
+            rest = len(others) - i - 1
+            reserved = estimate_tokens(more_line(rest)) if rest else 0
+            if used + estimate_tokens(line) + reserved > budget:
+                break
+            lines.append(line)
+            used += estimate_tokens(line)
+        if len(lines) < len(others):
+            line = more_line(len(others) - len(lines))
+            if used + estimate_tokens(line) <= budget:
+                lines.append(line)
+        if lines:
+            context += heading + "".join(lines)
+    return context
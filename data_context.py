@@ -0,0 +1,114 @@
+"""
+FitTrackAI Data Context
+
+The database description given to the LLM, built from per-table fragments
+that are cached against the database version and recomputed only for the
+tables that changed.
+"""
+
+import threading
+import logging
+from typing import Dict, Any, Callable, Optional, Tuple
+
+from db_catalog import TableCatalog
+from db_pool import ConnectionPool
+from table_stats import table_stats
+from context_planner import plan_context
+
+logger = logging.getLogger(__name__)
+
+
+def fragment_key(info: Dict[str, Any]) -> Tuple:
+    """Get what a table's fragment depends on: its columns, row count and date range."""
+    return (tuple(info["columns"]), info["record_count"], info["min_date"], info["max_date"])
+
+
+class DataContext:
+    """Cached LLM data context of one database.
+
+    Unchanged databases get the previous text back after a version check.
+    After a change, only tables whose row count, date range or columns
+    moved are aggregated and analyzed again; rows edited in place without
+    changing those are not noticed until another change does.
+    ``analyze(numeric_analysis, table)`` turns a table's column statistics
+    (see table_stats) into its insights.
+    """
+
+    def __init__(self, catalog: TableCatalog, pool: ConnectionPool,
+                 analyze: Callable[[Dict[str, Dict[str, float]], str], str]):
+        self.catalog = catalog
+        self.pool = pool
+        self.analyze = analyze
+        self._lock = threading.Lock()
+        self._version = None
+        self._text: Optional[str] = None
+        self._tables: Dict[str, Dict[str, Any]] = {}
+        self._fragments: Dict[str, Tuple[Tuple, str]] = {}
+        self.builds = 0
+        self.tables_analyzed = 0
+        self.plans = 0
+
+    def text(self) -> str:
+        """Get the context text for the current database version."""
+        version = self.catalog.version()
+        if version is not None and version == self._version:
+            return self._text
+
+        with self._lock:
+            if version is None or version != self._version:
+                self._text = self._build()
+                self._version = version
+                self.builds += 1
+            return self._text
+
+    def plan(self, message: str, budget: int) -> str:
+        """Get the context for a message: relevant tables in full, the rest summarized, within ``budget`` tokens."""
+        self.text()
+        with self._lock:
+            tables, fragments = self._tables, self._fragments
+            self.plans += 1
+        return plan_context(tables, {table: fragment for table, (_, fragment) in fragments.items()}, message, budget)
+
+    def _build(self) -> str:
+        """Stitch the context from table fragments, recomputing the stale ones."""
+        tables = self.catalog.tables()
+        fragments = {}
+        for table, info in tables.items():
+            if info["record_count"] <= 0:
+                continue
+            key = fragment_key(info)
+            cached = self._fragments.get(table)
+            if cached is not None and cached[0] == key:
+                fragments[table] = cached
+            else:
+                fragments[table] = (key, self._fragment(table, info))
+                self.tables_analyzed += 1
+        self._tables = tables
+        self._fragments = fragments
+
+        context = f"📊 Database Overview:\n"
+        context += f"Total tables: {len(tables)}\n\n"
+        return context + "".join(fragment for _, fragment in fragments.values())
+
+    def _fragment(self, table: str, info: Dict[str, Any]) -> str:
+        """Describe one table: records, date range, columns and statistical insights."""
+        # Get date range if date column exists
+        date_range = ""
+        if info["min_date"] and info["max_date"]:
+            date_range = f" ({str(info['min_date'])[:10]} to {str(info['max_date'])[:10]})"
+
+        stats = table_stats(self.pool, table, medians=False)
+        insights = self.analyze(stats["numeric_analysis"] if stats else {}, table)
+
+        fragment = f"📋 {table}:\n"
+        fragment += f"  • Records: {info['record_count']}{date_range}\n"
+        fragment += f"  • Columns: {', '.join(info['columns'])}\n"
+        if insights:
+            fragment += f"  • Insights: {insights}\n"
+        return fragment + "\n"
+
+    def stats(self) -> Dict[str, int]:
+        """Get how many times the context was built and planned, and how many table analyses that took."""
+        with self._lock:
+            return {"builds": self.builds, "tables_analyzed": self.tables_analyzed,
+                    "tables": len(self._fragments), "plans": self.plans}
@@ -5,65 +5,62 @@ FitTrackAI Data Explorer
 This tool helps you explore and understand your Apple Health data.
 """
 
-import sqlite3
-import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-import json
+from db_pool import ConnectionPool
+from table_stats import table_stats
 
 class DataExplorer:
     """Explore and analyze Apple Health data."""
     
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, pool: ConnectionPool = None):
         self.db_path = db_path
+        self.pool = pool if pool is not None else ConnectionPool(db_path)
     
     def get_database_overview(self):
         """Get a comprehensive overview of the database."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Get all tables
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-            tables = [row[0] for row in cursor.fetchall()]
-            
-            overview = {
-                "total_tables": len(tables),
-                "tables": []
-            }
-            
-            for table in tables:
-                # Get record count
-                cursor.execute(f"SELECT COUNT(*) FROM {table}")
-                record_count = cursor.fetchone()[0]
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
                 
-                # Get column info
-                cursor.execute(f"PRAGMA table_info({table})")
-                columns = [row[1] for row in cursor.fetchall()]
+                # Get all tables
+                cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+                tables = [row[0] for row in cursor.fetchall()]
                 
-                # Get date range if date column exists
-                date_range = None
-                if 'date' in columns:
-                    cursor.execute(f"SELECT MIN(date), MAX(date) FROM {table}")
-                    min_date, max_date = cursor.fetchone()
-                    if min_date and max_date:
-                        date_range = f"{min_date} to {max_date}"
-                
-                # Get sample data
-                cursor.execute(f"SELECT * FROM {table} LIMIT 3")
-                sample_data = cursor.fetchall()
-                
-                table_info = {
-                    "name": table,
-                    "record_count": record_count,
-                    "columns": columns,
-                    "date_range": date_range,
-                    "sample_data": sample_data
+                overview = {
+                    "total_tables": len(tables),
+                    "tables": []
                 }
                 
-                overview["tables"].append(table_info)
+                for table in tables:
+                    # Get record count
+                    cursor.execute(f"SELECT COUNT(*) FROM {table}")
+                    record_count = cursor.fetchone()[0]
+                    
+                    # Get column info
+                    cursor.execute(f"PRAGMA table_info({table})")
+                    columns = [row[1] for row in cursor.fetchall()]
+                    
+                    # Get date range if date column exists
+                    date_range = None
+                    if 'date' in columns:
+                        cursor.execute(f"SELECT MIN(date), MAX(date) FROM {table}")
+                        min_date, max_date = cursor.fetchone()
+                        if min_date and max_date:
+                            date_range = f"{min_date} to {max_date}"
+                    
+                    # Get sample data
+                    cursor.execute(f"SELECT * FROM {table} LIMIT 3")
+                    sample_data = cursor.fetchall()
+                    
+                    table_info = {
+                        "name": table,
+                        "record_count": record_count,
+                        "columns": columns,
+                        "date_range": date_range,
+                        "sample_data": sample_data
+                    }
+                    
+                    overview["tables"].append(table_info)
             
-            conn.close()
             return overview
             
         except Exception as e:
@@ -71,57 +68,25 @@ class DataExplorer:
             return None
     
     def analyze_table(self, table_name: str):
-        """Analyze a specific table in detail."""
+        """Analyze a specific table in detail.
+        
+        Every statistic is aggregated inside SQLite (see table_stats), so no
+        rows are loaded regardless of table size.
+        """
         try:
-            conn = sqlite3.connect(self.db_path)
-            
-            # Get all data
-            df = pd.read_sql_query(f"SELECT * FROM {table_name}", conn)
-            conn.close()
-            
-            if df.empty:
+            stats = table_stats(self.pool, table_name)
+            if not stats or stats["total_records"] == 0:
                 return f"No data found in table {table_name}"
-            
-            analysis = {
-                "table_name": table_name,
-                "total_records": len(df),
-                "columns": list(df.columns),
-                "data_types": df.dtypes.to_dict(),
-                "missing_values": df.isnull().sum().to_dict()
-            }
-            
-            # Date analysis
-            if 'date' in df.columns:
-                df['date'] = pd.to_datetime(df['date'])
-                analysis["date_range"] = {
-                    "start": df['date'].min().strftime('%Y-%m-%d'),
-                    "end": df['date'].max().strftime('%Y-%m-%d'),
-                    "total_days": (df['date'].max() - df['date'].min()).days
-                }
-            
-            # Numeric column analysis
-            numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
-            if 'date' in numeric_cols:
-                numeric_cols.remove('date')
-            
-            analysis["numeric_analysis"] = {}
-            for col in numeric_cols:
-                col_data = df[col].dropna()
-                if len(col_data) > 0:
-                    analysis["numeric_analysis"][col] = {
-                        "mean": float(col_data.mean()),
-                        "median": float(col_data.median()),
-                        "min": float(col_data.min()),
-                        "max": float(col_data.max()),
-                        "std": float(col_data.std()),
-                        "count": int(len(col_data))
-                    }
-            
-            return analysis
+            return {"table_name": table_name, **stats}
             
         except Exception as e:
             return f"Error analyzing table {table_name}: {e}"
     
+    def _column_stats(self, table_name: str, column: str):
+        """Get the SQLite-aggregated statistics of one numeric column, or None if it has no values."""
+        stats = table_stats(self.pool, table_name, [column], medians=False)
+        return stats["numeric_analysis"].get(column) if stats else None
+    
     def get_health_insights(self):
         """Get health insights from the data."""
         try:
@@ -129,11 +94,11 @@ class DataExplorer:
             
             # Steps analysis
             try:
-                df_steps = pd.read_sql_query("SELECT * FROM DailyStepCount", sqlite3.connect(self.db_path))
-                if not df_steps.empty:
-                    avg_steps = df_steps['total_value'].mean()
-                    max_steps = df_steps['total_value'].max()
-                    min_steps = df_steps['total_value'].min()
+                steps = self._column_stats("DailyStepCount", "total_value")
+                if steps:
+                    avg_steps = steps['mean']
+                    max_steps = steps['max']
+                    min_steps = steps['min']
                     
                     insights.append({
                         "metric": "Steps",
@@ -147,9 +112,9 @@ class DataExplorer:
             
             # Sleep analysis
             try:
-                df_sleep = pd.read_sql_query("SELECT * FROM DailySleepSummary", sqlite3.connect(self.db_path))
-                if not df_sleep.empty:
-                    avg_sleep_hours = df_sleep['sleep_minutes'].mean() / 60
+                sleep = self._column_stats("DailySleepSummary", "sleep_minutes")
+                if sleep:
+                    avg_sleep_hours = sleep['mean'] / 60
                     
                     insights.append({
                         "metric": "Sleep",
@@ -161,9 +126,9 @@ class DataExplorer:
             
             # Calories analysis
             try:
-                df_calories = pd.read_sql_query("SELECT * FROM DailyActiveCalories", sqlite3.connect(self.db_path))
-                if not df_calories.empty:
-                    avg_calories = df_calories['total_value'].mean()
+                calories = self._column_stats("DailyActiveCalories", "total_value")
+                if calories:
+                    avg_calories = calories['mean']
                     
                     insights.append({
                         "metric": "Active Calories",
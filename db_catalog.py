@@ -0,0 +1,93 @@
+"""
+FitTrackAI Table Catalog
+
+Schema, row-count and date-range metadata for every table, cached until the
+database version changes.
+"""
+
+import threading
+import logging
+from typing import Dict, Any, List, Optional
+
+from db_pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+
+class TableCatalog:
+    """Cached table metadata refreshed only when the database changes."""
+
+    def __init__(self, pool: ConnectionPool):
+        self.pool = pool
+        self._lock = threading.Lock()
+        self._version = None
+        self._tables: Dict[str, Dict[str, Any]] = {}
+
+    def version(self) -> Optional[tuple]:
+        """Get the current database version token."""
+        return self.pool.data_version()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Read table names, columns, row counts and date ranges."""
+        tables = {}
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+            names = [row[0] for row in cursor.fetchall()]
+
+            for name in names:
+                cursor.execute(f'PRAGMA table_info("{name}")')
+                info = cursor.fetchall()
+                columns = [row[1] for row in info]
+
+                cursor.execute(f'SELECT COUNT(*) FROM "{name}"')
+                record_count = cursor.fetchone()[0]
+
+                min_date = max_date = None
+                if 'date' in columns:
+                    cursor.execute(f'SELECT MIN(date), MAX(date) FROM "{name}"')
+                    min_date, max_date = cursor.fetchone()
+
+                tables[name] = {
+                    "name": name,
+                    "columns": columns,
+                    "column_types": {row[1]: row[2] for row in info},
+                    "record_count": record_count,
+                    "min_date": min_date,
+                    "max_date": max_date,
+                }
+        return tables
+
+    def tables(self) -> Dict[str, Dict[str, Any]]:
+        """Get metadata for all tables, refreshing it if the database changed."""
+        version = self.version()
+        with self._lock:
+            if version is None or version != self._version:
+                self._tables = self._load() if version is not None else {}
+                self._version = version
+            return self._tables
+
+    def table_names(self) -> List[str]:
+        """Get the names of all tables."""
+        return list(self.tables())
+
+    def get(self, table_name: str) -> Optional[Dict[str, Any]]:
+        """Get metadata for a single table."""
+        return self.tables().get(table_name)
+
+    def summary(self) -> Dict[str, Any]:
+        """Get the database summary served by /api/data_summary."""
+        tables = self.tables()
+        return {
+            "total_tables": len(tables),
+            "tables": [
+                {
+                    "name": info["name"],
+                    "record_count": info["record_count"],
+                    "columns": info["columns"],
+                    "date_range": (f"{info['min_date']} to {info['max_date']}"
+                                   if info["min_date"] and info["max_date"] else None),
+                }
+                for info in tables.values()
+            ],
+        }
@@ -0,0 +1,238 @@
+"""
+FitTrackAI Connection Pool
+
+Pooled, read-only SQLite connections shared by DataManager and DataExplorer.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+from urllib.parse import quote
+
+try:
+    from greenlet import getcurrent as _current_owner
+except ImportError:
+    _current_owner = threading.get_ident
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionPool:
+    """Bounded pool of read-only SQLite connections.
+
+    Each thread (or greenlet, under eventlet) holds at most one connection at
+    a time; nested ``connection()`` blocks on the same thread reuse it instead
+    of checking out a second one.
+    """
+
+    def __init__(self, db_path: str, max_size: int = 8, timeout: float = 10.0,
+                 mmap_size: int = 256 * 1024 * 1024, cache_size_kb: int = 64 * 1024,
+                 health_check_interval: float = 30.0):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.mmap_size = mmap_size
+        self.cache_size_kb = cache_size_kb
+        self.health_check_interval = health_check_interval
+
+        self._cond = threading.Condition()
+        self._idle: List[Dict[str, Any]] = []
+        self._owners: Dict[Any, Dict[str, Any]] = {}
+        self._size = 0
+        self._closed = False
+        self._wal_checked = False
+        self._version_lock = threading.Lock()
+        self._version_conn: Optional[Dict[str, Any]] = None
+
+    def _uri(self) -> str:
+        """Build the read-only URI for the database file."""
+        return f"file:{quote(os.path.abspath(self.db_path))}?mode=ro"
+
+    def _file_id(self) -> Optional[tuple]:
+        """Identify the database file so replaced files can be detected."""
+        try:
+            st = os.stat(self.db_path)
+            return (st.st_dev, st.st_ino)
+        except OSError:
+            return None
+
+    def _ensure_wal(self):
+        """Switch the database to WAL mode once so readers never block writers."""
+        if self._wal_checked or not os.path.exists(self.db_path):
+            return
+        self._wal_checked = True
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+                if mode.lower() != "wal":
+                    conn.execute("PRAGMA journal_mode=WAL")
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not enable WAL mode for {self.db_path}: {e}")
+
+    def _open(self) -> Dict[str, Any]:
+        """Open and configure a new read-only connection."""
+        self._ensure_wal()
+        conn = sqlite3.connect(self._uri(), uri=True, check_same_thread=False,
+                               timeout=self.timeout)
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size={-int(self.cache_size_kb)}")
+        conn.execute("PRAGMA query_only=1")
+        return {"conn": conn, "file_id": self._file_id(), "checked_at": time.monotonic()}
+
+    def _is_healthy(self, entry: Dict[str, Any]) -> bool:
+        """Check an idle connection before handing it out again."""
+        if entry["file_id"] != self._file_id():
+            return False
+        if time.monotonic() - entry["checked_at"] < self.health_check_interval:
+            return True
+        try:
+            entry["conn"].execute("SELECT 1").fetchone()
+            entry["checked_at"] = time.monotonic()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, entry: Dict[str, Any]):
+        """Close a connection and release its slot."""
+        try:
+            entry["conn"].close()
+        except sqlite3.Error:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def _acquire(self) -> Dict[str, Any]:
+        """Take an idle connection, open a new one, or wait for a free slot."""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._cond:
+                entry = self._idle.pop() if self._idle else None
+                if entry is None:
+                    if self._size < self.max_size:
+                        self._size += 1
+                    else:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise RuntimeError(
+                                f"Connection pool exhausted ({self.max_size} connections in use)")
+                        self._cond.wait(remaining)
+                        continue
+
+            if entry is None:
+                try:
+                    return self._open()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+
+            if self._is_healthy(entry):
+                return entry
+            self._discard(entry)
+
+    def _release(self, entry: Dict[str, Any]):
+        """Return a connection to the idle list, or close it if the pool is closed."""
+        with self._cond:
+            if not self._closed:
+                self._idle.append(entry)
+                self._cond.notify()
+                return
+        self._discard(entry)
+
+    @contextmanager
+    def connection(self):
+        """Yield a pooled read-only connection for the current thread/greenlet."""
+        owner = _current_owner()
+        held = self._owners.get(owner)
+        if held is not None:
+            yield held["conn"]
+            return
+
+        entry = self._acquire()
+        self._owners[owner] = entry
+        try:
+            yield entry["conn"]
+        finally:
+            self._owners.pop(owner, None)
+            self._release(entry)
+
+    def data_version(self) -> Optional[tuple]:
+        """Get a token that changes whenever the database contents change.
+
+        Combines the file identity and mtimes (database and WAL) with
+        ``PRAGMA data_version`` read from a dedicated connection, since that
+        pragma is only comparable on the same connection.
+        """
+        file_id = self._file_id()
+        if file_id is None:
+            return None
+
+        with self._version_lock:
+            entry = self._version_conn
+            if entry is not None and entry["file_id"] != file_id:
+                entry["conn"].close()
+                entry = self._version_conn = None
+            try:
+                if entry is None:
+                    entry = self._version_conn = self._open()
+                pragma_version = entry["conn"].execute("PRAGMA data_version").fetchone()[0]
+            except sqlite3.Error as e:
+                logger.warning(f"Could not read data_version for {self.db_path}: {e}")
+                pragma_version = None
+            if self._closed and self._version_conn is not None:
+                self._version_conn["conn"].close()
+                self._version_conn = None
+
+        stamps = []
+        for path in (self.db_path, self.db_path + "-wal"):
+            try:
+                st = os.stat(path)
+                stamps.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamps.append(None)
+        return (file_id, tuple(stamps), pragma_version)
+
+    def health_check(self) -> Dict[str, Any]:
+        """Probe every idle connection, dropping the ones that fail."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+        healthy = 0
+        for entry in idle:
+            entry["checked_at"] = 0.0
+            if self._is_healthy(entry):
+                healthy += 1
+                self._release(entry)
+            else:
+                self._discard(entry)
+        return {"healthy": healthy, "dropped": len(idle) - healthy, **self.stats()}
+
+    def stats(self) -> Dict[str, int]:
+        """Get pool occupancy figures."""
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "max_size": self.max_size,
+            }
+
+    def close(self):
+        """Close all idle connections; connections in use are closed when released."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for entry in idle:
+            self._discard(entry)
+        with self._version_lock:
+            if self._version_conn is not None:
+                self._version_conn["conn"].close()
+                self._version_conn = None
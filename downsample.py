@@ -0,0 +1,81 @@
+"""
+FitTrackAI Downsampling
+
+Largest-Triangle-Three-Buckets (LTTB) selection of the points that keep the
+shape of a line, vectorized over buckets and over columns.
+"""
+
+from typing import List
+
+import numpy as np
+
+MIN_POINTS = 10
+
+
+def _areas(ax, ay, px, py, cx, cy) -> np.ndarray:
+    """Get twice the area of the triangles (a, p, c); missing values give -inf."""
+    area = np.abs((ax - cx) * (py - ay) - (ax - px) * (cy - ay))
+    return np.where(np.isnan(area), -np.inf, area)
+
+
+def lttb(x: np.ndarray, ys: np.ndarray, max_points: int) -> List[np.ndarray]:
+    """Pick at most ``max_points`` indices of each column of ``ys`` to draw against ``x``.
+
+    ``x`` must be sorted (dates are used as nanoseconds). Returns one sorted
+    index array per column. Every column is handled in the same vectorized
+    pass: the classic algorithm anchors each bucket on the point chosen in
+    the bucket before, which is sequential, so this runs two passes instead,
+    anchoring on the previous bucket's mean and then on the first pass's
+    choices. The first and last points and each column's minimum and
+    maximum are always kept.
+    """
+    ys = np.asarray(ys, dtype=np.float64)
+    if ys.ndim == 1:
+        ys = ys[:, None]
+    n, k = ys.shape
+    if n <= max_points:
+        return [np.arange(n) for _ in range(k)]
+    max_points = max(max_points, MIN_POINTS)
+
+    x = np.asarray(x)
+    x = x.astype("datetime64[ns]").astype(np.int64) if x.dtype.kind == "M" else x
+    x = np.asarray(x, dtype=np.float64) if x.dtype.kind in "iuf" else np.arange(n, dtype=np.float64)
+    x = x - x[0]
+
+    # LTTB keeps the first and last points and one per bucket; two slots are left for the extremes
+    edges = np.linspace(1, n - 1, max_points - 3).astype(np.int64)
+    starts, sizes = edges[:-1], np.diff(edges)
+    offsets = np.arange(sizes.max())
+    members = starts[:, None] + np.minimum(offsets, sizes[:, None] - 1)  # (buckets, width)
+    padding = offsets >= sizes[:, None]
+
+    # Bucket means of x and of each column, skipping missing values
+    inner_x, inner_y = x[:n - 1], ys[:n - 1]
+    mean_x = np.add.reduceat(inner_x, starts) / sizes
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_y = (np.add.reduceat(np.nan_to_num(inner_y), starts, axis=0)
+                  / np.add.reduceat(~np.isnan(inner_y), starts, axis=0))
+
+    # Each bucket's third vertex is the next bucket's mean (the final point for the last bucket)
+    cx = np.append(mean_x[1:], x[-1])[:, None, None]
+    cy = np.vstack([mean_y[1:], ys[-1:]])[:, None, :]
+    px, py = x[members][:, :, None], ys[members]
+
+    # Pass 1 anchors on the previous bucket's mean, pass 2 on the point pass 1 picked there
+    ax = np.append(x[0], mean_x[:-1])[:, None, None]
+    ay = np.vstack([ys[:1], mean_y[:-1]])[:, None, :]
+    for _ in range(2):
+        areas = _areas(ax, ay, px, py, cx, cy)
+        areas[padding] = -np.inf
+        picked = members[np.arange(len(starts))[:, None], areas.argmax(axis=1)]  # (buckets, k)
+        ax = np.vstack([np.full((1, k), x[0]), x[picked[:-1]]])[:, None, :]
+        ay = np.vstack([ys[:1], np.take_along_axis(ys, picked[:-1], axis=0)])[:, None, :]
+
+    indices = []
+    for col in range(k):
+        keep = [picked[:, col], [0, n - 1]]
+        column = ys[:, col]
+        if not np.isnan(column).all():
+            keep.append([np.nanargmin(column), np.nanargmax(column)])
+        indices.append(np.unique(np.concatenate(keep)))
+    return indices
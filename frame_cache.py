@@ -0,0 +1,154 @@
+"""
+FitTrackAI DataFrame Cache
+
+Memory-bounded LRU cache of loaded tables, keyed by table and database version,
+and the compact typed schema the tables are cached in.
+"""
+
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Hashable, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    """Get the in-memory size of a DataFrame, including object payloads."""
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def _is_date_column(name: str) -> bool:
+    """Check whether a column holds dates by the naming used across the database."""
+    return name == "date" or name.endswith("_date")
+
+
+def _all_strings(values: pd.Series) -> bool:
+    """Check that every non-null value is a string."""
+    return bool(values.dropna().map(lambda v: isinstance(v, str)).all())
+
+
+def compact_column(name: str, series: pd.Series) -> pd.Series:
+    """Convert one column to its compact type, or return it unchanged.
+
+    Date columns are parsed into naive datetime64, floats become float32 and
+    integers int32 when every value round-trips exactly, and text columns
+    where most values repeat become categoricals.
+    """
+    kind = series.dtype.kind
+    if series.dtype == object and len(series) and _all_strings(series):
+        if _is_date_column(name):
+            try:
+                parsed = pd.to_datetime(series, format="ISO8601")
+            except (ValueError, TypeError):
+                return series
+            # Timestamps carrying UTC offsets stay as text
+            return parsed if parsed.dtype == "datetime64[ns]" else series
+        if series.nunique() <= len(series) // 2:
+            return series.astype("category")
+    elif kind == "f" and series.dtype.itemsize > 4:
+        values = series.to_numpy()
+        narrowed = values.astype(np.float32)
+        with np.errstate(over="ignore", invalid="ignore"):
+            exact = (narrowed == values) | np.isnan(values)
+        if exact.all():
+            return pd.Series(narrowed, index=series.index, name=series.name)
+    elif kind in "iu" and series.dtype.itemsize > 4 and len(series):
+        info = np.iinfo(np.int32)
+        if info.min <= series.min() and series.max() <= info.max:
+            return series.astype(np.int32)
+    return series
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Give a loaded table its typed schema (see compact_column).
+
+    Columns that are already compact are left as they are, so applying it
+    twice costs only the dtype checks.
+    """
+    columns = {}
+    changed = False
+    for name in df.columns:
+        series = df[name]
+        columns[name] = compact_column(name, series)
+        changed = changed or columns[name] is not series
+    return pd.DataFrame(columns, index=df.index) if changed else df
+
+
+class FrameCache:
+    """LRU cache of DataFrames bounded by their total memory footprint.
+
+    Frames are handed out as copies, so callers may modify them freely
+    without changing what is cached.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[pd.DataFrame]:
+        """Get a cached frame, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            frame = entry["frame"]
+        return frame.copy()
+
+    def put(self, key: Hashable, df: pd.DataFrame) -> pd.DataFrame:
+        """Store a frame and return a copy of it."""
+        nbytes = frame_nbytes(df)
+        if nbytes > self.max_bytes:
+            logger.info(f"Not caching {key}: {nbytes} bytes exceeds cache budget")
+            return df
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old["nbytes"]
+            self._entries[key] = {"frame": df, "nbytes": nbytes}
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted["nbytes"]
+                self.evictions += 1
+        return df.copy()
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """Get a cached frame, loading and caching it on a miss."""
+        df = self.get(key)
+        if df is None:
+            df = self.put(key, loader())
+        return df
+
+    def invalidate(self, predicate: Callable[[Hashable], bool] = None) -> int:
+        """Drop entries whose key matches the predicate (all entries by default)."""
+        with self._lock:
+            keys = [k for k in self._entries if predicate is None or predicate(k)]
+            for key in keys:
+                self._bytes -= self._entries.pop(key)["nbytes"]
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache occupancy and hit/miss/eviction counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
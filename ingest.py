@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+FitTrackAI Apple Health Ingester
+
+Streams an Apple Health export (export.xml, or the export.zip it ships in)
+into the raw Record table of the health database. The export is parsed with
+iterparse and cleared as it goes, so memory stays flat for multi-GB files.
+"""
+
+import os
+import sys
+import sqlite3
+import argparse
+import time
+import zipfile
+import logging
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+from typing import Dict, Any, IO, Iterator, Optional, Tuple
+
+from rollups import ensure_dirty_tracking, refresh_rollups
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = "data/db/processed_apple_health_data.db"
+DEFAULT_BATCH_SIZE = 100000
+
+# Records created this long before the watermark are re-checked on the next
+# ingest. Creation dates are compared as local wall-clock strings, and UTC
+# offsets span up to 26 hours, so the margin covers any reordering they cause.
+WATERMARK_MARGIN = timedelta(days=2)
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS Record (
+        type TEXT NOT NULL,
+        source_name TEXT NOT NULL,
+        unit TEXT,
+        value REAL,
+        value_text TEXT,
+        start_date TEXT NOT NULL,
+        end_date TEXT NOT NULL,
+        creation_date TEXT,
+        utc_offset TEXT NOT NULL DEFAULT ''
+    )""",
+    """CREATE TABLE IF NOT EXISTS IngestState (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )""",
+]
+
+# Dates are stored as local wall-clock time, which repeats in the DST fall-back
+# hour (and when travelling), so the start's UTC offset is part of the key
+DEDUP_INDEX = """CREATE UNIQUE INDEX IF NOT EXISTS idx_Record_dedup_utc
+    ON Record (type, start_date, end_date, source_name, utc_offset)"""
+
+INSERT_SQL = "INSERT OR IGNORE INTO Record VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+# Records ingested before utc_offset existed have an empty offset; the first
+# matching record of a later ingest fills it in instead of being inserted again
+CLAIM_SQL = ("UPDATE OR IGNORE Record SET utc_offset = ? WHERE type = ? AND start_date = ? AND end_date = ? "
+             "AND source_name = ? AND utc_offset = ''")
+
+RecordRow = Tuple[str, str, Optional[str], Optional[float], Optional[str], str, str, Optional[str], str]
+
+
+def normalize_date(value: Optional[str]) -> Optional[str]:
+    """Reduce an export timestamp ("2023-01-01 08:00:00 -0500") to local "YYYY-MM-DD HH:MM:SS"."""
+    return value[:19] if value else None
+
+
+def utc_offset(value: Optional[str]) -> str:
+    """Get the UTC offset of an export timestamp ("-0500"), or "" if it has none."""
+    return value[19:].strip() if value else ""
+
+
+def ensure_schema(conn: sqlite3.Connection):
+    """Create the Record and IngestState tables if they are missing.
+
+    Records from before the utc_offset column get it (empty), and the
+    deduplication index is rebuilt to include it. Also installs the rollup
+    dirty-day trigger, so every inserted record marks the days its Daily*
+    rollups need to recompute.
+    """
+    for statement in SCHEMA:
+        conn.execute(statement)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(Record)")]
+    if "utc_offset" not in columns:
+        conn.execute("ALTER TABLE Record ADD COLUMN utc_offset TEXT NOT NULL DEFAULT ''")
+        conn.execute("DROP INDEX IF EXISTS idx_Record_dedup")
+        if conn.execute("SELECT 1 FROM Record LIMIT 1").fetchone():
+            set_state(conn, "legacy_offsets", "1")
+    conn.execute(DEDUP_INDEX)
+    ensure_dirty_tracking(conn)
+    conn.commit()
+
+
+def get_state(conn: sqlite3.Connection, key: str) -> Optional[str]:
+    """Read a value from the IngestState table."""
+    row = conn.execute("SELECT value FROM IngestState WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def set_state(conn: sqlite3.Connection, key: str, value: Optional[str]):
+    """Write (or with None, delete) a value in the IngestState table."""
+    if value is None:
+        conn.execute("DELETE FROM IngestState WHERE key = ?", (key,))
+    else:
+        conn.execute("INSERT OR REPLACE INTO IngestState VALUES (?, ?)", (key, value))
+
+
+def open_export(path: str) -> IO[bytes]:
+    """Open export.xml, reading it straight out of export.zip when given the archive."""
+    if not zipfile.is_zipfile(path):
+        return open(path, "rb")
+    archive = zipfile.ZipFile(path)
+    names = [name for name in archive.namelist()
+             if os.path.basename(name) == "export.xml"]
+    if not names:
+        archive.close()
+        raise ValueError(f"No export.xml found in {path}")
+    return archive.open(names[0])
+
+
+def export_identity(path: str) -> str:
+    """Identify an export file so an interrupted ingest resumes only on the same file."""
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+
+
+def iter_records(stream: IO[bytes]) -> Iterator[RecordRow]:
+    """Yield every <Record> in an export as a row of the Record table.
+
+    Top-level elements are dropped from the tree as soon as they end, so
+    memory use does not grow with the size of the export.
+    """
+    depth = 0
+    root = None
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = elem
+            depth += 1
+            continue
+
+        depth -= 1
+        if depth != 1:
+            continue
+        if elem.tag == "Record":
+            attrib = elem.attrib
+            raw_value = attrib.get("value")
+            try:
+                value, value_text = float(raw_value), None
+            except (TypeError, ValueError):
+                value, value_text = None, raw_value
+            yield (
+                attrib.get("type"),
+                attrib.get("sourceName", ""),
+                attrib.get("unit"),
+                value,
+                value_text,
+                normalize_date(attrib.get("startDate")),
+                normalize_date(attrib.get("endDate")),
+                normalize_date(attrib.get("creationDate")),
+                utc_offset(attrib.get("startDate")),
+            )
+        root.clear()
+
+
+def ingest_export(export_path: str, db_path: str = DEFAULT_DB_PATH,
+                  batch_size: int = DEFAULT_BATCH_SIZE, full: bool = False) -> Dict[str, Any]:
+    """Load new records from an export into the database.
+
+    Records are inserted with executemany, one transaction per batch, and
+    deduplicated on (type, start_date, end_date, source_name, utc_offset). Unless ``full``
+    is set, records created well before the previous ingest's watermark are
+    skipped without touching the database. An interrupted ingest of the
+    same file resumes after the last committed batch.
+    """
+    started = time.perf_counter()
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        ensure_schema(conn)
+
+        watermark = None if full else get_state(conn, "watermark")
+        cutoff = None
+        if watermark:
+            cutoff = (datetime.fromisoformat(watermark) - WATERMARK_MARGIN).isoformat(sep=" ")
+
+        identity = export_identity(export_path)
+        resume_from = 0
+        if get_state(conn, "resume_file") == identity:
+            resume_from = int(get_state(conn, "resume_count") or 0)
+
+        legacy = get_state(conn, "legacy_offsets") is not None
+        stats = {"seen": 0, "skipped": 0, "resumed": resume_from, "inserted": 0}
+        newest = watermark
+        batch = []
+
+        def flush():
+            if batch and legacy:
+                conn.executemany(CLAIM_SQL, [(row[8], row[0], row[5], row[6], row[1]) for row in batch])
+            if batch:
+                # rowcount leaves out the rows the rollup trigger writes
+                stats["inserted"] += conn.executemany(INSERT_SQL, batch).rowcount
+            set_state(conn, "resume_file", identity)
+            set_state(conn, "resume_count", str(stats["seen"]))
+            conn.commit()
+            batch.clear()
+
+        with open_export(export_path) as stream:
+            for row in iter_records(stream):
+                stats["seen"] += 1
+                creation = row[7]
+                if creation and (newest is None or creation > newest):
+                    newest = creation
+                if stats["seen"] <= resume_from or (cutoff and creation and creation < cutoff):
+                    stats["skipped"] += 1
+                    continue
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    flush()
+
+        flush()
+        set_state(conn, "watermark", newest)
+        if legacy and not conn.execute("SELECT 1 FROM Record WHERE utc_offset = '' LIMIT 1").fetchone():
+            set_state(conn, "legacy_offsets", None)
+        set_state(conn, "resume_file", None)
+        set_state(conn, "resume_count", None)
+        conn.commit()
+    finally:
+        conn.close()
+
+    stats["duplicates"] = stats["seen"] - stats["skipped"] - stats["inserted"]
+    stats["watermark"] = newest
+    stats["seconds"] = time.perf_counter() - started
+    logger.info(f"Ingested {stats['inserted']} new records from {export_path}")
+    return stats
+
+
+def main():
+    """Ingest an Apple Health export into the default database."""
+    parser = argparse.ArgumentParser(description="Import an Apple Health export into FitTrackAI")
+    parser.add_argument("export", help="Path to export.xml or export.zip")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Database to load into")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Records per insert transaction")
+    parser.add_argument("--full", action="store_true",
+                        help="Ignore the watermark and re-check every record")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if not os.path.exists(args.export):
+        print(f"❌ Export not found at {args.export}")
+        return False
+
+    print(f"📥 Importing {args.export} into {args.db}...")
+    stats = ingest_export(args.export, args.db, args.batch_size, args.full)
+    print(f"✅ {stats['inserted']} new records in {stats['seconds']:.1f}s "
+          f"({stats['seen']} read, {stats['skipped']} skipped, {stats['duplicates']} duplicates)")
+
+    result = refresh_rollups(args.db)
+    print(f"✅ Daily rollups refreshed in {result['seconds'] * 1000:.1f} ms "
+          f"({result['dirty_days']} dirty days)")
+    return True
+
+
+if __name__ == "__main__":
+    if not main():
+        sys.exit(1)
@@ -0,0 +1,205 @@
+"""
+FitTrackAI LLM Executor
+
+Runs chat requests on a bounded pool of worker threads sized to the LLM
+server's parallelism, behind a FIFO queue of bounded depth. Requests beyond
+the queue are refused right away instead of piling up, and each request has
+a deadline. Handlers wait cooperatively (polling with the server's sleep),
+so a slow generation never ties up the server loop.
+"""
+
+import math
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Callable, Iterator, Optional
+
+# Seconds between checks of a job while a handler waits for it
+POLL_INTERVAL = 0.05
+
+
+class ExecutorBusy(RuntimeError):
+    """Raised when every worker is busy and the queue is full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"The assistant is busy, please retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class LLMJob:
+    """One request on the executor: queued, then running, then done.
+
+    ``position`` is the number of jobs ahead in the queue plus one while
+    waiting, and 0 once running. Streaming jobs put their items on
+    ``output``; cancelling asks them to stop after the current item.
+    """
+
+    def __init__(self, fn: Callable[["LLMJob"], Any], deadline: float):
+        self.fn = fn
+        self.deadline = deadline
+        self.future: Future = Future()
+        self.output: "queue.Queue[Any]" = queue.Queue()
+        self.cancelled = threading.Event()
+        self.position: Optional[int] = None
+
+    def expired(self) -> bool:
+        """Check whether the job's deadline has passed."""
+        return time.monotonic() >= self.deadline
+
+
+class LLMExecutor:
+    """Bounded executor for LLM calls with admission control.
+
+    At most ``max_workers`` jobs run at once and ``max_queue`` wait; further
+    submissions raise ExecutorBusy. Jobs still queued at their deadline fail
+    with TimeoutError without running.
+    """
+
+    def __init__(self, max_workers: int = 1, max_queue: int = 16, timeout: float = 120.0):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+        self._lock = threading.Lock()
+        self._waiting: "deque[LLMJob]" = deque()
+        self._running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.expired = 0
+        self._seconds = 0.0
+
+    def submit(self, fn: Callable[[LLMJob], Any], timeout: float = None) -> LLMJob:
+        """Queue ``fn(job)`` to run on a worker; raises ExecutorBusy when saturated."""
+        job = LLMJob(fn, time.monotonic() + (timeout or self.timeout))
+        with self._lock:
+            if self._running < self.max_workers:
+                self._start(job)
+            elif len(self._waiting) < self.max_queue:
+                self._waiting.append(job)
+                job.position = len(self._waiting)
+            else:
+                self.rejected += 1
+                raise ExecutorBusy(self._retry_after())
+        return job
+
+    def stream(self, make_items: Callable[[], Iterator[Any]], timeout: float = None) -> LLMJob:
+        """Queue a generator to run on a worker, its items going to ``job.output``."""
+        def run(job: LLMJob):
+            items = make_items()
+            try:
+                for item in items:
+                    if job.cancelled.is_set():
+                        break
+                    job.output.put(item)
+            finally:
+                close = getattr(items, "close", None)
+                if close:
+                    close()
+        return self.submit(run, timeout)
+
+    def cancel(self, job: LLMJob):
+        """Cancel a job: drop it from the queue, or ask a running stream to stop."""
+        job.cancelled.set()
+        with self._lock:
+            if job in self._waiting:
+                self._waiting.remove(job)
+                self._renumber()
+                job.future.cancel()
+
+    def _start(self, job: LLMJob):
+        """Run a job on a worker (lock held)."""
+        self._running += 1
+        job.position = 0
+        job.future.set_running_or_notify_cancel()
+        self._pool.submit(self._run, job)
+
+    def _run(self, job: LLMJob):
+        """Run a job, then start the next one still within its deadline."""
+        started = time.monotonic()
+        try:
+            job.future.set_result(job.fn(job))
+        except BaseException as e:
+            job.future.set_exception(e)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self.completed += 1
+                self._seconds += time.monotonic() - started
+                while self._waiting and self._running < self.max_workers:
+                    next_job = self._waiting.popleft()
+                    if next_job.expired():
+                        self.expired += 1
+                        next_job.future.set_running_or_notify_cancel()
+                        next_job.future.set_exception(TimeoutError("Timed out waiting for the assistant"))
+                        continue
+                    self._start(next_job)
+                self._renumber()
+
+    def _renumber(self):
+        """Update the queue positions of waiting jobs (lock held)."""
+        for position, job in enumerate(self._waiting, 1):
+            job.position = position
+
+    def _retry_after(self) -> int:
+        """Estimate the seconds until a queue slot frees up (lock held)."""
+        average = self._seconds / self.completed if self.completed else 1.0
+        return max(1, math.ceil(average * (len(self._waiting) + 1) / self.max_workers))
+
+    def iter_job(self, job: LLMJob, sleep: Callable[[float], None],
+                 poll: float = POLL_INTERVAL) -> Iterator[Any]:
+        """Yield a streaming job's items as they arrive, waiting with ``sleep``.
+
+        While no item is ready it yields ``{"queued": job.position}`` every
+        ``poll`` seconds, so the consumer can report the queue position and
+        notice cancellation. Raises TimeoutError at the deadline and any
+        error of the job; closing the iterator early cancels the job.
+        """
+        finished = False
+        try:
+            while True:
+                try:
+                    yield job.output.get_nowait()
+                    continue
+                except queue.Empty:
+                    pass
+                if job.future.done():
+                    # Drain what arrived between the check and completion
+                    while not job.output.empty():
+                        yield job.output.get_nowait()
+                    finished = True
+                    if not job.future.cancelled():
+                        job.future.result()
+                    return
+                if job.expired():
+                    with self._lock:
+                        self.expired += 1
+                    raise TimeoutError("Timed out waiting for the assistant")
+                yield {"queued": job.position}
+                sleep(poll)
+        finally:
+            if not finished:
+                self.cancel(job)
+
+    def wait(self, job: LLMJob, sleep: Callable[[float], None], poll: float = POLL_INTERVAL) -> Any:
+        """Wait for a job's result with ``sleep``; raises TimeoutError at the deadline.
+
+        A job still queued at its deadline is cancelled; a running one is left
+        to finish, since a blocking LLM call cannot be interrupted.
+        """
+        while not job.future.done():
+            if job.expired():
+                self.cancel(job)
+                with self._lock:
+                    self.expired += 1
+                raise TimeoutError("Timed out waiting for the assistant")
+            sleep(poll)
+        return job.future.result()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get worker, queue and admission counters."""
+        with self._lock:
+            return {"workers": self.max_workers, "running": self._running, "queued": len(self._waiting),
+                    "max_queue": self.max_queue, "completed": self.completed, "rejected": self.rejected,
+                    "expired": self.expired}
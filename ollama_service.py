@@ -0,0 +1,213 @@
+"""
+FitTrackAI Ollama Service
+
+Access to the Ollama server without paying for it at startup: the LangChain
+client is built on first use, a background probe of the cheap ``/api/tags``
+endpoint tracks whether the server is up, and a circuit breaker fails calls
+fast while it is down and lets them through again once it is back.
+"""
+
+import math
+import time
+import threading
+import logging
+from typing import Dict, Any, Callable, Iterator, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_URL = "http://localhost:11434"
+OLLAMA_MODEL = "llama2"
+
+
+class CircuitOpen(RuntimeError):
+    """Raised instead of calling Ollama while it is known to be down."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Ollama is not reachable, retrying in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _chat_ollama(base_url: str, model: str):
+    """Build the LangChain Ollama client (no request is made)."""
+    try:
+        from langchain_ollama import ChatOllama
+    except ImportError:
+        raise RuntimeError("❌ Ollama libraries not available. Please install: pip install langchain-ollama")
+    return ChatOllama(model=model, base_url=base_url)
+
+
+class OllamaService:
+    """Lazily built Ollama client behind a circuit breaker.
+
+    The breaker is closed while Ollama answers. A failed probe, or
+    ``failure_threshold`` failed calls in a row, opens it: calls raise
+    CircuitOpen until the retry time, then one trial (a probe or a call) is
+    let through, closing the breaker on success or reopening it with the
+    backoff doubled, up to ``max_backoff`` seconds.
+    """
+
+    def __init__(self, base_url: str = OLLAMA_URL, model: str = OLLAMA_MODEL,
+                 client_factory: Callable[[], Any] = None, failure_threshold: int = 3,
+                 backoff: float = 1.0, max_backoff: float = 60.0, interval: float = 30.0,
+                 probe_timeout: float = 2.0, clock: Callable[[], float] = time.monotonic):
+        self.base_url = base_url
+        self.model = model
+        self.client_factory = client_factory or (lambda: _chat_ollama(base_url, model))
+        self.failure_threshold = failure_threshold
+        self.base_backoff = backoff
+        self.max_backoff = max_backoff
+        self.interval = interval
+        self.probe_timeout = probe_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._client = None
+        self._state = "closed"
+        self._failures = 0
+        self._backoff = backoff
+        self._retry_at = 0.0
+        self._trial = False
+        self._running = False
+        self.model_available: Optional[bool] = None
+        self.probes = 0
+        self.rejected = 0
+
+    def client(self):
+        """Get the Ollama client, building it on first use."""
+        with self._lock:
+            if self._client is None:
+                self._client = self.client_factory()
+            return self._client
+
+    def check(self):
+        """Raise CircuitOpen if calls should fail fast; otherwise let a call (or the trial) through."""
+        with self._lock:
+            if self._state == "closed":
+                return
+            now = self.clock()
+            if self._state == "open" and now >= self._retry_at:
+                self._state = "half_open"
+            if self._state == "half_open" and not self._trial:
+                self._trial = True
+                return
+            self.rejected += 1
+            raise CircuitOpen(max(1, math.ceil(self._retry_at - now)))
+
+    def raise_if_down(self):
+        """Raise CircuitOpen while calls are being refused, without taking the trial."""
+        with self._lock:
+            now = self.clock()
+            if self._state == "open" and now < self._retry_at:
+                self.rejected += 1
+                raise CircuitOpen(max(1, math.ceil(self._retry_at - now)))
+
+    def available(self) -> bool:
+        """Check whether Ollama is believed to be up."""
+        with self._lock:
+            return self._state == "closed"
+
+    def _succeeded(self):
+        """Close the breaker after a successful call or probe."""
+        with self._lock:
+            if self._state != "closed":
+                logger.info("✅ Ollama is reachable again")
+            self._state = "closed"
+            self._failures = 0
+            self._backoff = self.base_backoff
+            self._trial = False
+
+    def _failed(self, error: Exception, trip: bool = False):
+        """Count a failure, opening the breaker at the threshold (or right away when ``trip``)."""
+        with self._lock:
+            self._failures += 1
+            if trip or self._state != "closed" or self._failures >= self.failure_threshold:
+                if self._state == "closed":
+                    logger.error(f"❌ Ollama is not reachable: {error}")
+                self._state = "open"
+                self._retry_at = self.clock() + self._backoff
+                self._backoff = min(self._backoff * 2, self.max_backoff)
+                self._trial = False
+
+    def call(self, fn: Callable[[Any], Any]) -> Any:
+        """Run ``fn(client)`` through the breaker."""
+        self.check()
+        try:
+            result = fn(self.client())
+        except Exception as e:
+            self._failed(e)
+            raise
+        self._succeeded()
+        return result
+
+    def stream(self, fn: Callable[[Any], Iterator[Any]]) -> Iterator[Any]:
+        """Yield the items of ``fn(client)`` through the breaker; the first item counts as success."""
+        self.check()
+        succeeded = failed = False
+        try:
+            for item in fn(self.client()):
+                if not succeeded:
+                    self._succeeded()
+                    succeeded = True
+                yield item
+        except Exception as e:
+            if not succeeded:
+                failed = True
+                self._failed(e)
+            raise
+        finally:
+            # Closed before the first item: no verdict, so let another trial through
+            if not (succeeded or failed):
+                with self._lock:
+                    self._trial = False
+        if not succeeded:
+            self._succeeded()
+
+    def probe(self) -> bool:
+        """Ask Ollama for its models; updates the breaker and returns whether it answered."""
+        self.probes += 1
+        try:
+            response = requests.get(f"{self.base_url}/api/tags", timeout=self.probe_timeout)
+            response.raise_for_status()
+            models = [model.get("name", "") for model in response.json().get("models", [])]
+        except Exception as e:
+            self._failed(e, trip=True)
+            return False
+        self.model_available = any(name.split(":")[0] == self.model for name in models)
+        if not self.model_available:
+            logger.error(f"💡 Ollama has no {self.model} model yet: ollama pull {self.model}")
+        self._succeeded()
+        return True
+
+    def _next_probe(self) -> float:
+        """Seconds until the next probe: the retry time while down, else the regular interval."""
+        with self._lock:
+            if self._state == "closed":
+                return self.interval
+            return max(self._retry_at - self.clock(), 0.1)
+
+    def run(self, sleep: Callable[[float], None]):
+        """Probe forever, sleeping with ``sleep`` in between."""
+        while True:
+            try:
+                self.probe()
+            except Exception as e:
+                logger.error(f"Error probing Ollama: {e}")
+            sleep(self._next_probe())
+
+    def start(self, start_task: Callable, sleep: Callable[[float], None]) -> bool:
+        """Start the probe loop with ``start_task`` unless it is already running."""
+        with self._lock:
+            if self._running:
+                return False
+            self._running = True
+        start_task(self.run, sleep)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the breaker state and probe counters."""
+        with self._lock:
+            now = self.clock()
+            return {"state": self._state, "failures": self._failures, "model_available": self.model_available,
+                    "retry_in": max(0.0, round(self._retry_at - now, 1)) if self._state != "closed" else 0.0,
+                    "probes": self.probes, "rejected": self.rejected}
@@ -0,0 +1,78 @@
+"""
+FitTrackAI Plot Batches
+
+Renders the plots of a dashboard concurrently on a worker pool, sharing
+table loads between them, and yields each result as soon as it is ready.
+"""
+
+import threading
+import logging
+from concurrent.futures import Future, Executor
+from typing import Dict, Any, Callable, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_PLOTS = 20
+POLL_INTERVAL = 0.01
+
+
+class SharedLoads:
+    """Memo of the table loads of one batch.
+
+    The first plot to ask for a load runs it; plots asking for the same
+    load meanwhile wait for that result instead of loading it again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loads: Dict[Any, Future] = {}
+        self.loads = 0
+        self.shared = 0
+
+    def get(self, key: Any, load: Callable[[], Any]) -> Any:
+        """Get the result of a load, running it only if no other plot has."""
+        with self._lock:
+            future = self._loads.get(key)
+            owner = future is None
+            if owner:
+                future = self._loads[key] = Future()
+                self.loads += 1
+            else:
+                self.shared += 1
+
+        if owner:
+            try:
+                future.set_result(load())
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+    def stats(self) -> Dict[str, int]:
+        """Get how many loads ran and how many were shared."""
+        with self._lock:
+            return {"loads": self.loads, "shared": self.shared}
+
+
+def render_batch(items: List[Any], render: Callable[[Any], Any], executor: Executor,
+                 sleep: Callable[[float], None], poll: float = POLL_INTERVAL) -> Iterator[Tuple[int, Any]]:
+    """Render every item on the executor, yielding (index, result) in completion order.
+
+    While no result is ready it waits ``poll`` seconds with ``sleep``, so
+    callers on an event loop pass its cooperative sleep. ``render`` should
+    turn its own failures into error results; anything it raises is logged
+    and yielded as ``None``.
+    """
+    pending = {executor.submit(render, item): i for i, item in enumerate(items)}
+    while pending:
+        done = [future for future in pending if future.done()]
+        if not done:
+            sleep(poll)
+            continue
+        for future in done:
+            index = pending.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"Error rendering batch item {index}: {e}")
+                result = None
+            yield index, result
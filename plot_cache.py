@@ -0,0 +1,159 @@
+"""
+FitTrackAI Plot Cache
+
+Serialized /api/plot payloads with their ETags, kept in a memory-bounded LRU
+that spills evicted entries to disk.
+"""
+
+import os
+import json
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def plot_key(*parts) -> str:
+    """Digest the parameters that determine a plot (including the data version) into a cache key."""
+    return hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()
+
+
+def body_etag(body: bytes) -> str:
+    """Get the strong ETag of a payload: a hash of its exact bytes."""
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+class PlotCache:
+    """LRU of serialized plot payloads bounded by size, with optional disk spill.
+
+    Entries evicted from memory are written to ``spill_dir`` (itself bounded
+    by ``max_spill_bytes``) and promoted back to memory when requested again.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, spill_dir: str = None,
+                 max_spill_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.max_spill_bytes = max_spill_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._spill_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if spill_dir and os.path.isdir(spill_dir):
+            self._spill_bytes = sum(entry.stat().st_size for entry in os.scandir(spill_dir)
+                                    if entry.name.endswith(".json"))
+
+    def _spill_path(self, key: str) -> str:
+        """Get the spill file of a key."""
+        return os.path.join(self.spill_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Tuple[str, bytes]]:
+        """Get the (etag, body) of a cached plot, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        if self.spill_dir:
+            try:
+                with open(self._spill_path(key), "rb") as f:
+                    body = f.read()
+            except OSError:
+                body = None
+            if body is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                return self._store(key, body)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, body: bytes) -> Tuple[str, bytes]:
+        """Cache a serialized plot and return its (etag, body)."""
+        return self._store(key, body)
+
+    def _store(self, key: str, body: bytes) -> Tuple[str, bytes]:
+        """Put an entry in memory, spilling whatever it pushes out."""
+        entry = (body_etag(body), body)
+        if len(body) > self.max_bytes:
+            return entry
+
+        evicted = []
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[1])
+            self._entries[key] = entry
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                old_key, (_, old_body) = self._entries.popitem(last=False)
+                self._bytes -= len(old_body)
+                self.evictions += 1
+                evicted.append((old_key, old_body))
+
+        for old_key, old_body in evicted:
+            self._spill(old_key, old_body)
+        return entry
+
+    def _spill(self, key: str, body: bytes):
+        """Write an evicted entry to disk, pruning the oldest spill files over budget."""
+        if not self.spill_dir or len(body) > self.max_spill_bytes:
+            return
+        path = self._spill_path(key)
+        if os.path.exists(path):
+            return
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not spill plot to disk: {e}")
+            return
+
+        with self._lock:
+            self._spill_bytes += len(body)
+            if self._spill_bytes <= self.max_spill_bytes:
+                return
+        files = sorted((entry for entry in os.scandir(self.spill_dir) if entry.name.endswith(".json")),
+                       key=lambda entry: entry.stat().st_mtime)
+        total = sum(entry.stat().st_size for entry in files)
+        for entry in files:
+            if total <= self.max_spill_bytes:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                total -= size
+            except OSError:
+                pass
+        with self._lock:
+            self._spill_bytes = total
+
+    def stats(self) -> Dict[str, Any]:
+        """Get occupancy and hit/miss counters."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "spill_bytes": self._spill_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,324 @@
+"""
+FitTrackAI Plot Images
+
+Static PNG/SVG/WebP rendering of plots on a pool of long-lived Kaleido
+processes, with a content-addressed disk cache of the rendered images.
+"""
+
+import os
+import io
+import json
+import hashlib
+import threading
+import time
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+from PIL import Image
+
+try:
+    from kaleido.scopes.plotly import PlotlyScope
+    KALEIDO_AVAILABLE = True
+except ImportError:
+    KALEIDO_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FORMATS = {"png": "image/png", "svg": "image/svg+xml", "webp": "image/webp"}
+DEFAULT_IMAGE_SIZE = (900, 500)
+THUMBNAIL_SIZE = (320, 180)
+MIN_IMAGE_SIDE = 50
+MAX_IMAGE_SIDE = 4000
+
+
+def parse_image_options(params: Dict[str, Any]) -> Tuple[str, int, int, bool]:
+    """Read (format, width, height, thumbnail) from request fields.
+
+    Thumbnails are rasters that fit ``width`` x ``height`` (THUMBNAIL_SIZE by
+    default). Raises ValueError for unknown formats or out-of-range sizes.
+    """
+    image_format = str(params.get("format") or "png").lower()
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(IMAGE_FORMATS)}")
+    thumbnail = str(params.get("thumbnail", "")).lower() in ("1", "true", "yes")
+    if thumbnail and image_format == "svg":
+        raise ValueError("thumbnails are png or webp")
+
+    default_width, default_height = THUMBNAIL_SIZE if thumbnail else DEFAULT_IMAGE_SIZE
+    try:
+        width = int(params.get("width") or default_width)
+        height = int(params.get("height") or default_height)
+    except (TypeError, ValueError):
+        raise ValueError("width and height must be integers")
+    if not (MIN_IMAGE_SIDE <= width <= MAX_IMAGE_SIDE and MIN_IMAGE_SIDE <= height <= MAX_IMAGE_SIDE):
+        raise ValueError(f"width and height must be between {MIN_IMAGE_SIDE} and {MAX_IMAGE_SIDE}")
+    return image_format, width, height, thumbnail
+
+
+def image_key(payload: str, image_format: str, width: int, height: int, thumbnail: bool = False) -> str:
+    """Digest a plot payload and the render options into the content address of its image."""
+    digest = hashlib.sha256(f"{image_format}:{width}x{height}:{int(thumbnail)}\n".encode())
+    digest.update(payload.encode() if isinstance(payload, str) else payload)
+    return digest.hexdigest()
+
+
+def plotlyjs_path() -> Optional[str]:
+    """Get the Plotly.js bundled with the plotly package, so Kaleido never fetches it from a CDN."""
+    try:
+        import plotly
+    except ImportError:
+        return None
+    path = os.path.join(os.path.dirname(plotly.__file__), "package_data", "plotly.min.js")
+    return path if os.path.exists(path) else None
+
+
+class RendererPool:
+    """Bounded pool of long-lived Kaleido renderer processes.
+
+    Each renderer is a headless Chromium that takes a second or so to start
+    and then renders an image in tens of milliseconds, so renderers are kept
+    and reused, one image at a time each.
+    """
+
+    def __init__(self, max_size: int = 2, timeout: float = 30.0):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._idle: List[Any] = []
+        self._size = 0
+        self._closed = False
+        self.renders = 0
+        self.failures = 0
+
+    def _open(self):
+        """Start a new renderer."""
+        if not KALEIDO_AVAILABLE:
+            raise RuntimeError("Image rendering is not available. Please install: pip install kaleido")
+        return PlotlyScope(plotlyjs=plotlyjs_path(), mathjax=False)
+
+    def _acquire(self):
+        """Take an idle renderer, start a new one, or wait for a free slot."""
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Renderer pool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise RuntimeError(f"Renderer pool exhausted ({self.max_size} renderers busy)")
+                self._cond.wait(remaining)
+
+        try:
+            return self._open()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, renderer):
+        """Return a renderer to the idle list, or stop it if the pool is closed."""
+        with self._cond:
+            if not self._closed:
+                self._idle.append(renderer)
+                self._cond.notify()
+                return
+        self._discard(renderer)
+
+    def _discard(self, renderer):
+        """Stop a renderer and release its slot."""
+        try:
+            renderer._shutdown_kaleido()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def render(self, figure: Dict[str, Any], image_format: str, width: int, height: int,
+               scale: float = 1.0) -> bytes:
+        """Render a figure dict to image bytes on a pooled renderer."""
+        renderer = self._acquire()
+        try:
+            image = renderer.transform(figure, format=image_format, width=width, height=height, scale=scale)
+        except ValueError:
+            # The figure was rejected; the renderer itself is fine
+            self._release(renderer)
+            with self._cond:
+                self.failures += 1
+            raise
+        except Exception:
+            self._discard(renderer)
+            with self._cond:
+                self.failures += 1
+            raise
+        self._release(renderer)
+        with self._cond:
+            self.renders += 1
+        return image
+
+    def warm(self) -> int:
+        """Start every renderer up front so no request pays the startup; returns how many started."""
+        renderers = []
+        try:
+            for _ in range(self.max_size):
+                renderer = self._acquire()
+                renderers.append(renderer)
+                renderer.transform({"data": [], "layout": {}}, format="png", width=MIN_IMAGE_SIDE,
+                                   height=MIN_IMAGE_SIDE)
+        except Exception as e:
+            logger.warning(f"Could not warm image renderers: {e}")
+        finally:
+            for renderer in renderers:
+                self._release(renderer)
+        return len(renderers)
+
+    def close(self):
+        """Stop the idle renderers; busy ones are stopped when released."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for renderer in idle:
+            self._discard(renderer)
+
+    def stats(self) -> Dict[str, int]:
+        """Get pool occupancy and render counters."""
+        with self._cond:
+            return {"size": self._size, "idle": len(self._idle), "max_size": self.max_size,
+                    "renders": self.renders, "failures": self.failures}
+
+
+class ImageCache:
+    """Content-addressed disk cache of rendered images, bounded by ``max_bytes``.
+
+    Images are stored as ``<key[:2]>/<key>.<format>``; hits refresh the file's
+    mtime so the least recently used images are pruned first.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._bytes = sum(entry.stat().st_size for entry in self._files())
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str, image_format: str) -> str:
+        """Get the file of an image."""
+        return os.path.join(self.cache_dir, key[:2], f"{key}.{image_format}")
+
+    def _files(self) -> List[os.DirEntry]:
+        """List every cached image file."""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        files = []
+        for shard in os.scandir(self.cache_dir):
+            if shard.is_dir():
+                files.extend(entry for entry in os.scandir(shard.path)
+                             if entry.is_file() and not entry.name.endswith(".tmp"))
+        return files
+
+    def get(self, key: str, image_format: str) -> Optional[bytes]:
+        """Get a cached image, or None on a miss."""
+        path = self._path(key, image_format)
+        try:
+            with open(path, "rb") as f:
+                image = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return image
+
+    def put(self, key: str, image_format: str, image: bytes):
+        """Store an image, pruning the least recently used ones over budget."""
+        if len(image) > self.max_bytes:
+            return
+        path = self._path(key, image_format)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(image)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not cache image: {e}")
+            return
+
+        with self._lock:
+            self._bytes += len(image)
+            if self._bytes <= self.max_bytes:
+                return
+        files = sorted(self._files(), key=lambda entry: entry.stat().st_mtime)
+        total = sum(entry.stat().st_size for entry in files)
+        for entry in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                total -= size
+            except OSError:
+                pass
+        with self._lock:
+            self._bytes = total
+
+    def stats(self) -> Dict[str, Any]:
+        """Get occupancy and hit/miss counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"bytes": self._bytes, "max_bytes": self.max_bytes, "hits": self.hits,
+                    "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+class PlotImages:
+    """Renders plot payloads to images through the renderer pool and the image cache.
+
+    Thumbnails are downscaled from the full-size PNG (itself cached), so the
+    layout matches the full plot and a thumbnail of a plot already rendered
+    needs no renderer at all.
+    """
+
+    def __init__(self, pool: RendererPool, cache: ImageCache = None):
+        self.pool = pool
+        self.cache = cache
+
+    def render(self, payload: str, image_format: str = "png", width: int = DEFAULT_IMAGE_SIZE[0],
+               height: int = DEFAULT_IMAGE_SIZE[1], thumbnail: bool = False) -> Tuple[str, bytes]:
+        """Get the (key, image) of a plot's JSON figure payload.
+
+        The key is the image's content address, usable as a strong ETag.
+        """
+        key = image_key(payload, image_format, width, height, thumbnail)
+        image = self.cache.get(key, image_format) if self.cache else None
+        if image is not None:
+            return key, image
+
+        if thumbnail:
+            _, full = self.render(payload, "png", *DEFAULT_IMAGE_SIZE)
+            image = self._thumbnail(full, image_format, width, height)
+        else:
+            image = self.pool.render(json.loads(payload), image_format, width, height)
+        if self.cache:
+            self.cache.put(key, image_format, image)
+        return key, image
+
+    def _thumbnail(self, png: bytes, image_format: str, width: int, height: int) -> bytes:
+        """Downscale a PNG to fit within width x height."""
+        with Image.open(io.BytesIO(png)) as picture:
+            picture.thumbnail((width, height), Image.LANCZOS)
+            out = io.BytesIO()
+            picture.save(out, format=image_format.upper(), optimize=True)
+        return out.getvalue()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get renderer pool and image cache statistics."""
+        return {"renderers": self.pool.stats(), "cache": self.cache.stats() if self.cache else None}
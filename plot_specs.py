@@ -0,0 +1,382 @@
+"""
+FitTrackAI Plot Specs
+
+Declarative specs for the fixed plot types, turned straight into Plotly
+figure JSON from NumPy arrays. Building ``go.Figure`` objects validates
+every property and the JSON encoder walks the result again; the specs here
+already are the validated, fully nested form, so neither step is needed.
+
+In the "binary" format, numeric arrays are sent as base64 typed arrays
+(``{"dtype": "f4", "bdata": ...}``, decoded natively by Plotly.js 2.28+)
+and dates as epoch milliseconds on a date axis (or just a start and step
+when evenly spaced), instead of decimal text.
+"""
+
+import json
+import base64
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from downsample import lttb
+
+# Fast JSON backend, optional
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+PLOT_FORMATS = ["json", "binary"]
+
+# Typed array dtypes Plotly.js decodes; other dtypes are widened to float64
+TYPED_ARRAY_DTYPES = {"int8": "i1", "uint8": "u1", "int16": "i2", "uint16": "u2",
+                      "int32": "i4", "uint32": "u4", "float32": "f4", "float64": "f8"}
+
+MOVING_AVERAGE_WINDOWS = {"day": (7, "7-Day"), "week": (4, "4-Week"), "month": (3, "3-Month"), "year": (2, "2-Year")}
+
+# Bands of (name, lower bound in hours, color), best first
+SLEEP_QUALITY = [
+    ("Excellent", 8, '#10b981'),
+    ("Good", 7, '#3b82f6'),
+    ("Fair", 6, '#f59e0b'),
+    ("Poor", None, '#ef4444'),
+]
+
+# Trace keys read by the builder; every other key is a Plotly trace attribute
+TRACE_OPTIONS = {"table", "column", "transform", "divide", "split"}
+
+PLOT_SPECS = {
+    "daily_steps": {
+        "title": "Daily Step Count",
+        "empty": "No step data available",
+        "traces": [
+            {"table": "DailyStepCount", "column": "total_value", "type": "scatter",
+             "mode": "lines+markers", "name": "Daily Steps",
+             "line": {"color": '#6366f1', "width": 2}, "marker": {"size": 6, "color": '#6366f1'}},
+            {"table": "DailyStepCount", "column": "total_value", "transform": "moving_average", "type": "scatter",
+             "mode": "lines", "name": "{window_label} Moving Average",
+             "line": {"color": '#ef4444', "width": 3, "dash": "dash"}},
+        ],
+        "layout": {
+            "title": {"text": "Daily Step Count with Moving Average"},
+            "xaxis": {"title": {"text": "Date"}},
+            "yaxis": {"title": {"text": "Steps"}},
+            "hovermode": "x unified",
+            "height": 500,
+        },
+    },
+    "sleep_analysis": {
+        "title": "Sleep Analysis",
+        "empty": "No sleep data available",
+        "traces": [
+            {"table": "DailySleepSummary", "column": "sleep_minutes", "divide": 60, "split": SLEEP_QUALITY,
+             "type": "bar", "opacity": 0.8},
+        ],
+        "layout": {
+            "title": {"text": "Sleep Duration Analysis"},
+            "xaxis": {"title": {"text": "Date"}},
+            "yaxis": {"title": {"text": "Sleep Hours"}},
+            "barmode": "stack",
+            "height": 500,
+        },
+    },
+    "calories_burned": {
+        "title": "Daily Calorie Burn",
+        "empty": "No calorie data available",
+        "traces": [
+            {"table": "DailyActiveCalories", "column": "total_value", "type": "scatter",
+             "mode": "lines+markers", "name": "Active Calories",
+             "line": {"color": '#f97316', "width": 2}, "marker": {"size": 6}},
+            {"table": "DailyBasalCalories", "column": "total_value", "type": "scatter",
+             "mode": "lines+markers", "name": "Basal Calories",
+             "line": {"color": '#8b5cf6', "width": 2}, "marker": {"size": 6}},
+        ],
+        "layout": {
+            "title": {"text": "Daily Calorie Burn"},
+            "xaxis": {"title": {"text": "Date"}},
+            "yaxis": {"title": {"text": "Calories"}},
+            "height": 500,
+        },
+    },
+    "distance_walked": {
+        "title": "Daily Distance",
+        "empty": "No distance data available",
+        "traces": [
+            {"table": "DailyDistanceWalkRun", "column": "total_value", "type": "scatter",
+             "mode": "lines+markers", "name": "Distance",
+             "line": {"color": '#06b6d4', "width": 2}, "marker": {"size": 6}},
+        ],
+        "layout": {
+            "title": {"text": "Daily Distance Walked/Run"},
+            "xaxis": {"title": {"text": "Date"}},
+            "yaxis": {"title": {"text": "Distance (km)"}},
+            "height": 500,
+        },
+    },
+    "flights_climbed": {
+        "title": "Daily Flights Climbed",
+        "empty": "No flights data available",
+        "traces": [
+            {"table": "DailyFlightsClimbed", "column": "total_value", "type": "bar",
+             "name": "Flights Climbed", "marker": {"color": '#84cc16'}, "opacity": 0.8},
+        ],
+        "layout": {
+            "title": {"text": "Daily Flights Climbed"},
+            "xaxis": {"title": {"text": "Date"}},
+            "yaxis": {"title": {"text": "Flights"}},
+            "height": 500,
+        },
+    },
+    "walking_metrics": {
+        "title": "Walking Metrics",
+        "traces": [
+            {"table": "DailyWalkingSpeed", "column": "avg_value", "type": "scatter",
+             "mode": "lines+markers", "name": "Walking Speed",
+             "line": {"color": '#ec4899', "width": 2}, "yaxis": "y"},
+            {"table": "DailyWalkingSteadiness", "column": "avg_value", "type": "scatter",
+             "mode": "lines+markers", "name": "Walking Steadiness",
+             "line": {"color": '#f59e0b', "width": 2}, "yaxis": "y2"},
+        ],
+        "layout": {
+            "title": {"text": "Walking Metrics"},
+            "xaxis": {"title": {"text": "Date"}},
+            "yaxis": {"title": {"text": "Speed (m/s)"}, "side": "left"},
+            "yaxis2": {"title": {"text": "Steadiness (%)"}, "side": "right", "overlaying": "y"},
+            "height": 500,
+        },
+    },
+}
+
+_template: Optional[Dict[str, Any]] = None
+
+
+def plot_template() -> Dict[str, Any]:
+    """Get the expanded plotly_white template that graph_objects embeds in every layout."""
+    global _template
+    if _template is None:
+        import plotly.io as pio
+        from plotly.utils import PlotlyJSONEncoder
+        _template = json.loads(json.dumps(pio.templates["plotly_white"], cls=PlotlyJSONEncoder))
+    return _template
+
+
+def spec_tables(spec: Dict[str, Any]) -> List[str]:
+    """Get the tables a spec plots, in order."""
+    return list(dict.fromkeys(trace["table"] for trace in spec["traces"]))
+
+
+def spec_columns(spec: Dict[str, Any], table: str) -> List[str]:
+    """Get the value columns a spec needs from a table."""
+    return list(dict.fromkeys(trace["column"] for trace in spec["traces"] if trace["table"] == table))
+
+
+def custom_spec(table_name: str, columns: List[str]) -> Dict[str, Any]:
+    """Build the spec of a custom plot: one line per numeric column of a table."""
+    title = table_name.replace('_', ' ').title()
+    return {
+        "title": title,
+        "traces": [
+            {"table": table_name, "column": col, "type": "scatter", "mode": "lines+markers",
+             "name": col.replace('_', ' ').title(), "marker": {"size": 6}}
+            for col in columns
+        ],
+        "layout": {
+            "title": {"text": title},
+            "xaxis": {"title": {"text": "Date"}},
+            "yaxis": {"title": {"text": "Value"}},
+            "height": 500,
+        },
+    }
+
+
+def parse_plot_format(params: Dict[str, Any]) -> str:
+    """Read the payload format of a plot request, "json" by default."""
+    plot_format = params.get("format") or params.get("plot_format") or "json"
+    if plot_format not in PLOT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(PLOT_FORMATS)}")
+    return plot_format
+
+
+def typed_array(values: np.ndarray) -> Dict[str, str]:
+    """Encode a numeric array as a Plotly typed array: little-endian bytes in base64.
+
+    Dates become float64 epoch milliseconds (exact for whole milliseconds;
+    Plotly.js has no int64 typed array) with NaT as NaN.
+    """
+    if values.dtype.kind == "M":
+        ms = values.astype("datetime64[ms]")
+        values = ms.astype(np.int64).astype(np.float64)
+        values[np.isnat(ms)] = np.nan
+    dtype = TYPED_ARRAY_DTYPES.get(values.dtype.name)
+    if dtype is None:
+        values, dtype = values.astype(np.float64), "f8"
+    data = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder("<"))
+    return {"dtype": dtype, "bdata": base64.b64encode(data.tobytes()).decode("ascii")}
+
+
+def plot_values(values, binary: bool = False):
+    """Convert an array to the JSON values graph_objects would emit for it.
+
+    Dates become ISO strings and missing values become None (JSON null).
+    With ``binary``, numeric and date arrays become typed arrays instead.
+    """
+    values = np.asarray(values)
+    if binary and values.dtype.kind in "iufbM":
+        return typed_array(values.astype(np.uint8) if values.dtype.kind == "b" else values)
+    if values.dtype.kind == "M":
+        missing = np.isnat(values)
+        values = np.datetime_as_string(values, unit="s").astype(object)
+    elif values.dtype.kind == "f":
+        missing = np.isnan(values)
+    else:
+        return values.tolist()
+    if missing.any():
+        values = values.astype(object)
+        values[missing] = None
+    return values.tolist()
+
+
+def even_step(dates: np.ndarray) -> Optional[int]:
+    """Get the step in milliseconds of evenly spaced dates without gaps, or None."""
+    if dates.dtype.kind != "M" or len(dates) < 3 or np.isnat(dates).any():
+        return None
+    ms = dates.astype("datetime64[ms]").astype(np.int64)
+    steps = np.diff(ms)
+    return int(steps[0]) if steps[0] > 0 and (steps == steps[0]).all() else None
+
+
+def _trace(attrs: Dict[str, Any], x, y, binary: bool, **overrides) -> Dict[str, Any]:
+    """Build one trace from its Plotly attributes and data.
+
+    In binary format, evenly spaced dates are sent as a start and step (x0/dx).
+    """
+    trace = {key: value for key, value in attrs.items() if key not in TRACE_OPTIONS}
+    trace.update(overrides)
+    step = even_step(np.asarray(x)) if binary else None
+    if step is not None:
+        trace["x0"] = plot_values(x[:1])[0]
+        trace["dx"] = step
+    else:
+        trace["x"] = plot_values(x, binary)
+    trace["y"] = plot_values(y, binary)
+    return trace
+
+
+def trace_values(trace_spec: Dict[str, Any], df: pd.DataFrame, resolution: str) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """Compute the y values of one trace spec from its table's frame, with any attribute overrides."""
+    series = df[trace_spec["column"]]
+    overrides = {}
+    if "divide" in trace_spec:
+        series = series / trace_spec["divide"]
+    if trace_spec.get("transform") == "moving_average":
+        window, window_label = MOVING_AVERAGE_WINDOWS[resolution]
+        series = series.rolling(window=window, min_periods=1).mean()
+        overrides["name"] = trace_spec["name"].format(window_label=window_label)
+    return series.to_numpy(), overrides
+
+
+def is_line(trace_spec: Dict[str, Any]) -> bool:
+    """Tell whether a trace is a line that can be downsampled; bars and banded splits keep every point."""
+    return trace_spec.get("type") == "scatter" and "split" not in trace_spec
+
+
+def downsample_lines(entries: List[list], max_points: int):
+    """Downsample the line traces of each table to at most max_points, in one LTTB pass per table.
+
+    Entries are [trace_spec, dates, values, overrides] and are updated in place.
+    """
+    groups: Dict[str, List[list]] = {}
+    for entry in entries:
+        if is_line(entry[0]) and len(entry[1]) > max_points:
+            groups.setdefault(entry[0]["table"], []).append(entry)
+    for lines in groups.values():
+        dates = lines[0][1]
+        picks = lttb(dates, np.column_stack([entry[2] for entry in lines]), max_points)
+        for entry, keep in zip(lines, picks):
+            entry[1], entry[2] = dates[keep], entry[2][keep]
+
+
+def split_bands(trace_spec: Dict[str, Any], values: np.ndarray) -> List[Tuple[np.ndarray, Dict[str, Any]]]:
+    """Split the values of a banded trace spec into (mask, attribute overrides) per non-empty band.
+
+    Values below every bound (or missing) fall in the last band.
+    """
+    remaining = np.ones(len(values), dtype=bool)
+    bands = []
+    for name, lower, color in trace_spec["split"]:
+        mask = remaining.copy() if lower is None else remaining & (values >= lower)
+        remaining &= ~mask
+        if mask.any():
+            bands.append((mask, {"name": name, "marker": dict(trace_spec.get("marker", {}), color=color)}))
+    return bands
+
+
+def build_traces(trace_spec: Dict[str, Any], dates: np.ndarray, values: np.ndarray, binary: bool = False,
+                 **overrides) -> List[Dict[str, Any]]:
+    """Build the traces of one trace spec from its dates and values."""
+    if "split" not in trace_spec:
+        return [_trace(trace_spec, dates, values, binary, **overrides)]
+    return [_trace(trace_spec, dates[mask], values[mask], binary, **band)
+            for mask, band in split_bands(trace_spec, values)]
+
+
+def trace_points(spec: Dict[str, Any], frames: Dict[str, pd.DataFrame],
+                 resolution: str = "day") -> List[Tuple[Dict[str, Any], np.ndarray, np.ndarray, Dict[str, Any]]]:
+    """Get the (trace_spec, dates, values, overrides) of each trace build_figure would emit, in order.
+
+    Banded specs are split into their bands; overrides always carry the trace name.
+    """
+    points = []
+    for trace_spec in spec["traces"]:
+        df = frames.get(trace_spec["table"])
+        if df is None or df.empty:
+            continue
+        dates = df['date'].to_numpy()
+        values, overrides = trace_values(trace_spec, df, resolution)
+        if "split" not in trace_spec:
+            points.append((trace_spec, dates, values, {"name": trace_spec.get("name"), **overrides}))
+            continue
+        for mask, band in split_bands(trace_spec, values):
+            points.append((trace_spec, dates[mask], values[mask], band))
+    return points
+
+
+def build_figure(spec: Dict[str, Any], frames: Dict[str, pd.DataFrame], resolution: str = "day",
+                 binary: bool = False, max_points: int = None) -> Dict[str, Any]:
+    """Build the figure dict of a spec from a frame (date + value columns) per table.
+
+    Traces of empty frames are left out. With ``max_points``, line traces
+    are downsampled with LTTB (after moving averages are computed over
+    every point).
+    """
+    entries = []
+    dated = False
+    for trace_spec in spec["traces"]:
+        df = frames.get(trace_spec["table"])
+        if df is not None and not df.empty:
+            entries.append([trace_spec, df['date'].to_numpy(), *trace_values(trace_spec, df, resolution)])
+            dated = dated or df['date'].dtype.kind == "M"
+    if max_points:
+        downsample_lines(entries, max_points)
+
+    data = []
+    for trace_spec, dates, values, overrides in entries:
+        data.extend(build_traces(trace_spec, dates, values, binary, **overrides))
+    layout = dict(spec["layout"], template=plot_template())
+    if binary and dated:
+        # Epoch milliseconds only read as dates on an explicit date axis
+        layout["xaxis"] = dict(layout.get("xaxis", {}), type="date")
+    return {"data": data, "layout": layout}
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize plain JSON data to bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def figure_json(figure: Dict[str, Any]) -> str:
+    """Serialize a figure dict."""
+    return dumps(figure).decode()
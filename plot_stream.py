@@ -0,0 +1,228 @@
+"""
+FitTrackAI Plot Streams
+
+Live plot subscriptions: when a database changes, each subscribed client is
+sent only the points added since its figure was built, as a
+``Plotly.extendTraces`` update, instead of the whole figure again.
+"""
+
+import threading
+import logging
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from plot_specs import MOVING_AVERAGE_WINDOWS, spec_tables, spec_columns, trace_points, build_traces, plot_values
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks of the subscribed databases for changes
+POLL_INTERVAL = 2.0
+
+
+def _same(a, b) -> bool:
+    """Compare two plotted values, treating missing values as equal and ignoring float rounding."""
+    if pd.isna(a) or pd.isna(b):
+        return pd.isna(a) and pd.isna(b)
+    return bool(np.isclose(a, b, rtol=1e-9, atol=0.0))
+
+
+class PlotSubscription:
+    """One client figure of a spec, kept up to date incrementally.
+
+    Remembers the last point of each trace the client has and, per table,
+    the rows before the newest date that trailing moving averages still
+    need, so each update loads only the rows from the newest date on.
+    ``load(table, columns, start, end)`` returns the date and value columns
+    of a table (per bucket of the figure's resolution), ordered by date.
+    """
+
+    def __init__(self, spec: Dict[str, Any], resolution: str, traces: List[str],
+                 load: Callable[[str, List[str], Any, Any], pd.DataFrame], start=None, end=None):
+        self.spec = spec
+        self.resolution = resolution
+        self.traces = list(traces)
+        self.load = load
+        self.start = start
+        self.end = end
+        moving = any(trace.get("transform") == "moving_average" for trace in spec["traces"])
+        self.keep = MOVING_AVERAGE_WINDOWS[resolution][0] - 1 if moving else 0
+        self._history: Dict[str, pd.DataFrame] = {}
+        self._newest: Dict[str, Any] = {}
+        self._last: Dict[str, Tuple[str, Any, Any]] = {}
+
+    def _frames(self, since=None) -> Dict[str, pd.DataFrame]:
+        """Load each table up to ``since`` (the client's figure), or the rows from the newest loaded on."""
+        frames = {}
+        for table in spec_tables(self.spec):
+            columns = spec_columns(self.spec, table)
+            if since is not None:
+                df = self.load(table, columns, self.start, since)
+            else:
+                df = self.load(table, columns, self._newest.get(table, self.start), self.end)
+                history = self._history.get(table)
+                if history is not None and not df.empty:
+                    df = pd.concat([history, df], ignore_index=True)
+            frames[table] = df
+        return frames
+
+    def _advance(self, frames: Dict[str, pd.DataFrame]):
+        """Remember each table's newest date and the rows before it the moving averages need."""
+        for table, df in frames.items():
+            if df.empty:
+                continue
+            newest = df['date'].max()
+            self._newest[table] = newest
+            self._history[table] = df[df['date'] < newest].tail(self.keep)
+
+    def start_from(self, since) -> None:
+        """Set the state of a client whose figure ends at ``since``."""
+        frames = self._frames(since)
+        for trace_spec, dates, values, overrides in trace_points(self.spec, frames, self.resolution):
+            if len(dates):
+                self._last[overrides["name"]] = (trace_spec["table"], dates[-1], values[-1])
+        self._advance(frames)
+
+    def update(self) -> Optional[Dict[str, Any]]:
+        """Get the update bringing the client's figure to the current data, or None if nothing changed.
+
+        Returns ``{"reset": True}`` when an already plotted point changed in a
+        way extendTraces cannot express, so the client must refetch the figure.
+        """
+        frames = self._frames()
+        indices, xs, ys, revise, add = [], [], [], [], []
+        last_points = dict(self._last)
+        for trace_spec, dates, values, overrides in trace_points(self.spec, frames, self.resolution):
+            name = overrides["name"]
+            newest = self._newest.get(trace_spec["table"])
+            if newest is not None:
+                fresh = dates >= newest
+                dates, values = dates[fresh], values[fresh]
+            if not len(dates):
+                continue
+
+            last = self._last.get(name)
+            if last is None:
+                if name in self.traces:
+                    return {"reset": True}
+                add.append(build_traces(trace_spec, dates, values, **overrides)[0])
+                self.traces.append(name)
+            else:
+                index = self.traces.index(name)
+                _, last_date, last_value = last
+                at_last = dates == last_date
+                if at_last.any():
+                    last_points.pop(name)
+                    if not _same(values[at_last][0], last_value):
+                        revise.append({"index": index, "y": plot_values(values[at_last])[0]})
+                new = dates > last_date
+                if new.any():
+                    indices.append(index)
+                    xs.append(plot_values(dates[new]))
+                    ys.append(plot_values(values[new]))
+            self._last[name] = (trace_spec["table"], dates[-1], values[-1])
+
+        # A reloaded last point that is gone moved to another trace or was deleted
+        for table, last_date, _ in last_points.values():
+            newest = self._newest.get(table)
+            if newest is not None and last_date >= newest:
+                return {"reset": True}
+
+        self._advance(frames)
+        if not (indices or revise or add):
+            return None
+        return {"indices": indices, "update": {"x": xs, "y": ys}, "revise": revise, "add": add}
+
+
+class PlotStreams:
+    """Registry of live plot subscriptions, updated whenever their database changes.
+
+    ``emit(event, data, sid)`` delivers an update to one client. Subscriptions
+    are keyed by client session and a client-chosen plot ID.
+    """
+
+    def __init__(self, emit: Callable[[str, Dict[str, Any], str], None], interval: float = POLL_INTERVAL):
+        self.emit = emit
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._subscriptions: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._running = False
+        self.updates = 0
+        self.resets = 0
+
+    def subscribe(self, sid: str, plot_id: str, manager, subscription: PlotSubscription) -> Optional[Dict[str, Any]]:
+        """Register a subscription and return its catch-up update, if any.
+
+        A subscription whose figure is already out of date beyond extending
+        is not registered; its update is a reset.
+        """
+        version = manager.data_version()
+        update = subscription.update()
+        if update and update.get("reset"):
+            self.resets += 1
+            return update
+        with self._lock:
+            self._subscriptions[(sid, plot_id)] = {"manager": manager, "subscription": subscription,
+                                                   "version": version}
+        return update
+
+    def unsubscribe(self, sid: str, plot_id: str = None) -> int:
+        """Drop one subscription of a client, or all of them; returns how many were dropped."""
+        with self._lock:
+            keys = [key for key in self._subscriptions if key[0] == sid and plot_id in (None, key[1])]
+            for key in keys:
+                del self._subscriptions[key]
+        return len(keys)
+
+    def poll(self) -> int:
+        """Send updates to the subscriptions whose database changed; returns how many were sent."""
+        with self._lock:
+            subscriptions = list(self._subscriptions.items())
+        versions = {}
+        sent = 0
+        for (sid, plot_id), entry in subscriptions:
+            manager = entry["manager"]
+            if id(manager) not in versions:
+                versions[id(manager)] = manager.data_version()
+            version = versions[id(manager)]
+            if version == entry["version"]:
+                continue
+            entry["version"] = version
+            try:
+                update = entry["subscription"].update()
+            except Exception as e:
+                logger.error(f"Error updating plot subscription {plot_id}: {e}")
+                update = {"reset": True}
+            if update is None:
+                continue
+            if update.get("reset"):
+                self.unsubscribe(sid, plot_id)
+                self.resets += 1
+            self.emit('plot_update', {"id": plot_id, **update}, sid)
+            self.updates += 1
+            sent += 1
+        return sent
+
+    def run(self, sleep: Callable[[float], None]):
+        """Poll forever, sleeping with ``sleep`` in between."""
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Error polling plot subscriptions: {e}")
+            sleep(self.interval)
+
+    def start(self, start_task: Callable, sleep: Callable[[float], None]) -> bool:
+        """Start the polling loop with ``start_task`` unless it is already running."""
+        with self._lock:
+            if self._running:
+                return False
+            self._running = True
+        start_task(self.run, sleep)
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        """Get subscription and update counters."""
+        with self._lock:
+            return {"subscriptions": len(self._subscriptions), "updates": self.updates, "resets": self.resets}
@@ -0,0 +1,143 @@
+"""
+FitTrackAI Response Cache
+
+LLM answers kept in a local SQLite file, so a question asked again about
+unchanged data is answered in milliseconds instead of a full generation.
+Entries expire after a TTL, the least recently used ones are evicted over a
+size budget, and a database's entries are dropped as soon as its data
+version changes.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import logging
+from typing import Dict, Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_message(message: str) -> str:
+    """Reduce a chat message to what matters for its answer: case, spacing and punctuation ending words are dropped."""
+    return re.sub(r"[?!.,;:]+(?=\s|$)", "", re.sub(r"\s+", " ", message).strip()).lower()
+
+
+def response_key(message: str, context: str, model: str) -> str:
+    """Digest the normalized message, the data context and the model name into a cache key."""
+    context_hash = hashlib.sha256(context.encode()).hexdigest()
+    return hashlib.sha256(json.dumps([normalize_message(message), context_hash, model]).encode()).hexdigest()
+
+
+class ResponseCache:
+    """SQLite store of LLM responses, bounded by ``max_bytes`` of text and ``ttl`` seconds.
+
+    Entries belong to a scope (the database they describe) and are tagged
+    with its data version; the first lookup or store with a new version
+    deletes the scope's older entries. The file is opened on first use.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 16 * 1024 * 1024, ttl: float = 24 * 3600,
+                 clock: Callable[[], float] = time.time):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._versions: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+        self.evictions = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the cache file and its table (lock held)."""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY, scope TEXT NOT NULL, version TEXT NOT NULL, response TEXT NOT NULL,
+                size INTEGER NOT NULL, created REAL NOT NULL, used REAL NOT NULL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_scope ON responses (scope, version)")
+            self._conn = conn
+        return self._conn
+
+    def _invalidate(self, conn: sqlite3.Connection, scope: str, version: str):
+        """Delete a scope's entries from other data versions, once per version change (lock held)."""
+        if self._versions.get(scope) == version:
+            return
+        deleted = conn.execute("DELETE FROM responses WHERE scope = ? AND version != ?", (scope, version)).rowcount
+        self.invalidated += deleted
+        self._versions[scope] = version
+
+    def get(self, scope: str, version: Any, key: str) -> Optional[str]:
+        """Get a cached response for the data version, or None on a miss."""
+        version = str(version)
+        now = self.clock()
+        with self._lock:
+            try:
+                conn = self._connection()
+                self._invalidate(conn, scope, version)
+                row = conn.execute("SELECT response FROM responses WHERE key = ? AND scope = ? AND version = ? "
+                                   "AND created >= ?", (key, scope, version, now - self.ttl)).fetchone()
+                if row is not None:
+                    conn.execute("UPDATE responses SET used = ? WHERE key = ?", (now, key))
+            except sqlite3.Error as e:
+                logger.warning(f"Could not read cached response: {e}")
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, scope: str, version: Any, key: str, response: str):
+        """Store a response, dropping expired entries and the least recently used ones over budget."""
+        version = str(version)
+        size = len(response.encode())
+        if size > self.max_bytes:
+            return
+        now = self.clock()
+        with self._lock:
+            try:
+                conn = self._connection()
+                self._invalidate(conn, scope, version)
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                 (key, scope, version, response, size, now, now))
+                    expired = conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,)).rowcount
+                    # Keep the most recently used entries that fit the budget
+                    evicted = conn.execute("""DELETE FROM responses WHERE key IN (
+                        SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY used DESC, created DESC) AS running
+                                         FROM responses) WHERE running > ?)""", (self.max_bytes,)).rowcount
+                    conn.execute("COMMIT")
+                except sqlite3.Error:
+                    conn.execute("ROLLBACK")
+                    raise
+            except sqlite3.Error as e:
+                logger.warning(f"Could not cache response: {e}")
+                return
+            self.evictions += expired + evicted
+
+    def stats(self) -> Dict[str, Any]:
+        """Get occupancy and hit/miss counters."""
+        with self._lock:
+            entries = size = 0
+            if self._conn is not None:
+                try:
+                    entries, size = self._conn.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+                except sqlite3.Error:
+                    pass
+            lookups = self.hits + self.misses
+            return {"entries": entries, "bytes": size, "max_bytes": self.max_bytes, "hits": self.hits,
+                    "misses": self.misses, "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                    "invalidated": self.invalidated, "evictions": self.evictions}
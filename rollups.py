@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+FitTrackAI Daily Rollups
+
+Builds the Daily* tables read by the app from the raw Record table and keeps
+them current incrementally: inserting a record marks its (type, day) dirty,
+and a refresh recomputes only the dirty days.
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import argparse
+import time
+import logging
+from typing import Dict, Any
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = "data/db/processed_apple_health_data.db"
+
+QUANTITY_COLUMNS = {
+    "total_value": ("REAL", "SUM(value)"),
+    "avg_value": ("REAL", "AVG(value)"),
+    "min_value": ("REAL", "MIN(value)"),
+    "max_value": ("REAL", "MAX(value)"),
+    "count": ("INTEGER", "COUNT(*)"),
+}
+
+# Declarative rollup specs, one per Daily* table:
+#   type     - Record type to aggregate
+#   columns  - output column -> (declared type, aggregate over Record columns)
+#   where    - optional extra condition on Record columns
+#   day      - "start_date" (default) or "end_date": which timestamp dates a record
+#   per_source - optional output column: each day keeps only the records of the
+#              source (source_name) with the largest value of it. An iPhone and a
+#              Watch record the same steps, distance, energy and sleep, so adding
+#              up every source would count that activity twice.
+# Adding an entry (or changing one) makes the next refresh build that table in full.
+ROLLUPS = {
+    "DailyStepCount": {"type": "HKQuantityTypeIdentifierStepCount", "columns": QUANTITY_COLUMNS,
+                       "per_source": "total_value"},
+    "DailyActiveCalories": {"type": "HKQuantityTypeIdentifierActiveEnergyBurned", "columns": QUANTITY_COLUMNS,
+                            "per_source": "total_value"},
+    "DailyBasalCalories": {"type": "HKQuantityTypeIdentifierBasalEnergyBurned", "columns": QUANTITY_COLUMNS,
+                           "per_source": "total_value"},
+    "DailyDistanceWalkRun": {"type": "HKQuantityTypeIdentifierDistanceWalkingRunning", "columns": QUANTITY_COLUMNS,
+                             "per_source": "total_value"},
+    "DailyFlightsClimbed": {"type": "HKQuantityTypeIdentifierFlightsClimbed", "columns": QUANTITY_COLUMNS,
+                            "per_source": "total_value"},
+    "DailyWalkingSpeed": {"type": "HKQuantityTypeIdentifierWalkingSpeed", "columns": QUANTITY_COLUMNS},
+    "DailyWalkingSteadiness": {"type": "HKQuantityTypeIdentifierAppleWalkingSteadiness", "columns": QUANTITY_COLUMNS},
+    "DailySleepSummary": {
+        "type": "HKCategoryTypeIdentifierSleepAnalysis",
+        "columns": {
+            "sleep_minutes": ("REAL", "SUM((julianday(end_date) - julianday(start_date)) * 1440)"),
+            "sessions": ("INTEGER", "COUNT(*)"),
+        },
+        "where": "value_text LIKE 'HKCategoryValueSleepAnalysisAsleep%'",
+        "day": "end_date",
+        "per_source": "sleep_minutes",
+    },
+}
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS RollupDirty (
+        type TEXT NOT NULL,
+        day TEXT NOT NULL,
+        PRIMARY KEY (type, day)
+    ) WITHOUT ROWID""",
+    """CREATE TRIGGER IF NOT EXISTS Record_mark_dirty AFTER INSERT ON Record
+    BEGIN
+        INSERT OR IGNORE INTO RollupDirty VALUES (NEW.type, date(NEW.start_date));
+        INSERT OR IGNORE INTO RollupDirty VALUES (NEW.type, date(NEW.end_date));
+    END""",
+    """CREATE TABLE IF NOT EXISTS RollupState (
+        table_name TEXT PRIMARY KEY,
+        spec TEXT NOT NULL
+    )""",
+]
+
+
+def ensure_dirty_tracking(conn: sqlite3.Connection):
+    """Install the dirty-day table and the trigger that fills it (Record must exist)."""
+    for statement in SCHEMA:
+        conn.execute(statement)
+
+
+def spec_signature(spec: Dict[str, Any]) -> str:
+    """Serialize a spec so changes to it can be detected."""
+    return json.dumps(spec, sort_keys=True)
+
+
+def _select_sql(spec: Dict[str, Any]) -> str:
+    """Build the aggregate column list of a rollup."""
+    return ", ".join(expr for _, expr in spec["columns"].values())
+
+
+def _aggregate_sql(spec: Dict[str, Any], day: str, source: str) -> str:
+    """Build the SELECT of a rollup's rows, one per ``day`` expression, over ``source`` (FROM ... WHERE ...).
+
+    With ``per_source`` the records are aggregated per source first and only
+    each day's top source is kept.
+    """
+    if not spec.get("per_source"):
+        return f'SELECT {day} AS day, {_select_sql(spec)} {source} GROUP BY {day}'
+    named = ", ".join(f'{expr} AS "{col}"' for col, (_, expr) in spec["columns"].items())
+    columns = ", ".join(f'"{col}"' for col in spec["columns"])
+    rank = spec["columns"][spec["per_source"]][1]
+    return (f'SELECT day, {columns} FROM (SELECT {day} AS day, {named}, ROW_NUMBER() OVER ('
+            f'PARTITION BY {day} ORDER BY {rank} DESC, source_name) AS source_rank '
+            f'{source} GROUP BY {day}, source_name) WHERE source_rank = 1')
+
+
+def _column_list(spec: Dict[str, Any]) -> str:
+    """Build the quoted output column list of a rollup, date first."""
+    return ", ".join(['"date"'] + [f'"{col}"' for col in spec["columns"]])
+
+
+def _rebuild_table(conn: sqlite3.Connection, table: str, spec: Dict[str, Any]):
+    """Recreate a rollup table and fill it from every matching record."""
+    day = spec.get("day", "start_date")
+    where = f' AND ({spec["where"]})' if spec.get("where") else ""
+    columns = ", ".join(f'"{col}" {sql_type}' for col, (sql_type, _) in spec["columns"].items())
+
+    conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+    conn.execute(f'CREATE TABLE "{table}" ("date" TEXT NOT NULL, {columns})')
+    conn.execute(f'CREATE UNIQUE INDEX "idx_{table}_date" ON "{table}"("date")')
+    conn.execute(
+        f'INSERT INTO "{table}" ({_column_list(spec)}) '
+        + _aggregate_sql(spec, f"date({day})", f"FROM Record WHERE type = ?{where}"),
+        (spec["type"],))
+    conn.execute("INSERT OR REPLACE INTO RollupState VALUES (?, ?)", (table, spec_signature(spec)))
+
+
+def _refresh_days(conn: sqlite3.Connection, table: str, spec: Dict[str, Any]) -> int:
+    """Recompute the dirty days of one rollup table, returning how many were dirty.
+
+    Each dirty day reads only its own records through the (type, start_date)
+    prefix of the Record dedup index. Records dated by end_date can start
+    the day before, so that range reaches one day further back.
+    """
+    day = spec.get("day", "start_date")
+    where = f' AND ({spec["where"]})' if spec.get("where") else ""
+    lower = "d.day" if day == "start_date" else "date(d.day, '-1 day')"
+
+    dirty = conn.execute("SELECT COUNT(*) FROM RollupDirty WHERE type = ?", (spec["type"],)).fetchone()[0]
+    if not dirty:
+        return 0
+    conn.execute(
+        f'DELETE FROM "{table}" WHERE "date" IN (SELECT day FROM RollupDirty WHERE type = ?)',
+        (spec["type"],))
+    conn.execute(
+        f'INSERT INTO "{table}" ({_column_list(spec)}) '
+        + _aggregate_sql(spec, "d.day",
+                         # CROSS JOIN keeps SQLite walking the dirty days first
+                         f'FROM RollupDirty d CROSS JOIN Record r ON r.type = d.type AND r.start_date >= {lower} '
+                         f"AND r.start_date < date(d.day, '+1 day') AND date(r.{day}) = d.day "
+                         f'WHERE d.type = ?{where}'),
+        (spec["type"],))
+    return dirty
+
+
+def refresh_rollups(db_path: str = DEFAULT_DB_PATH, specs: Dict[str, Dict[str, Any]] = None,
+                    full: bool = False) -> Dict[str, Any]:
+    """Bring every rollup table up to date with the Record table.
+
+    Tables whose spec is new or changed (or all of them, with ``full``) are
+    rebuilt from every record; the rest only recompute their dirty days. A
+    table that was not built from rollups is left alone until records of
+    its type exist. Everything happens in one transaction, so readers see
+    either the old or the new rollups.
+    """
+    specs = ROLLUPS if specs is None else specs
+    started = time.perf_counter()
+    result = {"tables": {}, "dirty_days": 0}
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        has_records = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='Record'").fetchone()
+        if not has_records:
+            result["seconds"] = time.perf_counter() - started
+            return result
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            ensure_dirty_tracking(conn)
+            built = dict(conn.execute("SELECT table_name, spec FROM RollupState").fetchall())
+            for table, spec in specs.items():
+                if not full and built.get(table) == spec_signature(spec):
+                    dirty = _refresh_days(conn, table, spec)
+                    result["dirty_days"] += dirty
+                    result["tables"][table] = "incremental" if dirty else "unchanged"
+                elif conn.execute("SELECT 1 FROM Record WHERE type = ? LIMIT 1", (spec["type"],)).fetchone():
+                    _rebuild_table(conn, table, spec)
+                    result["tables"][table] = "rebuilt"
+                else:
+                    result["tables"][table] = "no records"
+            conn.execute("DELETE FROM RollupDirty")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+    result["seconds"] = time.perf_counter() - started
+    logger.info(f"Refreshed rollups in {result['seconds'] * 1000:.1f} ms "
+                f"({result['dirty_days']} dirty days)")
+    return result
+
+
+def main():
+    """Refresh the rollup tables of the default database."""
+    parser = argparse.ArgumentParser(description="Refresh FitTrackAI daily rollup tables")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Database to refresh")
+    parser.add_argument("--full", action="store_true", help="Rebuild every table from all records")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if not os.path.exists(args.db):
+        print(f"❌ Database not found at {args.db}")
+        return False
+
+    result = refresh_rollups(args.db, full=args.full)
+    for table, status in result["tables"].items():
+        print(f"  {table}: {status}")
+    print(f"✅ Rollups refreshed in {result['seconds'] * 1000:.1f} ms")
+    return True
+
+
+if __name__ == "__main__":
+    if not main():
+        sys.exit(1)
@@ -74,12 +74,13 @@ def start_application():
         print(f"🌐 Starting server on port {port}...")
         
         # Import and run the app
-        from app import app, socketio
+        from app import app, socketio, start_background_tasks
         
         print("✅ Application started successfully!")
         print(f"🌐 Open your browser to: http://localhost:{port}")
         print("📱 Press Ctrl+C to stop the application")
         
+        start_background_tasks()
         socketio.run(app, debug=True, host='0.0.0.0', port=port)
         
     except KeyboardInterrupt:
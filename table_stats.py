@@ -0,0 +1,137 @@
+"""
+FitTrackAI Table Statistics
+
+Summary statistics of table columns computed inside SQLite: one aggregate
+query per table covers every column, and medians read only the middle of
+each sorted column, so no rows are moved into Python.
+"""
+
+import math
+from typing import Dict, Any, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from db_pool import ConnectionPool
+
+
+def table_columns(pool: ConnectionPool, table_name: str) -> Dict[str, str]:
+    """Get a table's column names and declared types (empty for a missing table)."""
+    with pool.connection() as conn:
+        return {row[1]: row[2] for row in conn.execute(f'PRAGMA table_info("{table_name}")')}
+
+
+def text_affinity(declared_type: str) -> bool:
+    """Check whether SQLite stores a column of this declared type as text, never as a number."""
+    declared_type = (declared_type or "").upper()
+    return "INT" not in declared_type and any(word in declared_type for word in ("CHAR", "CLOB", "TEXT"))
+
+
+def build_stats_query(table_name: str, columns: Sequence[str], text_columns: Sequence[str] = (),
+                      with_dates: bool = False) -> str:
+    """Build the single aggregate query over all ``columns`` of a table.
+
+    Per column it selects the non-null count, how many values are numbers
+    and integers, the sum, the sum of squares, the minimum and the maximum;
+    then the row count and, ``with_dates``, the date range. ``text_columns``
+    hold no numbers, so only their count is aggregated instead of parsing
+    every string. TOTAL is used over SUM so integer columns cannot overflow.
+    """
+    parts = []
+    for col in columns:
+        quoted = f'"{col}"'
+        if col in text_columns:
+            parts += [f"COUNT({quoted})", "0", "0", "0", "0", "NULL", "NULL"]
+            continue
+        parts += [f"COUNT({quoted})",
+                  f"SUM(typeof({quoted}) IN ('integer', 'real'))",
+                  f"SUM(typeof({quoted}) = 'integer')",
+                  f"TOTAL({quoted})",
+                  f"TOTAL({quoted} * {quoted})",
+                  f"MIN({quoted})",
+                  f"MAX({quoted})"]
+    parts.append("COUNT(*)")
+    if with_dates:
+        parts += ['MIN("date")', 'MAX("date")']
+    return f'SELECT {", ".join(parts)} FROM "{table_name}"'
+
+
+def _dtype(total: int, count: int, numbers: int, integers: int) -> np.dtype:
+    """Get the dtype pandas would read a column as: int64, float64 or object."""
+    if count == 0 or numbers < count:
+        return np.dtype(object)
+    if integers == count == total:
+        return np.dtype(np.int64)
+    return np.dtype(np.float64)
+
+
+def column_median(pool: ConnectionPool, table_name: str, column: str, count: int) -> float:
+    """Get the exact median of a column with ``count`` non-null values.
+
+    SQLite sorts the column and only the one or two middle values are read.
+    """
+    with pool.connection() as conn:
+        row = conn.execute(
+            f'SELECT AVG(v) FROM (SELECT "{column}" AS v FROM "{table_name}" '
+            f'WHERE "{column}" IS NOT NULL ORDER BY "{column}" LIMIT ? OFFSET ?)',
+            (2 - count % 2, (count - 1) // 2)
+        ).fetchone()
+    return float(row[0])
+
+
+def table_stats(pool: ConnectionPool, table_name: str, columns: Sequence[str] = None,
+                medians: bool = True) -> Optional[Dict[str, Any]]:
+    """Get summary statistics of a table's columns, or None for a missing table.
+
+    Returns ``total_records``, ``columns``, ``data_types``, ``missing_values``,
+    ``date_range`` (when a ``date`` column has values) and ``numeric_analysis``
+    with the mean, median, min, max, std (ddof=1, as pandas computes it) and
+    count of every numeric column other than ``date``. ``columns`` restricts
+    the statistics to some of the table's columns; ``medians=False`` skips
+    the per-column sorts.
+    """
+    all_columns = table_columns(pool, table_name)
+    if not all_columns:
+        return None
+    columns = [col for col in (columns or all_columns) if col in all_columns]
+    text_columns = [col for col in columns if text_affinity(all_columns[col])]
+    with_dates = 'date' in all_columns
+
+    with pool.connection() as conn:
+        row = conn.execute(build_stats_query(table_name, columns, text_columns, with_dates)).fetchone()
+    total = row[7 * len(columns)]
+
+    stats = {
+        "total_records": total,
+        "columns": list(columns),
+        "data_types": {},
+        "missing_values": {},
+        "numeric_analysis": {}
+    }
+    for i, col in enumerate(columns):
+        count, numbers, integers, value_sum, square_sum, low, high = row[7 * i:7 * i + 7]
+        stats["data_types"][col] = _dtype(total, count, numbers or 0, integers or 0)
+        stats["missing_values"][col] = total - count
+        if col == 'date' or count == 0 or numbers < count:
+            continue
+        mean = value_sum / count
+        # Sample variance from the sums; rounding can leave it slightly negative
+        variance = max(square_sum - value_sum * mean, 0.0) / (count - 1) if count > 1 else float("nan")
+        stats["numeric_analysis"][col] = {
+            "mean": mean,
+            "median": column_median(pool, table_name, col, count) if medians else None,
+            "min": float(low),
+            "max": float(high),
+            "std": math.sqrt(variance),
+            "count": count
+        }
+
+    if with_dates:
+        dates = pd.to_datetime(pd.Series(row[-2:]), errors="coerce")
+        if dates.notna().all():
+            stats["date_range"] = {
+                "start": dates[0].strftime('%Y-%m-%d'),
+                "end": dates[1].strftime('%Y-%m-%d'),
+                "total_days": (dates[1] - dates[0]).days
+            }
+    return stats
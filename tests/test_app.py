@@ -6,16 +6,18 @@ import pytest
 import json
 import tempfile
 import os
+import sqlite3
 from unittest.mock import patch, MagicMock
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
 
 # Import the app components
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app import app, DataManager, PlotGenerator, SimpleAI
+from app import app, DataManager, PlotGenerator, AdvancedAI, parse_date_window, choose_resolution
+from ollama_service import OllamaService
 
 
 @pytest.fixture
@@ -51,6 +53,22 @@ def sample_data():
     }
 
 
+@pytest.fixture
+def health_db(tmp_path):
+    """Create a small on-disk health database."""
+    db_path = str(tmp_path / "health.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE DailyStepCount (date TEXT, total_value REAL)")
+    conn.execute("CREATE TABLE DailySleepSummary (date TEXT, sleep_minutes REAL)")
+    conn.executemany("INSERT INTO DailyStepCount VALUES (?, ?)",
+                     [("2023-01-01", 8000), ("2023-01-02", 7500), ("2023-01-03", 12000)])
+    conn.executemany("INSERT INTO DailySleepSummary VALUES (?, ?)",
+                     [("2023-01-01", 420), ("2023-01-02", 450)])
+    conn.commit()
+    conn.close()
+    return db_path
+
+
 class TestDataManager:
     """Test DataManager class."""
     
@@ -60,31 +78,133 @@ class TestDataManager:
         dm = DataManager(db_path)
         assert dm.db_path == db_path
     
-    @patch('app.sqlite3.connect')
-    def test_get_tables(self, mock_connect):
+    def test_get_tables(self, health_db):
         """Test getting tables from database."""
-        mock_cursor = MagicMock()
-        mock_cursor.fetchall.return_value = [('table1',), ('table2',)]
-        mock_connect.return_value.cursor.return_value = mock_cursor
-        
-        dm = DataManager("test.db")
+        dm = DataManager(health_db)
         tables = dm.get_tables()
         
-        assert tables == ['table1', 'table2']
-        mock_connect.assert_called_once_with("test.db")
+        assert tables == ['DailyStepCount', 'DailySleepSummary']
     
     @patch('app.pd.read_sql_query')
-    @patch('app.sqlite3.connect')
-    def test_get_table_data(self, mock_connect, mock_read_sql):
+    def test_get_table_data(self, mock_read_sql, health_db):
         """Test getting data from a table."""
         mock_df = pd.DataFrame({'col1': [1, 2, 3]})
         mock_read_sql.return_value = mock_df
         
-        dm = DataManager("test.db")
+        dm = DataManager(health_db)
         result = dm.get_table_data("test_table")
         
         assert result.equals(mock_df)
-        mock_read_sql.assert_called_once_with("SELECT * FROM test_table LIMIT 100", mock_connect.return_value)
+        assert mock_read_sql.call_args[0][0] == "SELECT * FROM test_table LIMIT 100"
+    
+    def test_get_database_summary(self, health_db):
+        """Test that the summary comes from the catalog without loading rows."""
+        dm = DataManager(health_db)
+        with patch.object(dm, 'get_all_table_data') as mock_load:
+            summary = dm.get_database_summary()
+        
+        assert summary["total_tables"] == 2
+        assert [t["record_count"] for t in summary["tables"]] == [3, 2]
+        mock_load.assert_not_called()
+    
+    def test_get_all_table_data_is_cached(self, health_db):
+        """Test that full table loads are cached per database version."""
+        dm = DataManager(health_db)
+        first = dm.get_all_table_data('DailyStepCount')
+        first['total_value'] = 0
+        second = dm.get_all_table_data('DailyStepCount')
+        
+        assert second['total_value'].tolist() == [8000, 7500, 12000]
+        assert dm.frame_cache.stats()["hits"] == 1
+        
+        conn = sqlite3.connect(health_db)
+        conn.execute("INSERT INTO DailyStepCount VALUES ('2023-01-04', 9000)")
+        conn.commit()
+        conn.close()
+        
+        assert len(dm.get_all_table_data('DailyStepCount')) == 4
+        assert dm.frame_cache.stats()["entries"] == 1
+    
+    def test_query_pushes_down_window_and_columns(self, health_db):
+        """Test that date windows, projections and ordering run in SQL."""
+        dm = DataManager(health_db)
+        df = dm.query('DailyStepCount', ['date', 'total_value'], start='2023-01-02',
+                      end=date(2023, 1, 3), order_by='total_value', descending=True)
+        
+        assert list(df.columns) == ['date', 'total_value']
+        assert df['total_value'].tolist() == [12000, 7500]
+    
+    def test_build_query_is_parameterized(self, health_db):
+        """Test the generated SQL and its parameters."""
+        dm = DataManager(health_db)
+        sql, params = dm.build_query('DailyStepCount', ['total_value'], start='2023-01-02', end='2023-01-03')
+        
+        assert sql == 'SELECT "total_value" FROM "DailyStepCount" WHERE "date" >= ? AND "date" < ?'
+        assert params == ['2023-01-02', '2023-01-04']
+    
+    def test_query_rejects_unknown_identifiers(self, health_db):
+        """Test that unknown tables and columns are refused."""
+        dm = DataManager(health_db)
+        with pytest.raises(ValueError):
+            dm.build_query('DailyStepCount', ['total_value; DROP TABLE x'])
+        with pytest.raises(ValueError):
+            dm.build_query('Missing')
+        assert dm.query('DailyStepCount', order_by='nope').empty
+    
+    def test_ensure_date_indexes(self, health_db):
+        """Test that Daily* tables get an index on date."""
+        dm = DataManager(health_db)
+        assert sorted(dm.ensure_date_indexes()) == ['idx_DailySleepSummary_date', 'idx_DailyStepCount_date']
+        assert dm.ensure_date_indexes() == []
+    
+    def test_connections_are_pooled(self, health_db):
+        """Test that repeated calls reuse pooled connections."""
+        dm = DataManager(health_db)
+        dm.get_tables()
+        dm.get_all_table_data('DailyStepCount')
+        
+        assert dm.pool.stats()["size"] == 1
+    
+    def test_query_buckets_aggregates_in_sql(self, health_db):
+        """Test weekly and monthly buckets computed by GROUP BY."""
+        dm = DataManager(health_db)
+        weekly = dm.query_buckets('DailyStepCount', ['total_value'], 'week', 'sum')
+        assert weekly['date'].tolist() == [pd.Timestamp('2022-12-26'), pd.Timestamp('2023-01-02')]
+        assert weekly['total_value'].tolist() == [8000, 19500]
+        
+        monthly = dm.query_buckets('DailyStepCount', ['total_value'], 'month', 'mean', end='2023-01-02')
+        assert monthly['date'].tolist() == [pd.Timestamp('2023-01-01')]
+        assert monthly['total_value'].tolist() == [7750]
+        
+        with pytest.raises(ValueError):
+            dm.build_bucket_query('DailyStepCount', ['total_value'], 'fortnight')
+
+
+class TestDateWindow:
+    """Test request date window parsing."""
+    
+    def test_start_and_end(self):
+        """Test explicit start and end dates."""
+        assert parse_date_window({'start': '2023-01-01', 'end': '2023-01-31'}) == (date(2023, 1, 1), date(2023, 1, 31))
+    
+    def test_last_n_days(self):
+        """Test a trailing window of days."""
+        assert parse_date_window({'days': 30, 'end': '2023-01-31'}) == (date(2023, 1, 2), date(2023, 1, 31))
+        assert parse_date_window({}) == (None, None)
+    
+    def test_invalid_window(self):
+        """Test that malformed windows are rejected."""
+        with pytest.raises(ValueError):
+            parse_date_window({'start': '2023-02-01', 'end': '2023-01-01'})
+        with pytest.raises(ValueError):
+            parse_date_window({'start': 'yesterday'})
+    
+    def test_choose_resolution(self):
+        """Test that longer ranges get coarser buckets."""
+        assert choose_resolution(date(2023, 1, 1), date(2023, 3, 1)) == "day"
+        assert choose_resolution(date(2022, 1, 1), date(2023, 6, 1)) == "week"
+        assert choose_resolution(date(2015, 1, 1), date(2023, 1, 1)) == "month"
+        assert choose_resolution(date(2000, 1, 1), date(2023, 1, 1)) == "year"
 
 
 class TestPlotGenerator:
@@ -117,41 +237,62 @@ class TestPlotGenerator:
         mock_steps_plot.assert_called_once()
 
 
-class TestSimpleAI:
-    """Test SimpleAI class."""
+    def test_custom_plot_streams_table(self, health_db):
+        """Test that the custom plot reduces the streamed table to daily values."""
+        pg = PlotGenerator(DataManager(health_db))
+        result = pg.generate_plot("custom", "DailyStepCount", chunk_size=1)
+        
+        fig = json.loads(result["plot"])
+        assert result["type"] == "custom"
+        assert fig["data"][0]["y"] == [8000, 7500, 12000]
+    
+    def test_daily_steps_plot_by_month(self, health_db):
+        """Test that a coarser resolution plots one point per bucket."""
+        pg = PlotGenerator(DataManager(health_db))
+        result = pg.generate_plot("daily_steps", resolution="month", agg="sum")
+        
+        fig = json.loads(result["plot"])
+        assert result["resolution"] == "month"
+        assert fig["data"][0]["y"] == [27500]
+        assert fig["data"][1]["name"] == "3-Month Moving Average"
+
+
+class TestAdvancedAI:
+    """Test AdvancedAI class."""
     
     def test_init(self):
-        """Test SimpleAI initialization."""
+        """Test AdvancedAI initialization does not build the Ollama client."""
         mock_dm = MagicMock()
-        ai = SimpleAI(mock_dm)
+        built = []
+        ai = AdvancedAI(mock_dm, OllamaService(client_factory=lambda: built.append(1)))
         assert ai.data_manager == mock_dm
-        assert hasattr(ai, 'plot_generator')
+        assert built == []
     
     def test_chat_default_response(self):
-        """Test default chat response."""
+        """Test chat response when the LLM fails."""
         mock_dm = MagicMock()
-        ai = SimpleAI(mock_dm)
+        ai = AdvancedAI(mock_dm, OllamaService(client_factory=MagicMock(side_effect=RuntimeError("down"))))
         
-        response = ai.chat("hello")
-        assert "type" in response
-        assert response["type"] == "text"
-        assert "I can help you" in response["response"]
+        with patch.object(AdvancedAI, '_build_messages', lambda self, message, context="": [message]):
+            response = ai.chat("hello")
+        assert response["provider"] == "ERROR"
+        assert "Please make sure Ollama is running" in response["response"]
     
     def test_chat_plot_request(self):
         """Test chat with plot request."""
         mock_dm = MagicMock()
-        ai = SimpleAI(mock_dm)
+        llm = MagicMock()
+        llm.invoke.return_value = MagicMock(content="Here are your steps!")
+        ai = AdvancedAI(mock_dm, OllamaService(client_factory=lambda: llm))
         
-        # Mock the plot generator
-        ai.plot_generator.generate_plot = MagicMock(return_value={
-            "plot": "test_plot",
-            "type": "daily_steps",
-            "title": "Daily Step Count"
-        })
+        # Mock the plot generation
+        ai._generate_plot = MagicMock(return_value={"type": "daily_steps", "title": "Daily Step Count"})
         
-        response = ai.chat("show me my step data")
-        assert response["type"] == "plot"
-        assert "plot_data" in response
+        with patch.object(AdvancedAI, '_build_messages', lambda self, message, context="": [message]):
+            response = ai.chat("show me my step data")
+        assert response["provider"] == "OLLAMA"
+        assert response["plot"]["type"] == "daily_steps"
+        ai._generate_plot.assert_called_once()
 
 
 class TestFlaskApp:
@@ -207,6 +348,36 @@ class TestFlaskApp:
             assert "plot" in data
 
 
+    def test_plot_route_date_window(self, client):
+        """Test that the plot route forwards the date window."""
+        with patch('app.PlotGenerator') as mock_plot_gen:
+            mock_instance = MagicMock()
+            mock_instance.generate_plot.return_value = {"plot": "test"}
+            mock_plot_gen.return_value = mock_instance
+            
+            response = client.post('/api/plot',
+                                 json={"type": "daily_steps", "start": "2023-01-01", "end": "2023-01-31"},
+                                 content_type='application/json')
+            assert response.status_code == 200
+            mock_instance.generate_plot.assert_called_once_with(
+                "daily_steps", None, start=date(2023, 1, 1), end=date(2023, 1, 31),
+                resolution="auto", agg="mean", plot_format="json", max_points=None)
+    
+    def test_plot_route_invalid_date_window(self, client):
+        """Test that a malformed date window is a bad request."""
+        response = client.post('/api/plot',
+                             json={"type": "daily_steps", "start": "not-a-date"},
+                             content_type='application/json')
+        assert response.status_code == 400
+    
+    def test_plot_route_invalid_resolution(self, client):
+        """Test that an unknown resolution is a bad request."""
+        response = client.post('/api/plot',
+                             json={"type": "daily_steps", "resolution": "fortnight"},
+                             content_type='application/json')
+        assert response.status_code == 400
+
+
 class TestIntegration:
     """Integration tests."""
     
@@ -0,0 +1,138 @@
+"""
+Tests for the FitTrackAI streamed chat responses
+"""
+
+import pytest
+import sqlite3
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Import the chat streams
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_stream import ChatStreams
+import app as app_module
+from ollama_service import OllamaService
+from app import app, socketio, DataManager, AdvancedAI
+
+
+class FakeLLM:
+    """LLM client that streams a fixed reply word by word and records whether it finished."""
+    
+    def __init__(self, reply="You walked a lot this week!"):
+        self.reply = reply
+        self.closed = False
+        self.finished = False
+    
+    def stream(self, messages):
+        try:
+            for word in self.reply.split(" "):
+                yield SimpleNamespace(content=word + " ")
+            self.finished = True
+        finally:
+            self.closed = True
+
+
+@pytest.fixture
+def ai(tmp_path):
+    """Create an AI system over a steps database and a fake LLM."""
+    db_path = str(tmp_path / "health.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE DailyStepCount (date TEXT, total_value REAL)")
+    conn.executemany("INSERT INTO DailyStepCount VALUES (?, ?)",
+                     [(f"2024-01-{day:02d}", 1000.0 * day) for day in range(1, 11)])
+    conn.commit()
+    conn.close()
+
+    llm = FakeLLM()
+    with patch.object(AdvancedAI, '_build_messages', lambda self, message, context="": [message]):
+        system = AdvancedAI(DataManager(db_path), OllamaService(client_factory=lambda: llm))
+        system.llm = llm
+        yield system
+
+
+class TestStreamChat:
+    """Test AdvancedAI.stream_chat method."""
+    
+    def test_deltas_then_final_response(self, ai):
+        """Test that tokens come first and the final response carries the full text and the plot."""
+        items = list(ai.stream_chat("How are my steps?"))
+        
+        assert [item["delta"] for item in items[:-1]] == ["You ", "walked ", "a ", "lot ", "this ", "week! "]
+        assert items[-1]["response"] == "You walked a lot this week! "
+        assert items[-1]["provider"] == "OLLAMA"
+        assert items[-1]["plot"]["type"] == "daily_steps"
+        assert "plot" not in list(ai.stream_chat("Hello"))[-1]
+    
+    def test_closing_stops_generation(self, ai):
+        """Test that closing the stream early stops reading from the LLM."""
+        chunks = ai.stream_chat("Hello")
+        next(chunks)
+        chunks.close()
+        
+        assert ai.llm.closed and not ai.llm.finished
+    
+    def test_errors_end_the_stream(self, ai):
+        """Test that an LLM failure becomes the final error response."""
+        ai.llm.stream = None
+        assert list(ai.stream_chat("Hello")) == [{
+            "response": "Sorry, I encountered an error: Failed to generate response: 'NoneType' object is not callable. Please make sure Ollama is running.",
+            "provider": "ERROR"
+        }]
+
+
+class TestChatStreams:
+    """Test ChatStreams class."""
+    
+    def test_relay(self, ai):
+        """Test chunk events followed by the final event, tagged with the message ID."""
+        streams = ChatStreams()
+        sent = []
+        final = streams.relay("sid1", 7, ai.stream_chat("Hello"), lambda event, data: sent.append((event, data)))
+        
+        assert [event for event, _ in sent] == ["chat_response_chunk"] * 6 + ["chat_response"]
+        assert all(data["id"] == 7 for _, data in sent)
+        assert final["response"] == "".join(data["delta"] for _, data in sent[:-1])
+        assert streams.stats() == {"active": 0, "completed": 1, "cancelled": 0}
+    
+    def test_new_message_cancels(self, ai):
+        """Test that a newer response from the same client cancels the one streaming."""
+        streams = ChatStreams()
+        sent = []
+        
+        def emit(event, data):
+            sent.append(event)
+            if len(sent) == 2:
+                streams.open("sid1")
+        
+        assert streams.relay("sid1", 1, ai.stream_chat("Hello"), emit) is None
+        assert sent == ["chat_response_chunk"] * 2
+        assert ai.llm.closed and not ai.llm.finished
+        assert streams.stats()["cancelled"] == 1 and streams.stats()["active"] == 1
+        assert streams.cancel("sid1") and not streams.cancel("sid1")
+
+
+class TestChatEvent:
+    """Test the chat_message event."""
+    
+    def test_streamed_over_socket(self, ai, monkeypatch):
+        """Test that a client receives the tokens and then the final response with its plot."""
+        monkeypatch.setattr(app_module, "ai_system", ai)
+        monkeypatch.setattr(app_module, "data_manager", ai.data_manager)
+        monkeypatch.setattr(app_module, "chat_streams", ChatStreams())
+        
+        socket = socketio.test_client(app)
+        socket.get_received()
+        socket.emit('chat_message', {"id": 3, "message": "Show my steps"})
+        events = socket.get_received()
+        
+        assert [event["name"] for event in events] == ["chat_response_chunk"] * 6 + ["chat_response"]
+        final = events[-1]["args"][0]
+        assert final["id"] == 3 and final["plot"]["type"] == "daily_steps"
+        socket.disconnect()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
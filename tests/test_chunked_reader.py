@@ -0,0 +1,99 @@
+"""
+Tests for the FitTrackAI chunked reader
+"""
+
+import pytest
+import sqlite3
+import numpy as np
+import pandas as pd
+
+# Import the reader
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_pool import ConnectionPool
+from chunked_reader import iter_table_chunks, reduce_daily_means
+from app import DataManager
+
+
+ROWS = [
+    ("2023-01-02 08:00:00", 70.0, "Watch"),
+    ("2023-01-01 09:00:00", 65.0, "Watch"),
+    (None, 80.0, "Phone"),
+    ("2023-01-01 07:00:00", 60.0, None),
+    ("2023-01-02 08:00:00", 90.0, "Watch"),
+    ("2023-01-03 10:00:00", None, "Watch"),
+    (None, 75.0, "Phone"),
+]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Create a raw per-sample table with duplicate and missing dates."""
+    path = str(tmp_path / "health.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE HeartRate (date TEXT, value REAL, source TEXT)")
+    conn.executemany("INSERT INTO HeartRate VALUES (?, ?, ?)", ROWS)
+    conn.execute("CREATE TABLE Plain (value REAL)")
+    conn.executemany("INSERT INTO Plain VALUES (?)", [(i,) for i in range(5)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+class TestIterTableChunks:
+    """Test keyset-paginated chunk iteration."""
+    
+    def test_every_row_once_in_date_order(self, db_path):
+        """Test that chunks cover the table exactly once, NULL dates first."""
+        pool = ConnectionPool(db_path)
+        chunks = list(iter_table_chunks(pool, "HeartRate", ["date", "value", "source"], chunk_size=2))
+        
+        assert all(len(chunk) <= 2 for chunk in chunks)
+        df = pd.concat(chunks, ignore_index=True)
+        assert list(df.columns) == ["date", "value", "source"]
+        assert len(df) == len(ROWS)
+        assert df["date"].tolist()[:2] == [None, None]
+        assert df["date"].tolist()[2:] == sorted(r[0] for r in ROWS if r[0])
+    
+    def test_table_without_date(self, db_path):
+        """Test rowid pagination for tables without a date column."""
+        pool = ConnectionPool(db_path)
+        chunks = list(iter_table_chunks(pool, "Plain", ["value"], chunk_size=2))
+        assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    
+    def test_record_batches(self, db_path):
+        """Test yielding NumPy record arrays."""
+        pool = ConnectionPool(db_path)
+        batch = next(iter_table_chunks(pool, "Plain", ["value"], chunk_size=3, as_records=True))
+        assert isinstance(batch, np.recarray)
+        assert batch["value"].tolist() == [0.0, 1.0, 2.0]
+    
+    def test_data_manager_window(self, db_path):
+        """Test DataManager chunking with a date window and projection."""
+        dm = DataManager(db_path)
+        chunks = dm.iter_table_chunks("HeartRate", chunk_size=1, columns=["value"],
+                                      start="2023-01-02", end="2023-01-02")
+        assert [chunk["value"].tolist() for chunk in chunks] == [[70.0], [90.0]]
+        with pytest.raises(ValueError):
+            dm.iter_table_chunks("HeartRate", columns=["missing"])
+
+
+class TestReductions:
+    """Test streaming reductions."""
+    
+    def test_reduce_daily_means(self, db_path):
+        """Test that chunked daily means equal a grouped mean of the full table."""
+        pool = ConnectionPool(db_path)
+        chunks = iter_table_chunks(pool, "HeartRate", ["date", "value", "source"], chunk_size=2)
+        result = reduce_daily_means(chunks)
+        
+        full = pd.DataFrame(ROWS, columns=["date", "value", "source"]).dropna(subset=["date"])
+        expected = full.groupby(pd.to_datetime(full["date"]).dt.normalize())["value"].mean()
+        assert result["date"].tolist() == expected.index.tolist()
+        np.testing.assert_allclose(result["value"], expected.values)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,128 @@
+"""
+Tests for the FitTrackAI columnar mirror
+"""
+
+import pytest
+import sqlite3
+import numpy as np
+import pandas as pd
+
+# Import the mirror
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from columnar_mirror import ColumnarMirror
+from frame_cache import compact_frame
+from app import DataManager
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Create a small on-disk database with text, numeric and null values."""
+    path = str(tmp_path / "health.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE DailyStepCount (date TEXT, total_value REAL, count INTEGER, source TEXT)")
+    conn.executemany("INSERT INTO DailyStepCount VALUES (?, ?, ?, ?)", [
+        ("2023-01-03", 12000.0, 30, "Watch"),
+        ("2023-01-01", 8000.0, 20, None),
+        ("2023-01-02", None, 25, "Phone"),
+    ])
+    conn.execute("CREATE TABLE Mixed (value)")
+    conn.executemany("INSERT INTO Mixed VALUES (?)", [("a",), (1,)])
+    conn.execute("CREATE TABLE HeartRate (date TEXT, value REAL, source TEXT)")
+    conn.executemany("INSERT INTO HeartRate VALUES (?, ?, ?)", [
+        ("2023-01-01 08:00:00", 61.0, "Watch"),
+        ("2023-01-01 09:00:00", 72.0, "Watch"),
+        ("2023-01-01 10:00:00", 68.0, None),
+        ("2023-01-01 11:00:00", 75.0, "Watch"),
+    ])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def read_sql(db_path, sql):
+    """Load a query straight from SQLite."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return pd.read_sql_query(sql, conn)
+    finally:
+        conn.close()
+
+
+class TestColumnarMirror:
+    """Test ColumnarMirror class."""
+    
+    def test_load_matches_sqlite(self, db_path, tmp_path):
+        """Test that mirrored tables equal what read_sql_query returns, in the typed schema."""
+        mirror = ColumnarMirror(db_path, str(tmp_path / "mirror"))
+        assert mirror.rebuild()
+        
+        for table in ["DailyStepCount", "HeartRate"]:
+            df = mirror.load(table)
+            pd.testing.assert_frame_equal(df, compact_frame(read_sql(db_path, f"SELECT * FROM {table}")))
+    
+    def test_typed_columns(self, db_path, tmp_path):
+        """Test that dates, narrowed numbers and categoricals survive the mirror."""
+        mirror = ColumnarMirror(db_path, str(tmp_path / "mirror"))
+        mirror.rebuild()
+        
+        df = mirror.load("HeartRate")
+        assert df["date"].dtype == "datetime64[ns]"
+        assert df["value"].dtype == np.float32
+        assert df["source"].dtype == "category"
+        assert df["source"].isna().tolist() == [False, False, True, False]
+    
+    def test_numeric_columns_are_memory_mapped(self, db_path, tmp_path):
+        """Test that numeric columns are served without copying."""
+        mirror = ColumnarMirror(db_path, str(tmp_path / "mirror"))
+        mirror.rebuild()
+        
+        df = mirror.load("DailyStepCount", ["total_value"])
+        assert isinstance(df["total_value"].values, np.memmap)
+    
+    def test_stale_mirror_is_not_used(self, db_path, tmp_path):
+        """Test that writes to the database invalidate the mirror."""
+        mirror = ColumnarMirror(db_path, str(tmp_path / "mirror"))
+        mirror.rebuild()
+        assert not mirror.rebuild()
+        
+        conn = sqlite3.connect(db_path)
+        conn.execute("INSERT INTO DailyStepCount VALUES ('2023-01-04', 9000, 22, 'Watch')")
+        conn.commit()
+        conn.close()
+        
+        assert not mirror.is_fresh()
+        assert mirror.load("DailyStepCount") is None
+        assert mirror.rebuild()
+        assert len(mirror.load("DailyStepCount")) == 4
+    
+    def test_mixed_type_tables_fall_back(self, db_path, tmp_path):
+        """Test that tables that cannot round-trip are left to SQLite."""
+        mirror = ColumnarMirror(db_path, str(tmp_path / "mirror"))
+        mirror.rebuild()
+        assert mirror.load("Mixed") is None
+    
+    def test_data_manager_reads_mirror(self, db_path, tmp_path):
+        """Test that DataManager queries give the same result from the mirror."""
+        # The first pooled read switches the file to WAL; mirror it afterwards
+        plain = DataManager(db_path)
+        plain.get_tables()
+        mirror = ColumnarMirror(db_path, str(tmp_path / "mirror"))
+        mirror.rebuild()
+        dm = DataManager(db_path, mirror=mirror)
+        
+        for kwargs in [
+            {},
+            {"columns": ["total_value"], "start": "2023-01-02", "order_by": "date"},
+            {"columns": ["date", "count"], "end": "2023-01-02", "order_by": "total_value", "descending": True},
+        ]:
+            with pytest.MonkeyPatch.context() as mp:
+                mp.setattr("app.pd.read_sql_query", None)
+                mirrored = dm.query("DailyStepCount", **kwargs)
+            pd.testing.assert_frame_equal(mirrored, plain.query("DailyStepCount", **kwargs))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
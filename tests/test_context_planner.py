@@ -0,0 +1,119 @@
+"""
+Tests for the FitTrackAI context planner
+"""
+
+import pytest
+import sqlite3
+
+# Import the context planner
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from context_planner import (stem, table_terms, message_terms, message_dates, score_table, plan_context,
+                             estimate_tokens)
+from data_context import DataContext
+from app import DataManager, AdvancedAI
+
+
+def table_info(columns, record_count=10, min_date="2024-01-01", max_date="2024-01-10"):
+    """Build the catalog metadata of a table."""
+    return {"columns": columns, "record_count": record_count, "min_date": min_date, "max_date": max_date}
+
+
+TABLES = {
+    "DailyStepCount": table_info(["date", "total_value"], 300),
+    "DailySleepSummary": table_info(["date", "sleep_minutes"], 200),
+    "DailyFlightsClimbed": table_info(["date", "total_value"], 100, "2023-01-01", "2023-12-31"),
+    "Workout": table_info(["date", "duration"], 0, None, None),
+}
+
+FRAGMENTS = {table: f"📋 {table}:\n  • Records: {info['record_count']}\n  • Insights: {'x' * 200}\n\n"
+             for table, info in TABLES.items() if info["record_count"]}
+
+
+class TestScoring:
+    """Test how tables are matched to messages."""
+    
+    def test_terms(self):
+        """Test stems of message words and table names, without generic name parts."""
+        assert [stem(word) for word in ["steps", "walking", "running", "climbed", "speed", "steadiness"]] == \
+            ["step", "walk", "run", "climb", "speed", "steadiness"]
+        assert table_terms("DailyFlightsClimbed", ("date", "total_value")) == {"flight", "climb"}
+        assert table_terms("DailySleepSummary", ("date", "sleep_minutes")) == {"sleep", "minute"}
+        assert message_terms("How far did I walk?")[1] == {"step", "distance"}
+    
+    def test_dates(self):
+        """Test explicit days, months and years, with bare years only used alone."""
+        assert message_dates("Steps on 2024-01-03 and in March 2023?") == [
+            ("2024-01-03", "2024-01-03"), ("2023-03-01", "2023-03-31")]
+        assert message_dates("my sleep in 2023-02") == [("2023-02-01", "2023-02-28")]
+        assert message_dates("How was 2022?") == [("2022-01-01", "2022-12-31")]
+        assert message_dates("Hello") == []
+    
+    def test_score(self):
+        """Test that named metrics outrank synonyms, and covering a named date adds a point."""
+        words, synonyms = message_terms("How many steps did I walk in 2023?")
+        dates = message_dates("How many steps did I walk in 2023?")
+        scores = {table: score_table(table, info, words, synonyms, dates) for table, info in TABLES.items()}
+        assert scores == {"DailyStepCount": 2, "DailySleepSummary": 0, "DailyFlightsClimbed": 1, "Workout": 0}
+
+
+class TestPlanContext:
+    """Test plan_context function."""
+    
+    def test_relevant_tables_in_full(self):
+        """Test that only matching tables are described in full and the others get one line."""
+        context = plan_context(TABLES, FRAGMENTS, "How did I sleep?", 1000)
+        
+        assert context.startswith("📊 Database Overview:\nTotal tables: 4\n\n📋 DailySleepSummary:\n")
+        assert "📋 DailyStepCount:" not in context
+        assert context.endswith("📋 Other tables:\n"
+                                "  • DailyStepCount: 300 records (2024-01-01 to 2024-01-10)\n"
+                                "  • DailyFlightsClimbed: 100 records (2023-01-01 to 2023-12-31)\n")
+    
+    def test_budget(self):
+        """Test that tables beyond the budget are summarized, then only counted, all within the budget."""
+        context = plan_context(TABLES, FRAGMENTS, "steps, sleep and stairs", 100)
+        assert estimate_tokens(context) <= 100
+        assert context.count("Insights") == 1 and "and 1 more tables" in context
+        
+        tight = plan_context(TABLES, FRAGMENTS, "steps", 20)
+        assert "Insights" not in tight and "and 3 more tables" in tight
+        assert estimate_tokens(tight) <= 20
+        for budget in range(10, 100):
+            assert estimate_tokens(plan_context(TABLES, FRAGMENTS, "steps", budget)) <= budget
+        assert "Other tables" not in plan_context(TABLES, FRAGMENTS, "steps", 19)
+
+
+class TestDataContextPlan:
+    """Test DataContext.plan method."""
+    
+    def test_plan_over_database(self, tmp_path):
+        """Test planning from the cached fragments of a database."""
+        db_path = str(tmp_path / "health.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE DailyStepCount (date TEXT, total_value REAL)")
+        conn.execute("CREATE TABLE DailySleepSummary (date TEXT, sleep_minutes REAL)")
+        conn.executemany("INSERT INTO DailyStepCount VALUES (?, ?)",
+                         [(f"2024-01-{day:02d}", 1000.0 * day) for day in range(1, 11)])
+        conn.executemany("INSERT INTO DailySleepSummary VALUES (?, ?)",
+                         [(f"2024-01-{day:02d}", 420.0) for day in range(1, 11)])
+        conn.commit()
+        conn.close()
+        
+        manager = DataManager(db_path)
+        context = DataContext(manager.catalog, manager.pool, AdvancedAI._analyze_table_data)
+        planned = context.plan("How many steps?", 1000)
+        assert "📋 DailyStepCount:\n  • Records: 10" in planned
+        assert "  • DailySleepSummary: 10 records (2024-01-01 to 2024-01-10)\n" in planned
+        assert len(planned) < len(context.text())
+        assert context.stats()["builds"] == 1 and context.stats()["plans"] == 1
+        
+        ai = AdvancedAI(manager)
+        assert ai._get_detailed_data_context("How did I sleep?").count("Insights") == 1
+        manager.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,116 @@
+"""
+Tests for the FitTrackAI LLM data context
+"""
+
+import pytest
+import gc
+import sqlite3
+from unittest.mock import patch
+
+# Import the data context
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_context
+from data_context import DataContext
+from app import DataManager, AdvancedAI
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Create a database with steps, sleep and an empty table."""
+    path = str(tmp_path / "health.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE DailyStepCount (date TEXT, total_value REAL)")
+    conn.execute("CREATE TABLE DailySleepSummary (date TEXT, sleep_minutes REAL)")
+    conn.execute("CREATE TABLE Workout (date TEXT, duration REAL)")
+    conn.executemany("INSERT INTO DailyStepCount VALUES (?, ?)",
+                     [(f"2024-01-{day:02d}", 1000.0 * day) for day in range(1, 11)])
+    conn.executemany("INSERT INTO DailySleepSummary VALUES (?, ?)",
+                     [(f"2024-01-{day:02d}", 420.0) for day in range(1, 11)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def ai():
+    """Get the AI system class; creating one never connects to Ollama."""
+    return AdvancedAI
+
+
+def add_steps(db_path, day, value):
+    """Insert one day of steps."""
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO DailyStepCount VALUES (?, ?)", (day, value))
+    conn.commit()
+    conn.close()
+
+
+class TestDataContext:
+    """Test DataContext class."""
+    
+    def test_text(self, db_path, ai):
+        """Test the overview, per-table lines and insights of the context."""
+        text = ai(DataManager(db_path))._get_detailed_data_context()
+        
+        assert text.startswith("📊 Database Overview:\nTotal tables: 3\n\n")
+        assert "📋 DailyStepCount:\n  • Records: 10 (2024-01-01 to 2024-01-10)\n" in text
+        assert "  • Columns: date, total_value\n" in text
+        assert "Avg total_value: 5500.0 (max: 10000.0)" in text
+        assert "Avg sleep_minutes: 7.0 hours (max: 7.0h)" in text
+        assert "Workout" not in text.split("\n\n", 1)[1]
+    
+    def test_unchanged_database_is_not_reloaded(self, db_path, ai):
+        """Test that the same text comes back without loading or analyzing tables."""
+        manager = DataManager(db_path)
+        context = ai(manager)._data_context()
+        text = context.text()
+        
+        with patch('data_context.table_stats') as stats:
+            assert context.text() is text
+        stats.assert_not_called()
+        assert context.stats() == {"builds": 1, "tables_analyzed": 2, "tables": 2, "plans": 0}
+    
+    def test_only_changed_tables_are_analyzed(self, db_path, ai):
+        """Test that new rows in one table recompute only that table's fragment, without loading rows."""
+        manager = DataManager(db_path)
+        context = ai(manager)._data_context()
+        context.text()
+        
+        add_steps(db_path, "2024-01-11", 11000.0)
+        with patch('data_context.table_stats', side_effect=data_context.table_stats) as stats, \
+                patch.object(DataManager, 'get_all_table_data') as load:
+            text = context.text()
+        
+        assert [call.args[1] for call in stats.call_args_list] == ["DailyStepCount"]
+        load.assert_not_called()
+        assert "Records: 11 (2024-01-01 to 2024-01-11)" in text
+        assert "Avg total_value: 6000.0 (max: 11000.0)" in text
+        assert context.stats()["builds"] == 2 and context.stats()["tables_analyzed"] == 3
+    
+    def test_shared_with_bound_copies(self, db_path, tmp_path, ai):
+        """Test that bound copies share a context per database, dropped with its manager."""
+        manager = DataManager(db_path)
+        system = ai(manager)
+        assert system.bind(manager)._data_context() is system._data_context()
+        
+        other = DataManager(str(tmp_path / "other.db"))
+        assert system.bind(other)._data_context() is not system._data_context()
+        assert len(system._contexts) == 2
+        del other
+        gc.collect()
+        assert len(system._contexts) == 1
+    
+    def test_direct_use(self, db_path):
+        """Test a context with its own analyze callable."""
+        manager = DataManager(db_path)
+        context = DataContext(manager.catalog, manager.pool,
+                              lambda stats, table: f"{stats['total_value']['count']} steps" if stats.get('total_value') else "")
+        
+        assert "  • Insights: 10 steps\n" in context.text()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
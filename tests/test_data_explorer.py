@@ -0,0 +1,74 @@
+"""
+Tests for the FitTrackAI data explorer
+"""
+
+import pytest
+import sqlite3
+import numpy as np
+import pandas as pd
+from unittest.mock import patch
+
+# Import the explorer
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_explorer import DataExplorer
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Create a step table with a missing value."""
+    path = str(tmp_path / "health.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE DailyStepCount (date TEXT, total_value REAL, source TEXT)")
+    conn.executemany("INSERT INTO DailyStepCount VALUES (?, ?, ?)", [
+        ("2023-01-01", 8000, "Watch"),
+        ("2023-01-02", 7500, "Watch"),
+        ("2023-01-03", None, "Phone"),
+        ("2023-01-04", 12000, "Watch"),
+        ("2023-01-10", 9000, None),
+    ])
+    conn.commit()
+    conn.close()
+    return path
+
+
+class TestDataExplorer:
+    """Test DataExplorer class."""
+    
+    def test_analyze_table_in_sql(self, db_path):
+        """Test that SQLite aggregates match statistics of the full table, without loading it."""
+        explorer = DataExplorer(db_path)
+        with patch('pandas.read_sql_query') as read_sql:
+            analysis = explorer.analyze_table("DailyStepCount")
+        read_sql.assert_not_called()
+        values = pd.Series([8000, 7500, 12000, 9000], dtype=float)
+        
+        assert analysis["total_records"] == 5
+        assert analysis["columns"] == ["date", "total_value", "source"]
+        assert analysis["missing_values"] == {"date": 0, "total_value": 1, "source": 1}
+        assert analysis["data_types"]["total_value"] == np.float64
+        assert analysis["date_range"] == {"start": "2023-01-01", "end": "2023-01-10", "total_days": 9}
+        
+        stats = analysis["numeric_analysis"]["total_value"]
+        assert stats["count"] == 4
+        assert stats["mean"] == pytest.approx(values.mean())
+        assert stats["median"] == pytest.approx(values.median())
+        assert stats["std"] == pytest.approx(values.std())
+        assert (stats["min"], stats["max"]) == (7500, 12000)
+        assert "source" not in analysis["numeric_analysis"]
+    
+    def test_analyze_missing_table(self, db_path):
+        """Test analyzing a table that does not exist."""
+        assert DataExplorer(db_path).analyze_table("Missing") == "No data found in table Missing"
+    
+    def test_health_insights(self, db_path):
+        """Test insights for the tables that exist."""
+        insights = DataExplorer(db_path).get_health_insights()
+        assert [i["metric"] for i in insights] == ["Steps"]
+        assert insights[0]["average"] == "9125 steps/day"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
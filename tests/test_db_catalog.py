@@ -0,0 +1,83 @@
+"""
+Tests for the FitTrackAI table catalog
+"""
+
+import pytest
+import sqlite3
+from unittest.mock import patch
+
+# Import the catalog
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_pool import ConnectionPool
+from db_catalog import TableCatalog
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Create a small on-disk database."""
+    path = str(tmp_path / "health.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE DailyStepCount (date TEXT, total_value REAL)")
+    conn.execute("CREATE TABLE Notes (text TEXT)")
+    conn.executemany("INSERT INTO DailyStepCount VALUES (?, ?)",
+                     [("2023-01-01", 8000), ("2023-01-03", 12000), ("2023-01-02", 7500)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+class TestTableCatalog:
+    """Test TableCatalog class."""
+    
+    def test_table_metadata(self, db_path):
+        """Test that the catalog records columns, counts and date ranges."""
+        catalog = TableCatalog(ConnectionPool(db_path))
+        steps = catalog.get("DailyStepCount")
+        
+        assert catalog.table_names() == ["DailyStepCount", "Notes"]
+        assert steps["columns"] == ["date", "total_value"]
+        assert steps["column_types"] == {"date": "TEXT", "total_value": "REAL"}
+        assert steps["record_count"] == 3
+        assert (steps["min_date"], steps["max_date"]) == ("2023-01-01", "2023-01-03")
+        assert catalog.get("Notes")["min_date"] is None
+    
+    def test_summary(self, db_path):
+        """Test the summary served by /api/data_summary."""
+        summary = TableCatalog(ConnectionPool(db_path)).summary()
+        
+        assert summary["total_tables"] == 2
+        assert summary["tables"][0] == {
+            "name": "DailyStepCount",
+            "record_count": 3,
+            "columns": ["date", "total_value"],
+            "date_range": "2023-01-01 to 2023-01-03",
+        }
+    
+    def test_refreshes_only_on_version_change(self, db_path):
+        """Test that metadata is reloaded only after the database changes."""
+        catalog = TableCatalog(ConnectionPool(db_path))
+        with patch.object(catalog, "_load", wraps=catalog._load) as mock_load:
+            catalog.tables()
+            catalog.tables()
+            assert mock_load.call_count == 1
+            
+            conn = sqlite3.connect(db_path)
+            conn.execute("INSERT INTO DailyStepCount VALUES ('2023-01-04', 9000)")
+            conn.commit()
+            conn.close()
+            
+            assert catalog.get("DailyStepCount")["record_count"] == 4
+            assert mock_load.call_count == 2
+    
+    def test_missing_database(self, tmp_path):
+        """Test that a missing database yields an empty catalog."""
+        catalog = TableCatalog(ConnectionPool(str(tmp_path / "missing.db")))
+        assert catalog.tables() == {}
+        assert catalog.summary() == {"total_tables": 0, "tables": []}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,130 @@
+"""
+Tests for the FitTrackAI connection pool
+"""
+
+import pytest
+import sqlite3
+import threading
+
+# Import the pool
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_pool import ConnectionPool
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Create a small on-disk database."""
+    path = str(tmp_path / "health.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE DailyStepCount (date TEXT, total_value REAL)")
+    conn.execute("INSERT INTO DailyStepCount VALUES ('2023-01-01', 8000)")
+    conn.commit()
+    conn.close()
+    return path
+
+
+class TestConnectionPool:
+    """Test ConnectionPool class."""
+    
+    def test_connection_is_read_only(self, db_path):
+        """Test that pooled connections refuse writes."""
+        pool = ConnectionPool(db_path)
+        with pool.connection() as conn:
+            with pytest.raises(sqlite3.OperationalError):
+                conn.execute("INSERT INTO DailyStepCount VALUES ('2023-01-02', 1)")
+    
+    def test_pragmas_and_wal(self, db_path):
+        """Test that connections are configured for fast reads."""
+        pool = ConnectionPool(db_path, mmap_size=1024 * 1024, cache_size_kb=2048)
+        with pool.connection() as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            assert conn.execute("PRAGMA mmap_size").fetchone()[0] == 1024 * 1024
+            assert conn.execute("PRAGMA cache_size").fetchone()[0] == -2048
+    
+    def test_nested_use_reuses_connection(self, db_path):
+        """Test that a thread reuses its connection in nested blocks."""
+        pool = ConnectionPool(db_path, max_size=1)
+        with pool.connection() as outer:
+            with pool.connection() as inner:
+                assert inner is outer
+        assert pool.stats() == {"size": 1, "idle": 1, "in_use": 0, "max_size": 1}
+    
+    def test_pool_is_bounded(self, db_path):
+        """Test that an exhausted pool times out instead of growing."""
+        pool = ConnectionPool(db_path, max_size=1, timeout=0.1)
+        errors = []
+        
+        def worker():
+            try:
+                with pool.connection():
+                    pass
+            except RuntimeError as e:
+                errors.append(e)
+        
+        with pool.connection():
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join()
+        
+        assert len(errors) == 1
+        assert pool.stats()["size"] == 1
+    
+    def test_health_check_drops_replaced_file(self, db_path):
+        """Test that connections to a replaced database file are dropped."""
+        pool = ConnectionPool(db_path)
+        with pool.connection():
+            pass
+        
+        os.replace(db_path, db_path + ".old")
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE Other (x INTEGER)")
+        conn.commit()
+        conn.close()
+        
+        result = pool.health_check()
+        assert result["dropped"] == 1
+        with pool.connection() as conn:
+            tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master")]
+        assert tables == ["Other"]
+    
+    def test_data_version_tracks_commits(self, db_path):
+        """Test that the version token changes only when data is committed."""
+        pool = ConnectionPool(db_path)
+        before = pool.data_version()
+        assert pool.data_version() == before
+        
+        conn = sqlite3.connect(db_path)
+        conn.execute("INSERT INTO DailyStepCount VALUES ('2023-01-02', 9000)")
+        conn.commit()
+        conn.close()
+        
+        assert pool.data_version() != before
+    
+    def test_missing_database(self, tmp_path):
+        """Test that a missing database is not created by readers."""
+        path = str(tmp_path / "missing.db")
+        pool = ConnectionPool(path)
+        with pytest.raises(sqlite3.OperationalError):
+            with pool.connection():
+                pass
+        assert not os.path.exists(path)
+        assert pool.stats()["size"] == 0
+        assert pool.data_version() is None
+    
+    def test_close_releases_connections_in_use(self, db_path):
+        """Test that connections checked out when the pool closes are closed on release."""
+        pool = ConnectionPool(db_path)
+        with pool.connection():
+            pool.close()
+            assert pool.stats()["in_use"] == 1
+        assert pool.stats()["size"] == 0
+        
+        pool.data_version()
+        assert pool._version_conn is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
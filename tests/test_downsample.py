@@ -0,0 +1,85 @@
+"""
+Tests for the FitTrackAI LTTB downsampler
+"""
+
+import pytest
+import numpy as np
+
+# Import the downsampler
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from downsample import lttb
+
+
+@pytest.fixture
+def signal():
+    """Create a noisy random walk with a few isolated spikes."""
+    rng = np.random.default_rng(3)
+    y = np.cumsum(rng.normal(size=20000))
+    y[[4000, 12345, 17000]] += [80, -90, 60]
+    return np.arange(len(y), dtype=np.float64), y
+
+
+def envelope_loss(y, keep, windows=100):
+    """Get how much of each window's min-max range the kept points miss, on average."""
+    window = np.arange(len(y)) * windows // len(y)
+    lost = 0.0
+    for i in range(windows):
+        values, kept = y[window == i], y[keep][window[keep] == i]
+        if len(kept) == 0:
+            lost += values.max() - values.min()
+        else:
+            lost += (values.max() - kept.max()) + (kept.min() - values.min())
+    return lost / windows
+
+
+class TestLTTB:
+    """Test lttb function."""
+    
+    def test_short_series_are_untouched(self):
+        """Test that series within the budget keep every point."""
+        keep, = lttb(np.arange(5), np.arange(5.0), 10)
+        assert keep.tolist() == [0, 1, 2, 3, 4]
+    
+    def test_bounded_and_keeps_extremes(self, signal):
+        """Test the point budget and that the ends, minimum and maximum are always kept."""
+        x, y = signal
+        keep, = lttb(x, y, 500)
+        
+        assert len(keep) <= 500
+        assert np.all(np.diff(keep) > 0)
+        assert {0, len(y) - 1, int(y.argmin()), int(y.argmax())} <= set(keep.tolist())
+    
+    def test_faithful_to_the_shape(self, signal):
+        """Test that the spikes survive and the peaks are kept far better than by a plain stride."""
+        x, y = signal
+        keep, = lttb(x, y, 500)
+        stride = np.unique(np.append(np.arange(0, len(y), len(y) // 500), len(y) - 1))
+        
+        assert {4000, 12345, 17000} <= set(keep.tolist())
+        assert envelope_loss(y, keep) < envelope_loss(y, stride) / 2
+    
+    def test_columns_in_one_pass(self, signal):
+        """Test that several columns at once pick the same points as one at a time."""
+        x, y = signal
+        other = np.sin(x / 300) * 20
+        both = lttb(x, np.column_stack([y, other]), 300)
+        
+        assert np.array_equal(both[0], lttb(x, y, 300)[0])
+        assert np.array_equal(both[1], lttb(x, other, 300)[0])
+    
+    def test_dates_and_missing_values(self):
+        """Test datetime x values and gaps of missing values."""
+        x = np.arange("2015-01-01", "2025-01-01", dtype="datetime64[D]").astype("datetime64[ns]")
+        y = np.sin(np.arange(len(x)) / 50.0)
+        y[100:400] = np.nan
+        keep, = lttb(x, y, 200)
+        
+        assert len(keep) <= 200
+        assert not np.isnan(y[keep[1:-1]]).all()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
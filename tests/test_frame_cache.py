@@ -0,0 +1,127 @@
+"""
+Tests for the FitTrackAI DataFrame cache
+"""
+
+import pytest
+import pandas as pd
+
+# Import the cache
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frame_cache import FrameCache, frame_nbytes, compact_frame
+
+
+def make_frame(rows: int) -> pd.DataFrame:
+    """Create a numeric frame of a given length."""
+    return pd.DataFrame({'total_value': [float(i) for i in range(rows)]})
+
+
+class TestFrameCache:
+    """Test FrameCache class."""
+    
+    def test_hit_and_miss_counters(self):
+        """Test that lookups are counted."""
+        cache = FrameCache()
+        assert cache.get(('DailyStepCount', 1)) is None
+        cache.put(('DailyStepCount', 1), make_frame(10))
+        assert cache.get(('DailyStepCount', 1)) is not None
+        
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+        assert stats["hit_rate"] == 0.5
+    
+    def test_returned_frames_do_not_modify_cache(self):
+        """Test that callers cannot change cached frames."""
+        cache = FrameCache()
+        first = cache.put('steps', make_frame(5))
+        first['total_value'] = 0.0
+        first.loc[1, 'total_value'] = 99.0
+        
+        second = cache.get('steps')
+        second['moving_avg'] = second['total_value'].rolling(2).mean()
+        second.loc[0, 'total_value'] = -1.0
+        
+        assert list(cache.get('steps').columns) == ['total_value']
+        assert cache.get('steps')['total_value'].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+    
+    def test_lru_eviction_by_bytes(self):
+        """Test that the least recently used frames are evicted over budget."""
+        size = frame_nbytes(make_frame(100))
+        cache = FrameCache(max_bytes=size * 2)
+        cache.put('a', make_frame(100))
+        cache.put('b', make_frame(100))
+        cache.get('a')
+        cache.put('c', make_frame(100))
+        
+        assert cache.get('b') is None
+        assert cache.get('a') is not None
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["bytes"] == size * 2
+    
+    def test_oversized_frame_not_cached(self):
+        """Test that frames larger than the budget bypass the cache."""
+        cache = FrameCache(max_bytes=10)
+        cache.put('big', make_frame(100))
+        assert cache.stats()["entries"] == 0
+    
+    def test_get_or_load(self):
+        """Test that the loader only runs on a miss."""
+        cache = FrameCache()
+        calls = []
+        
+        def loader():
+            calls.append(1)
+            return make_frame(3)
+        
+        cache.get_or_load('steps', loader)
+        cache.get_or_load('steps', loader)
+        assert len(calls) == 1
+    
+    def test_invalidate(self):
+        """Test dropping entries by key predicate."""
+        cache = FrameCache()
+        cache.put(('DailyStepCount', 1), make_frame(3))
+        cache.put(('DailySleepSummary', 1), make_frame(3))
+        
+        assert cache.invalidate(lambda k: k[0] == 'DailyStepCount') == 1
+        assert cache.get(('DailySleepSummary', 1)) is not None
+        assert cache.stats()["bytes"] == frame_nbytes(make_frame(3))
+
+
+
+class TestCompactFrame:
+    """Test the compact typed schema."""
+    
+    def test_types(self):
+        """Test dates, lossless narrowing and categoricals."""
+        df = compact_frame(pd.DataFrame({
+            'date': ['2023-01-01', '2023-01-02 08:30:00', None, '2023-01-04'],
+            'total_value': [8000.0, 7500.5, None, 12000.0],
+            'avg_value': [0.1, 1.2, 1.3, 1.4],
+            'count': [1, 2, 3, 4],
+            'source': ['Watch', 'Watch', 'Phone', 'Watch'],
+            'note': ['a', 'b', 'c', 'd'],
+        }))
+        
+        assert df['date'].dtype == 'datetime64[ns]'
+        assert df['date'].iloc[1] == pd.Timestamp('2023-01-02 08:30:00')
+        assert df['total_value'].dtype == 'float32'
+        assert df['avg_value'].dtype == 'float64'
+        assert df['count'].dtype == 'int32'
+        assert df['source'].dtype == 'category'
+        assert df['note'].dtype == object
+    
+    def test_uncompactable_columns_are_kept(self):
+        """Test that unparseable dates stay text and compact frames are returned as is."""
+        df = compact_frame(pd.DataFrame({'date': ['2023-01-01', 'yesterday']}))
+        assert df['date'].dtype == object
+        
+        typed = compact_frame(pd.DataFrame({'total_value': [1.0, 2.0]}))
+        assert compact_frame(typed) is typed
+        assert frame_nbytes(typed) < frame_nbytes(pd.DataFrame({'total_value': [1.0, 2.0]}))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,175 @@
+"""
+Tests for the FitTrackAI Apple Health ingester
+"""
+
+import pytest
+import sqlite3
+import zipfile
+
+# Import the ingester
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ingest
+from ingest import ingest_export, iter_records, get_state
+
+
+def record(type_, start, value, created, source="iPhone", unit="count", offset="-0500"):
+    """Build one <Record> element the way Apple Health writes it."""
+    return (f'<Record type="{type_}" sourceName="{source}" unit="{unit}" '
+            f'creationDate="{created} {offset}" startDate="{start} {offset}" '
+            f'endDate="{start} {offset}" value="{value}">'
+            f'<MetadataEntry key="HKWasUserEntered" value="0"/></Record>')
+
+
+def write_export(path, records):
+    """Write an export.xml with the usual header, DTD and non-Record elements."""
+    with open(path, "w") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<!DOCTYPE HealthData [\n<!ELEMENT HealthData (ExportDate,Me,(Record|Workout)*)>\n]>\n'
+                '<HealthData locale="en_US">\n<ExportDate value="2023-01-10 00:00:00 -0500"/>\n'
+                '<Me HKCharacteristicTypeIdentifierDateOfBirth=""/>\n')
+        for rec in records:
+            f.write(rec + "\n")
+        f.write('<Workout workoutActivityType="HKWorkoutActivityTypeWalking" duration="30"/>\n'
+                '</HealthData>\n')
+    return str(path)
+
+
+STEPS = "HKQuantityTypeIdentifierStepCount"
+SLEEP = "HKCategoryTypeIdentifierSleepAnalysis"
+
+FIRST = [
+    record(STEPS, "2023-01-01 08:00:00", 120, "2023-01-01 09:00:00"),
+    record(STEPS, "2023-01-01 09:00:00", 80, "2023-01-01 10:00:00"),
+    record(SLEEP, "2023-01-01 23:00:00", "HKCategoryValueSleepAnalysisAsleep", "2023-01-02 07:00:00", unit=""),
+    record(STEPS, "2023-01-05 08:00:00", 300, "2023-01-05 09:00:00"),
+]
+LATER = FIRST + [
+    record(STEPS, "2023-01-20 08:00:00", 500, "2023-01-20 09:00:00"),
+    record(STEPS, "2023-01-20 08:00:00", 500, "2023-01-20 09:00:00", source="Watch"),
+]
+
+
+def read_records(db_path):
+    """Get every ingested row."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT * FROM Record ORDER BY start_date, source_name").fetchall()
+    finally:
+        conn.close()
+
+
+class TestIngest:
+    """Test the streaming ingester."""
+    
+    def test_iter_records(self, tmp_path):
+        """Test that Records are parsed and other elements ignored."""
+        path = write_export(tmp_path / "export.xml", FIRST)
+        with open(path, "rb") as f:
+            rows = list(iter_records(f))
+        
+        assert len(rows) == 4
+        assert rows[0] == (STEPS, "iPhone", "count", 120.0, None,
+                           "2023-01-01 08:00:00", "2023-01-01 08:00:00", "2023-01-01 09:00:00", "-0500")
+        assert rows[2][3:5] == (None, "HKCategoryValueSleepAnalysisAsleep")
+    
+    def test_reingest_is_incremental(self, tmp_path):
+        """Test that a newer export only adds its new records."""
+        db_path = str(tmp_path / "db" / "health.db")
+        stats = ingest_export(write_export(tmp_path / "export.xml", FIRST), db_path)
+        assert stats["inserted"] == 4
+        assert stats["watermark"] == "2023-01-05 09:00:00"
+        
+        stats = ingest_export(write_export(tmp_path / "export2.xml", LATER), db_path)
+        assert stats["inserted"] == 2
+        # Records created well before the watermark are never sent to SQLite
+        assert stats["skipped"] == 3
+        assert stats["duplicates"] == 1
+        assert len(read_records(db_path)) == 6
+    
+    def test_full_reingest_deduplicates(self, tmp_path):
+        """Test that re-checking every record inserts nothing twice."""
+        db_path = str(tmp_path / "health.db")
+        export = write_export(tmp_path / "export.xml", LATER)
+        ingest_export(export, db_path)
+        
+        stats = ingest_export(export, db_path, full=True)
+        assert stats["inserted"] == 0
+        assert stats["duplicates"] == 6
+    
+    def test_dst_fall_back_hour(self, tmp_path):
+        """Test that records at the same wall-clock time on either side of the DST change are both kept."""
+        db_path = str(tmp_path / "health.db")
+        export = write_export(tmp_path / "export.xml", [
+            record(STEPS, "2023-11-05 01:30:00", 40, "2023-11-05 02:00:00", offset="-0400"),
+            record(STEPS, "2023-11-05 01:30:00", 60, "2023-11-05 02:00:00", offset="-0500"),
+        ])
+        
+        assert ingest_export(export, db_path)["inserted"] == 2
+        assert ingest_export(export, db_path, full=True)["inserted"] == 0
+        assert [row[3] for row in read_records(db_path)] == [40.0, 60.0]
+    
+    def test_records_without_offsets_are_claimed(self, tmp_path):
+        """Test that a database from before utc_offset is not duplicated by a full re-ingest."""
+        db_path = str(tmp_path / "health.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE Record (type TEXT NOT NULL, source_name TEXT NOT NULL, unit TEXT, value REAL, "
+                     "value_text TEXT, start_date TEXT NOT NULL, end_date TEXT NOT NULL, creation_date TEXT)")
+        conn.execute("CREATE UNIQUE INDEX idx_Record_dedup ON Record (type, start_date, end_date, source_name)")
+        conn.execute("INSERT INTO Record VALUES (?, 'iPhone', 'count', 40, NULL, ?, ?, ?)",
+                     (STEPS, "2023-11-05 01:30:00", "2023-11-05 01:30:00", "2023-11-05 02:00:00"))
+        conn.commit()
+        conn.close()
+        export = write_export(tmp_path / "export.xml", [
+            record(STEPS, "2023-11-05 01:30:00", 40, "2023-11-05 02:00:00", offset="-0400"),
+            record(STEPS, "2023-11-05 01:30:00", 60, "2023-11-05 02:00:00", offset="-0500"),
+        ])
+        
+        assert ingest_export(export, db_path, full=True)["inserted"] == 1
+        assert [(row[3], row[8]) for row in read_records(db_path)] == [(40.0, "-0400"), (60.0, "-0500")]
+        conn = sqlite3.connect(db_path)
+        assert get_state(conn, "legacy_offsets") is None
+        conn.close()
+    
+    def test_interrupted_ingest_resumes(self, tmp_path, monkeypatch):
+        """Test that a rerun after a failure continues after the last committed batch."""
+        db_path = str(tmp_path / "health.db")
+        export = write_export(tmp_path / "export.xml", LATER)
+        real_iter = ingest.iter_records
+        
+        def failing(stream):
+            for i, row in enumerate(real_iter(stream)):
+                if i == 3:
+                    raise RuntimeError("disk full")
+                yield row
+        
+        monkeypatch.setattr(ingest, "iter_records", failing)
+        with pytest.raises(RuntimeError):
+            ingest_export(export, db_path, batch_size=2)
+        assert len(read_records(db_path)) == 2
+        
+        monkeypatch.setattr(ingest, "iter_records", real_iter)
+        stats = ingest_export(export, db_path, batch_size=2)
+        assert stats["resumed"] == 2
+        assert stats["inserted"] == 4
+        assert len(read_records(db_path)) == 6
+        
+        conn = sqlite3.connect(db_path)
+        assert get_state(conn, "resume_count") is None
+        conn.close()
+    
+    def test_zip_export(self, tmp_path):
+        """Test reading export.xml straight out of export.zip."""
+        xml_path = write_export(tmp_path / "export.xml", FIRST)
+        zip_path = str(tmp_path / "export.zip")
+        with zipfile.ZipFile(zip_path, "w") as archive:
+            archive.write(xml_path, "apple_health_export/export.xml")
+        
+        stats = ingest_export(zip_path, str(tmp_path / "health.db"))
+        assert stats["inserted"] == 4
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,124 @@
+"""
+Tests for the FitTrackAI LLM executor
+"""
+
+import pytest
+import time
+import threading
+from types import SimpleNamespace
+
+# Import the executor
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_executor import LLMExecutor, ExecutorBusy
+from ollama_service import OllamaService
+import app as app_module
+from app import app, socketio
+
+
+def blocker(executor):
+    """Occupy a worker until the returned event is set."""
+    release = threading.Event()
+    job = executor.submit(lambda job: release.wait(5))
+    return job, release
+
+
+@pytest.fixture
+def executor():
+    """Create an executor with one worker and room for two waiting jobs."""
+    return LLMExecutor(max_workers=1, max_queue=2, timeout=5.0)
+
+
+class TestLLMExecutor:
+    """Test LLMExecutor class."""
+    
+    def test_admission_and_queue_positions(self, executor):
+        """Test that jobs queue in order up to the depth limit and are refused beyond it."""
+        first, release = blocker(executor)
+        second = executor.submit(lambda job: "second")
+        third = executor.submit(lambda job: "third")
+        assert (first.position, second.position, third.position) == (0, 1, 2)
+        
+        with pytest.raises(ExecutorBusy) as busy:
+            executor.submit(lambda job: "fourth")
+        assert busy.value.retry_after >= 1
+        
+        release.set()
+        assert executor.wait(third, time.sleep) == "third"
+        assert second.future.result() == "second"
+        assert executor.stats()["rejected"] == 1 and executor.stats()["completed"] == 3
+    
+    def test_deadline_while_queued(self, executor):
+        """Test that a job still queued at its deadline times out without running."""
+        _, release = blocker(executor)
+        ran = []
+        job = executor.submit(lambda job: ran.append(1), timeout=0.1)
+        
+        with pytest.raises(TimeoutError):
+            executor.wait(job, time.sleep, poll=0.01)
+        release.set()
+        time.sleep(0.05)
+        assert ran == [] and executor.stats()["queued"] == 0 and executor.stats()["expired"] == 1
+    
+    def test_stream_reports_position_then_items(self, executor):
+        """Test that a streamed job yields its place in line, then its items."""
+        first, release = blocker(executor)
+        job = executor.stream(lambda: iter(["a", "b"]))
+        items = executor.iter_job(job, time.sleep, poll=0.01)
+        
+        assert next(items) == {"queued": 1}
+        release.set()
+        assert [item for item in items if not isinstance(item, dict)] == ["a", "b"]
+    
+    def test_closing_cancels_stream(self, executor):
+        """Test that abandoning a stream stops the generator on the worker."""
+        state = {"closed": False, "produced": 0}
+        
+        def produce():
+            try:
+                while True:
+                    state["produced"] += 1
+                    yield f"token {state['produced']}"
+                    time.sleep(0.01)
+            finally:
+                state["closed"] = True
+        
+        job = executor.stream(produce)
+        items = executor.iter_job(job, time.sleep, poll=0.01)
+        assert next(item for item in items if item != {"queued": 0}) == "token 1"
+        items.close()
+        
+        job.future.result(timeout=1)
+        assert state["closed"] and executor.stats()["running"] == 0
+
+
+class TestChatAdmission:
+    """Test busy responses of the chat endpoints."""
+    
+    def test_busy_responses(self, monkeypatch):
+        """Test a 429 with Retry-After over HTTP and a busy response over Socket.IO."""
+        executor = LLMExecutor(max_workers=1, max_queue=0)
+        monkeypatch.setattr(app_module, "llm_executor", executor)
+        monkeypatch.setattr(app_module, "ai_system", SimpleNamespace(chat=None, stream_chat=None, ollama=OllamaService()))
+        _, release = blocker(executor)
+        try:
+            app.config['TESTING'] = True
+            with app.test_client() as client:
+                response = client.post('/api/chat', json={"message": "Hello"})
+            assert response.status_code == 429
+            assert int(response.headers['Retry-After']) >= 1
+            
+            socket = socketio.test_client(app)
+            socket.get_received()
+            socket.emit('chat_message', {"id": 1, "message": "Hello"})
+            event = socket.get_received()[-1]["args"][0]
+            assert event["provider"] == "BUSY" and event["retry_after"] >= 1
+            socket.disconnect()
+        finally:
+            release.set()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
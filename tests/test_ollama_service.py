@@ -0,0 +1,196 @@
+"""
+Tests for the FitTrackAI Ollama service
+"""
+
+import pytest
+import time
+from types import SimpleNamespace
+
+# Import the Ollama service
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ollama_service
+from ollama_service import OllamaService, CircuitOpen
+import app as app_module
+from app import app
+
+
+class Clock:
+    """Clock that only moves when told to."""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+class FailingLLM:
+    """LLM client whose calls fail until it is told to recover."""
+    
+    def __init__(self):
+        self.down = True
+        self.calls = 0
+    
+    def invoke(self, messages):
+        self.calls += 1
+        if self.down:
+            raise ConnectionError("connection refused")
+        return SimpleNamespace(content="Hi!")
+    
+    def stream(self, messages):
+        self.calls += 1
+        if self.down:
+            raise ConnectionError("connection refused")
+        yield SimpleNamespace(content="Hi!")
+
+
+def tags_response(*models):
+    """Build a stand-in for the /api/tags response listing ``models``."""
+    return SimpleNamespace(raise_for_status=lambda: None,
+                           json=lambda: {"models": [{"name": name} for name in models]})
+
+
+def refuse(url, timeout):
+    """Stand in for requests.get while Ollama is not running."""
+    raise ConnectionError("connection refused")
+
+
+@pytest.fixture
+def clock():
+    """Create a fake clock."""
+    return Clock()
+
+
+@pytest.fixture
+def llm():
+    """Create an LLM client that is down."""
+    return FailingLLM()
+
+
+@pytest.fixture
+def service(clock, llm):
+    """Create a service over the failing client that opens after two failures."""
+    return OllamaService(client_factory=lambda: llm, failure_threshold=2, backoff=1.0, max_backoff=4.0,
+                         clock=clock)
+
+
+def invoke(service):
+    """Make one chat call through the breaker."""
+    return service.call(lambda client: client.invoke(["Hello"]))
+
+
+class TestOllamaService:
+    """Test OllamaService class."""
+    
+    def test_construction_is_lazy(self, monkeypatch):
+        """Test that creating the service neither builds the client nor contacts Ollama."""
+        built = []
+        monkeypatch.setattr(ollama_service.requests, "get", refuse)
+        service = OllamaService(client_factory=lambda: built.append(1) or object())
+        
+        assert built == [] and service.stats()["probes"] == 0 and service.available()
+        service.client()
+        service.client()
+        assert built == [1]
+    
+    def test_opens_after_threshold_and_fails_fast(self, service, llm):
+        """Test that consecutive failures open the breaker and further calls never reach Ollama."""
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                invoke(service)
+        
+        with pytest.raises(CircuitOpen) as down:
+            invoke(service)
+        assert down.value.retry_after == 1
+        assert llm.calls == 2 and not service.available()
+        assert service.stats()["state"] == "open" and service.stats()["rejected"] == 1
+    
+    def test_half_open_trial_and_recovery(self, service, llm, clock):
+        """Test that one trial is let through at the retry time and its success closes the breaker."""
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                invoke(service)
+        clock.now = 1.0
+        llm.down = False
+        
+        service.check()
+        with pytest.raises(CircuitOpen):
+            invoke(service)
+        service._succeeded()
+        assert invoke(service).content == "Hi!" and service.available()
+    
+    def test_backoff_doubles_up_to_limit(self, service, clock):
+        """Test that each failed trial reopens the breaker for twice as long, up to the maximum."""
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                invoke(service)
+        
+        waits = []
+        for _ in range(4):
+            clock.now += service.stats()["retry_in"]
+            with pytest.raises(ConnectionError):
+                invoke(service)
+            waits.append(service.stats()["retry_in"])
+        assert waits == [2.0, 4.0, 4.0, 4.0]
+    
+    def test_abandoned_stream_releases_trial(self, service, llm, clock):
+        """Test that a stream closed before its first token lets another trial through."""
+        service._failed(ConnectionError("down"), trip=True)
+        clock.now = 1.0
+        llm.down = False
+        
+        items = service.stream(lambda client: client.stream(["Hello"]))
+        next(items)
+        items.close()
+        assert service.available()
+        
+        service._failed(ConnectionError("down"), trip=True)
+        clock.now = 10.0
+        service.stream(lambda client: client.stream(["Hello"])).close()
+        assert [item.content for item in service.stream(lambda client: client.stream(["Hello"]))] == ["Hi!"]
+    
+    def test_probe(self, service, monkeypatch, clock):
+        """Test that probes open the breaker while Ollama is down and close it once it answers."""
+        monkeypatch.setattr(ollama_service.requests, "get", refuse)
+        assert not service.probe() and not service.available()
+        assert service._next_probe() == 1.0
+        
+        monkeypatch.setattr(ollama_service.requests, "get", lambda url, timeout: tags_response("mistral:latest"))
+        assert service.probe() and service.available() and service.model_available is False
+        monkeypatch.setattr(ollama_service.requests, "get", lambda url, timeout: tags_response("llama2:latest"))
+        assert service.probe() and service.model_available
+        assert service._next_probe() == service.interval
+    
+    def test_start_runs_once(self, service):
+        """Test that the probe loop is only started once."""
+        started = []
+        start_task = lambda run, sleep: started.append(run)
+        
+        assert service.start(start_task, time.sleep)
+        assert not service.start(start_task, time.sleep)
+        assert len(started) == 1
+
+
+class TestChatWhileDown:
+    """Test the chat endpoints while Ollama is down."""
+    
+    def test_unavailable_response(self, service, monkeypatch):
+        """Test a 503 with Retry-After and the status reported by /api/llm_status."""
+        service._failed(ConnectionError("down"), trip=True)
+        monkeypatch.setattr(app_module, "ollama_service", service)
+        monkeypatch.setattr(app_module, "ai_system", SimpleNamespace(ollama=service))
+        
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            response = client.post('/api/chat', json={"message": "Hello"})
+            status = client.get('/api/llm_status').get_json()
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == "1"
+        assert status["llm_available"] is False and status["ollama"]["state"] == "open"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
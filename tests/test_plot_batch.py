@@ -0,0 +1,164 @@
+"""
+Tests for the FitTrackAI plot batches
+"""
+
+import pytest
+import json
+import time
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+# Import the batch helpers
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from plot_batch import SharedLoads, render_batch, MAX_BATCH_PLOTS
+from plot_cache import PlotCache
+import app as app_module
+from app import app, socketio, DataManager
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Create a test client over a database with steps and calories and an empty plot cache."""
+    db_path = str(tmp_path / "health.db")
+    conn = sqlite3.connect(db_path)
+    for table in ["DailyStepCount", "DailyActiveCalories", "DailyBasalCalories"]:
+        conn.execute(f"CREATE TABLE {table} (date TEXT, total_value REAL)")
+        conn.executemany(f"INSERT INTO {table} VALUES (?, ?)",
+                         [(f"2023-01-{day:02d}", day * 100.0) for day in range(1, 29)])
+    conn.commit()
+    conn.close()
+    
+    monkeypatch.setattr(app_module, "data_manager", DataManager(db_path))
+    monkeypatch.setattr(app_module, "plot_cache", PlotCache())
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def read_lines(response):
+    """Parse an NDJSON response into a dict of results by plot index."""
+    lines = [json.loads(line) for line in response.get_data().splitlines()]
+    return {line["index"]: line["result"] for line in lines}
+
+
+class TestSharedLoads:
+    """Test SharedLoads class."""
+    
+    def test_concurrent_requests_load_once(self):
+        """Test that plots asking for the same load at once share one run."""
+        loads = SharedLoads()
+        calls = []
+        
+        def load():
+            calls.append(1)
+            time.sleep(0.05)
+            return "frame"
+        
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda _: loads.get(("DailyStepCount",), load), range(4)))
+        
+        assert results == ["frame"] * 4
+        assert len(calls) == 1
+        assert loads.stats() == {"loads": 1, "shared": 3}
+    
+    def test_errors_reach_every_waiter(self):
+        """Test that a failed load raises for each plot that asked for it."""
+        loads = SharedLoads()
+        
+        def load():
+            raise RuntimeError("no such table")
+        
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                loads.get("key", load)
+        assert loads.stats()["loads"] == 1
+
+
+class TestRenderBatch:
+    """Test render_batch function."""
+    
+    def test_results_arrive_as_they_finish(self):
+        """Test that a slow plot does not hold back the fast ones."""
+        def render(delay):
+            time.sleep(delay)
+            if delay < 0:
+                raise ValueError("bad")
+            return delay
+        
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            results = list(render_batch([0.2, 0.0, -1], render, executor, time.sleep))
+        
+        assert results[-1] == (0, 0.2)
+        assert (2, None) in results
+    
+    def test_waits_with_given_sleep(self):
+        """Test that waiting for results goes through the caller's sleep, not a blocking wait."""
+        naps = []
+        
+        def sleep(seconds):
+            naps.append(seconds)
+            time.sleep(seconds)
+        
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            results = list(render_batch([0.1], lambda delay: time.sleep(delay) or delay, executor, sleep, 0.01))
+        
+        assert results == [(0, 0.1)]
+        assert naps and set(naps) == {0.01}
+
+
+class TestPlotsRoute:
+    """Test the /api/plots endpoint and the plot_batch event."""
+    
+    def test_streams_every_plot(self, client):
+        """Test one NDJSON line per plot, with per-plot errors and shared defaults."""
+        response = client.post('/api/plots', json={
+            "resolution": "day",
+            "plots": [{"type": "daily_steps"}, {"type": "calories_burned", "format": "binary"},
+                      {"type": "daily_steps", "start": "bad"}, {"type": "nope"}],
+        })
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        
+        results = read_lines(response)
+        assert sorted(results) == [0, 1, 2, 3]
+        assert results[0]["type"] == "daily_steps" and results[0]["resolution"] == "day"
+        assert "bdata" in json.dumps(results[1]["plot"])
+        assert results[2]["error"].startswith("Invalid date window")
+        assert "Unknown plot type" in results[3]["error"]
+    
+    def test_matching_loads_are_shared(self, client):
+        """Test that plots of the same table slice load it once."""
+        with patch.object(DataManager, 'query', autospec=True, side_effect=DataManager.query) as query:
+            response = client.post('/api/plots', json={"plots": [
+                {"type": "daily_steps", "resolution": "day"},
+                {"type": "daily_steps", "resolution": "day", "format": "binary"},
+                {"type": "daily_steps", "resolution": "day", "max_points": 10},
+            ]})
+            assert len(read_lines(response)) == 3
+        assert query.call_count == 1
+    
+    def test_invalid_batches(self, client):
+        """Test that empty and oversized batches are bad requests."""
+        assert client.post('/api/plots', json={"plots": []}).status_code == 400
+        too_many = [{"type": "daily_steps"}] * (MAX_BATCH_PLOTS + 1)
+        assert client.post('/api/plots', json={"plots": too_many}).status_code == 400
+    
+    def test_socket_batch(self, client):
+        """Test that plot_batch emits each plot and then a done event."""
+        socket = socketio.test_client(app)
+        socket.get_received()
+        socket.emit('plot_batch', {"plots": [{"type": "daily_steps"}, {"type": "calories_burned"}]})
+        events = socket.get_received()
+        
+        names = [event["name"] for event in events]
+        assert names == ["plot_result", "plot_result", "plot_batch_done"]
+        assert sorted(event["args"][0]["index"] for event in events[:2]) == [0, 1]
+        socket.disconnect()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,121 @@
+"""
+Tests for the FitTrackAI plot cache
+"""
+
+import pytest
+import sqlite3
+from unittest.mock import patch
+
+# Import the cache
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from plot_cache import PlotCache, plot_key, body_etag
+import app as app_module
+from app import app, DataManager, PlotGenerator
+
+
+class TestPlotCache:
+    """Test PlotCache class."""
+    
+    def test_keys_and_etags(self):
+        """Test that keys follow the plot parameters and ETags follow the bytes."""
+        assert plot_key("db", 1, "daily_steps", None) == plot_key("db", 1, "daily_steps", None)
+        assert plot_key("db", 1, "daily_steps", None) != plot_key("db", 2, "daily_steps", None)
+        assert body_etag(b'{"plot": 1}') != body_etag(b'{"plot": 2}')
+    
+    def test_memory_hit(self):
+        """Test storing and finding a payload."""
+        cache = PlotCache()
+        assert cache.get("k") is None
+        etag, body = cache.put("k", b'{"plot": "x"}')
+        
+        assert cache.get("k") == (etag, body)
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+    
+    def test_eviction_spills_to_disk(self, tmp_path):
+        """Test that entries pushed out of memory are served from disk."""
+        cache = PlotCache(max_bytes=20, spill_dir=str(tmp_path / "spill"))
+        first = cache.put("a", b"x" * 15)
+        cache.put("b", b"y" * 15)
+        
+        assert cache.stats()["evictions"] == 1
+        assert cache.get("a") == first
+        assert cache.stats()["disk_hits"] == 1
+        
+        # A new process finds the spilled entries too
+        assert PlotCache(spill_dir=str(tmp_path / "spill")).get("a") == first
+    
+    def test_spill_is_bounded(self, tmp_path):
+        """Test that the oldest spill files are pruned beyond the disk budget."""
+        cache = PlotCache(max_bytes=10, spill_dir=str(tmp_path), max_spill_bytes=25)
+        for key in "abcde":
+            cache.put(key, key.encode() * 10)
+        
+        assert cache.stats()["spill_bytes"] <= 25
+        assert cache.get("a") is None
+
+
+class TestPlotRoute:
+    """Test ETag handling on /api/plot."""
+    
+    @pytest.fixture
+    def client(self, tmp_path, monkeypatch):
+        """Create a test client over a small database with an empty plot cache."""
+        db_path = str(tmp_path / "health.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE DailyStepCount (date TEXT, total_value REAL)")
+        conn.executemany("INSERT INTO DailyStepCount VALUES (?, ?)",
+                         [("2023-01-01", 8000), ("2023-01-02", 7500)])
+        conn.commit()
+        conn.close()
+        
+        monkeypatch.setattr(app_module, "data_manager", DataManager(db_path))
+        monkeypatch.setattr(app_module, "plot_cache", PlotCache())
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            yield client, db_path
+    
+    def test_repeat_loads_revalidate(self, client):
+        """Test that a repeat request is served from the cache and answers If-None-Match with 304."""
+        client, _ = client
+        body = {"type": "daily_steps", "resolution": "day"}
+        with patch.object(PlotGenerator, 'generate_plot', autospec=True,
+                          side_effect=PlotGenerator.generate_plot) as generate:
+            first = client.post('/api/plot', json=body)
+            again = client.post('/api/plot', json=body)
+            revalidated = client.post('/api/plot', json=body, headers={'If-None-Match': first.headers['ETag']})
+        
+        assert first.status_code == 200 and first.headers['ETag']
+        assert again.get_data() == first.get_data()
+        assert revalidated.status_code == 304
+        assert generate.call_count == 1
+    
+    def test_get_requests(self, client):
+        """Test that plots can be fetched with GET so browser caches revalidate them."""
+        client, _ = client
+        first = client.get('/api/plot?type=daily_steps&resolution=day')
+        assert first.status_code == 200
+        assert client.get('/api/plot?type=daily_steps&resolution=day',
+                          headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+    
+    def test_new_data_changes_etag(self, client):
+        """Test that writes to the database produce a new plot and ETag."""
+        client, db_path = client
+        body = {"type": "daily_steps", "resolution": "day"}
+        first = client.post('/api/plot', json=body)
+        
+        conn = sqlite3.connect(db_path)
+        conn.execute("INSERT INTO DailyStepCount VALUES ('2023-01-03', 12000)")
+        conn.commit()
+        conn.close()
+        
+        response = client.post('/api/plot', json=body, headers={'If-None-Match': first.headers['ETag']})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != first.headers['ETag']
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,180 @@
+"""
+Tests for the FitTrackAI plot images
+"""
+
+import pytest
+import io
+import sqlite3
+from PIL import Image
+
+# Import the image renderer
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from plot_images import (RendererPool, ImageCache, PlotImages, parse_image_options, image_key,
+                         KALEIDO_AVAILABLE, THUMBNAIL_SIZE)
+from plot_cache import PlotCache
+import app as app_module
+from app import app, DataManager, parse_plot_request, render_plot_image
+
+
+def png(width, height):
+    """Create a blank PNG."""
+    out = io.BytesIO()
+    Image.new("RGB", (width, height), "white").save(out, format="PNG")
+    return out.getvalue()
+
+
+class FakePool:
+    """Renderer pool that draws blank images and counts renders."""
+    
+    def __init__(self):
+        self.calls = []
+    
+    def render(self, figure, image_format, width, height, scale=1.0):
+        self.calls.append((image_format, width, height))
+        return png(width, height) if image_format == "png" else b"<svg/>"
+    
+    def stats(self):
+        return {"renders": len(self.calls)}
+
+
+@pytest.fixture
+def images(tmp_path):
+    """Create plot images over a fake pool and an empty cache."""
+    return PlotImages(FakePool(), ImageCache(str(tmp_path / "images")))
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, images):
+    """Create a test client over a database with steps, with fake image rendering."""
+    db_path = str(tmp_path / "health.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE DailyStepCount (date TEXT, total_value REAL)")
+    conn.executemany("INSERT INTO DailyStepCount VALUES (?, ?)",
+                     [(f"2023-01-{day:02d}", day * 100.0) for day in range(1, 29)])
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(app_module, "data_manager", DataManager(db_path))
+    monkeypatch.setattr(app_module, "plot_cache", PlotCache())
+    monkeypatch.setattr(app_module, "plot_images", images)
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+class TestImageOptions:
+    """Test parse_image_options and image_key functions."""
+    
+    def test_defaults_and_validation(self):
+        """Test the default format and sizes, and rejected options."""
+        assert parse_image_options({}) == ("png", 900, 500, False)
+        assert parse_image_options({"format": "webp", "thumbnail": "1"}) == ("webp", *THUMBNAIL_SIZE, True)
+        for params in [{"format": "gif"}, {"width": "wide"}, {"height": 10},
+                       {"format": "svg", "thumbnail": "true"}]:
+            with pytest.raises(ValueError):
+                parse_image_options(params)
+    
+    def test_keys_follow_payload_and_options(self):
+        """Test that the content address changes with the payload and every render option."""
+        key = image_key('{"data": []}', "png", 900, 500)
+        assert key == image_key('{"data": []}', "png", 900, 500)
+        assert key != image_key('{"data": [1]}', "png", 900, 500)
+        assert key != image_key('{"data": []}', "webp", 900, 500)
+        assert key != image_key('{"data": []}', "png", 900, 500, thumbnail=True)
+
+
+class TestPlotImages:
+    """Test PlotImages and ImageCache classes."""
+    
+    def test_rendered_once_then_cached(self, images, tmp_path):
+        """Test that an image is rendered once and then read from its content address."""
+        key, image = images.render('{"data": []}', "svg", 400, 300)
+        assert images.render('{"data": []}', "svg", 400, 300) == (key, image)
+        
+        assert len(images.pool.calls) == 1
+        assert os.path.exists(tmp_path / "images" / key[:2] / f"{key}.svg")
+        assert images.cache.stats()["hits"] == 1
+    
+    def test_thumbnails_reuse_the_full_render(self, images):
+        """Test that thumbnails are downscaled from the cached full-size PNG."""
+        _, thumb = images.render('{"data": []}', "webp", 320, 180, thumbnail=True)
+        images.render('{"data": []}', "png", 160, 90, thumbnail=True)
+        
+        assert images.pool.calls == [("png", 900, 500)]
+        with Image.open(io.BytesIO(thumb)) as picture:
+            assert picture.format == "WEBP"
+            assert picture.size[0] <= 320 and picture.size[1] <= 180
+    
+    def test_cache_is_bounded(self, tmp_path):
+        """Test that the least recently used images are pruned over budget."""
+        cache = ImageCache(str(tmp_path / "images"), max_bytes=25)
+        cache.put("aa01", "png", b"x" * 10)
+        cache.put("bb02", "png", b"x" * 10)
+        os.utime(tmp_path / "images" / "aa" / "aa01.png", (1, 1))
+        cache.put("cc03", "png", b"x" * 10)
+        
+        assert cache.get("aa01", "png") is None
+        assert cache.get("cc03", "png") == b"x" * 10
+        assert cache.stats()["bytes"] <= 25
+    
+    def test_render_plot_image(self, client, images):
+        """Test render_plot_image, which serves /api/plot_image, and its errors."""
+        params = parse_plot_request({"type": "daily_steps"})
+        result = render_plot_image(app_module.data_manager, params, "svg", 600, 400, False)
+        
+        assert result["image"] == b"<svg/>"
+        assert result["mimetype"] == "image/svg+xml" and result["key"]
+        assert images.pool.calls == [("svg", 600, 400)]
+        params = parse_plot_request({"type": "nope"})
+        assert "error" in render_plot_image(app_module.data_manager, params, "svg", 600, 400, False)
+
+
+class TestPlotImageRoute:
+    """Test the /api/plot_image endpoint."""
+    
+    def test_image_and_revalidation(self, client):
+        """Test an image response with an ETag, then a 304 for the same ETag."""
+        response = client.get('/api/plot_image?type=daily_steps&thumbnail=1')
+        assert response.status_code == 200
+        assert response.mimetype == "image/png"
+        assert response.headers['Cache-Control'] == 'no-cache'
+        
+        etag = response.headers['ETag']
+        response = client.get('/api/plot_image?type=daily_steps&thumbnail=1', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+    
+    def test_errors(self, client, monkeypatch):
+        """Test bad options, unknown plots and an unavailable renderer."""
+        assert client.get('/api/plot_image?type=daily_steps&format=gif').status_code == 400
+        assert client.get('/api/plot_image?type=nope').status_code == 400
+        
+        def busy(*args):
+            raise RuntimeError("Renderer pool exhausted")
+        monkeypatch.setattr(app_module.plot_images.pool, "render", busy)
+        assert client.get('/api/plot_image?type=daily_steps&format=svg').status_code == 503
+
+
+@pytest.mark.skipif(not KALEIDO_AVAILABLE, reason="kaleido is not installed")
+class TestRendererPool:
+    """Test RendererPool class with real Kaleido renderers."""
+    
+    def test_renders_and_reuses_processes(self):
+        """Test PNG and SVG output from one long-lived renderer."""
+        pool = RendererPool(max_size=1)
+        try:
+            figure = {"data": [{"type": "scatter", "y": [1, 3, 2]}], "layout": {}}
+            image = pool.render(figure, "png", 300, 200)
+            with Image.open(io.BytesIO(image)) as picture:
+                assert picture.size == (300, 200)
+            assert b"<svg" in pool.render(figure, "svg", 300, 200)
+            assert pool.stats()["size"] == 1 and pool.stats()["renders"] == 2
+        finally:
+            pool.close()
+        assert pool.stats()["size"] == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,252 @@
+"""
+Tests for the FitTrackAI plot specs
+"""
+
+import pytest
+import json
+import base64
+import sqlite3
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.utils import PlotlyJSONEncoder
+
+# Import the specs
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from plot_specs import (PLOT_SPECS, TRACE_OPTIONS, plot_values, build_figure, spec_tables, spec_columns,
+                        typed_array, parse_plot_format, custom_spec)
+import app as app_module
+from app import app, DataManager, PlotGenerator
+
+DAILY_COLUMNS = {
+    "DailyStepCount": "total_value",
+    "DailyActiveCalories": "total_value",
+    "DailyBasalCalories": "total_value",
+    "DailyDistanceWalkRun": "total_value",
+    "DailyFlightsClimbed": "total_value",
+    "DailyWalkingSpeed": "avg_value",
+    "DailyWalkingSteadiness": "avg_value",
+    "DailySleepSummary": "sleep_minutes",
+}
+
+
+def decode(values) -> list:
+    """Decode a typed array back to a list of numbers, NaN as None."""
+    if not isinstance(values, dict):
+        return values
+    array = np.frombuffer(base64.b64decode(values["bdata"]), dtype="<" + values["dtype"])
+    return [None if np.isnan(v) else v for v in array.astype(np.float64).tolist()]
+
+
+def go_json(fig) -> dict:
+    """Get the JSON graph_objects produces for a figure, parsed."""
+    return json.loads(json.dumps(fig, cls=PlotlyJSONEncoder))
+
+
+@pytest.fixture
+def manager(tmp_path):
+    """Create a data manager over a month of every Daily* table, with gaps and missing values."""
+    db_path = str(tmp_path / "health.db")
+    rng = np.random.default_rng(7)
+    conn = sqlite3.connect(db_path)
+    for table, column in DAILY_COLUMNS.items():
+        conn.execute(f"CREATE TABLE {table} (date TEXT, {column} REAL)")
+        values = rng.uniform(300, 600, size=30).round(2).tolist()
+        values[3] = None
+        conn.executemany(f"INSERT INTO {table} VALUES (?, ?)",
+                         [(f"2023-01-{i + 1:02d}", v) for i, v in enumerate(values) if i != 10])
+    conn.commit()
+    conn.close()
+    return DataManager(db_path)
+
+
+class TestPlotSpecs:
+    """Test building figures from plot specs."""
+    
+    def test_plot_values(self):
+        """Test that dates become ISO strings and missing values become None."""
+        dates = np.array(["2023-01-01", "NaT"], dtype="datetime64[ns]")
+        assert plot_values(dates) == ["2023-01-01T00:00:00", None]
+        assert plot_values(np.array([1.5, np.nan], dtype=np.float32)) == [1.5, None]
+        assert plot_values(np.array([3, 4], dtype=np.int32)) == [3, 4]
+    
+    @pytest.mark.parametrize("plot_type", list(PLOT_SPECS))
+    @pytest.mark.parametrize("resolution", ["day", "week"])
+    def test_matches_graph_objects(self, manager, plot_type, resolution):
+        """Test that each spec's JSON equals graph_objects' JSON for the same traces and layout."""
+        spec = PLOT_SPECS[plot_type]
+        result = PlotGenerator(manager).generate_plot(plot_type, resolution=resolution)
+        fast = json.loads(result["plot"])
+        
+        fig = go.Figure(layout=spec["layout"])
+        fig.update_layout(template='plotly_white')
+        for trace in fast["data"]:
+            attrs = {key: value for key, value in trace.items() if key not in TRACE_OPTIONS | {"type"}}
+            fig.add_trace(go.Bar(**attrs) if trace["type"] == "bar" else go.Scatter(**attrs))
+        
+        assert fast == go_json(fig)
+        assert len(fast["data"]) >= len(spec_tables(spec))
+    
+    def test_daily_steps_matches_original_figure(self, manager):
+        """Test the steps plot and its moving average against the hand-built graph_objects figure."""
+        df = manager.query("DailyStepCount", ['date', 'total_value'], order_by='date')
+        moving_avg = df['total_value'].rolling(window=7, min_periods=1).mean()
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(x=df['date'], y=df['total_value'], mode='lines+markers', name='Daily Steps',
+                                 line=dict(color='#6366f1', width=2), marker=dict(size=6, color='#6366f1')))
+        fig.add_trace(go.Scatter(x=df['date'], y=moving_avg, mode='lines', name='7-Day Moving Average',
+                                 line=dict(color='#ef4444', width=3, dash='dash')))
+        fig.update_layout(title="Daily Step Count with Moving Average", xaxis_title="Date", yaxis_title="Steps",
+                          hovermode='x unified', template='plotly_white', height=500)
+        
+        fast = build_figure(PLOT_SPECS["daily_steps"], {"DailyStepCount": df}, "day")
+        assert json.loads(json.dumps(fast)) == go_json(fig)
+    
+    def test_sleep_matches_original_figure(self, manager):
+        """Test the sleep quality bands (missing nights count as poor) against graph_objects."""
+        df = manager.query("DailySleepSummary", ['date', 'sleep_minutes'], order_by='date')
+        hours = df['sleep_minutes'] / 60
+        quality = np.select([hours >= 8, hours >= 7, hours >= 6], ['Excellent', 'Good', 'Fair'], 'Poor')
+        colors = {'Excellent': '#10b981', 'Good': '#3b82f6', 'Fair': '#f59e0b', 'Poor': '#ef4444'}
+        fig = go.Figure()
+        for name in ['Excellent', 'Good', 'Fair', 'Poor']:
+            mask = quality == name
+            if mask.any():
+                fig.add_trace(go.Bar(x=df['date'][mask], y=hours[mask], name=name,
+                                     marker_color=colors[name], opacity=0.8))
+        fig.update_layout(title="Sleep Duration Analysis", xaxis_title="Date", yaxis_title="Sleep Hours",
+                          barmode='stack', template='plotly_white', height=500)
+        
+        spec = PLOT_SPECS["sleep_analysis"]
+        assert spec_columns(spec, "DailySleepSummary") == ["sleep_minutes"]
+        fast = build_figure(spec, {"DailySleepSummary": df}, "day")
+        assert json.loads(json.dumps(fast)) == go_json(fig)
+    
+    def test_empty_tables(self, manager):
+        """Test that missing data is an error only for specs that declare one."""
+        pg = PlotGenerator(manager)
+        assert pg.generate_plot("daily_steps", start="2030-01-01")["error"] == "No step data available"
+        
+        result = pg.generate_plot("walking_metrics", start="2030-01-01")
+        assert json.loads(result["plot"])["data"] == []
+
+
+
+class TestBinaryFormat:
+    """Test typed array payloads."""
+    
+    def test_typed_arrays(self):
+        """Test that numbers keep their dtype and dates become epoch milliseconds."""
+        floats = np.array([1.5, np.nan, 3.25], dtype=np.float32)
+        assert typed_array(floats)["dtype"] == "f4"
+        assert decode(typed_array(floats)) == [1.5, None, 3.25]
+        assert typed_array(np.array([1, 2], dtype=np.int64))["dtype"] == "f8"
+        
+        dates = np.array(["1970-01-02", "NaT"], dtype="datetime64[ns]")
+        assert decode(plot_values(dates, binary=True)) == [86400000.0, None]
+        assert plot_values(np.array(["a", "b"], dtype=object), binary=True) == ["a", "b"]
+    
+    def test_evenly_spaced_dates(self):
+        """Test that gapless dates are sent as a start and step, and others in full."""
+        spec = PLOT_SPECS["distance_walked"]
+        df = pd.DataFrame({"date": pd.date_range("2023-01-01", periods=5, freq="W-MON"),
+                           "total_value": np.arange(5.0)})
+        trace = build_figure(spec, {"DailyDistanceWalkRun": df}, binary=True)["data"][0]
+        assert (trace["x0"], trace["dx"]) == ("2023-01-02T00:00:00", 7 * 86400000)
+        assert "x" not in trace
+        
+        trace = build_figure(spec, {"DailyDistanceWalkRun": df.drop(index=2)}, binary=True)["data"][0]
+        assert "x0" not in trace and len(decode(trace["x"])) == 4
+    
+    def test_parse_plot_format(self):
+        """Test that JSON text stays the default and unknown formats are rejected."""
+        assert parse_plot_format({}) == "json"
+        assert parse_plot_format({"format": "binary"}) == "binary"
+        with pytest.raises(ValueError):
+            parse_plot_format({"format": "xml"})
+    
+    @pytest.mark.parametrize("plot_type", list(PLOT_SPECS))
+    def test_same_values_as_json(self, manager, plot_type):
+        """Test that the binary figure carries the same points as the JSON one, on a date axis."""
+        pg = PlotGenerator(manager)
+        text = json.loads(pg.generate_plot(plot_type)["plot"])
+        binary = pg.generate_plot(plot_type, plot_format="binary")["plot"]
+        
+        assert binary["layout"]["xaxis"]["type"] == "date"
+        for expected, trace in zip(text["data"], binary["data"]):
+            assert decode(trace["y"]) == pytest.approx(expected["y"])
+            if "x0" in trace:
+                start = np.datetime64(trace["x0"], "ms").astype(np.int64)
+                ms = start + trace["dx"] * np.arange(len(expected["x"]))
+            else:
+                ms = np.array(decode(trace["x"])).astype(np.int64)
+            dates = ms.astype("datetime64[ms]")
+            assert np.datetime_as_string(dates, unit="s").tolist() == expected["x"]
+    
+    def test_route_payload_is_smaller(self, manager, monkeypatch):
+        """Test that /api/plot serves the binary format on request, in fewer bytes."""
+        monkeypatch.setattr(app_module, "data_manager", manager)
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            text = client.get('/api/plot?type=calories_burned')
+            binary = client.get('/api/plot?type=calories_burned&format=binary')
+            assert client.get('/api/plot?type=calories_burned&format=xml').status_code == 400
+        
+        assert "bdata" in binary.get_json()["plot"]["data"][0]["y"]
+        assert binary.headers['ETag'] != text.headers['ETag']
+        trace_bytes = [len(json.dumps(fig["data"])) for fig in
+                       (json.loads(text.get_json()["plot"]), binary.get_json()["plot"])]
+        assert trace_bytes[1] < trace_bytes[0]
+
+
+
+class TestDownsampling:
+    """Test max_points on plots."""
+    
+    @pytest.fixture
+    def years(self):
+        """Create three years of daily values."""
+        rng = np.random.default_rng(11)
+        return pd.DataFrame({"date": pd.date_range("2020-01-01", periods=1096, freq="D"),
+                             "total_value": rng.uniform(3000, 15000, size=1096)})
+    
+    def test_lines_are_bounded_and_moving_average_uses_every_point(self, years):
+        """Test that both step traces fit the budget and the average is computed before downsampling."""
+        fig = build_figure(PLOT_SPECS["daily_steps"], {"DailyStepCount": years}, "day", max_points=100)
+        steps, average = fig["data"]
+        full_average = years.set_index(years["date"].dt.strftime("%Y-%m-%dT%H:%M:%S"))["total_value"] \
+            .rolling(window=7, min_periods=1).mean()
+        
+        assert len(steps["x"]) <= 100 and len(average["x"]) <= 100
+        assert max(steps["y"]) == years["total_value"].max()
+        assert average["y"] == pytest.approx(full_average[average["x"]].tolist())
+    
+    def test_bars_keep_every_point(self, years):
+        """Test that bar traces are not downsampled."""
+        fig = build_figure(PLOT_SPECS["flights_climbed"], {"DailyFlightsClimbed": years}, "day", max_points=100)
+        assert len(fig["data"][0]["x"]) == len(years)
+    
+    def test_custom_columns(self, years):
+        """Test that every numeric column of a custom plot is downsampled."""
+        df = years.assign(avg_value=years["total_value"] / 10)
+        spec = custom_spec("Readings", ["total_value", "avg_value"])
+        fig = build_figure(spec, {"Readings": df}, "day", max_points=50, binary=True)
+        
+        assert [len(decode(trace["y"])) <= 50 for trace in fig["data"]] == [True, True]
+    
+    def test_route_option(self, manager, monkeypatch):
+        """Test that /api/plot takes max_points and rejects tiny budgets."""
+        monkeypatch.setattr(app_module, "data_manager", manager)
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            response = client.get('/api/plot?type=daily_steps&resolution=day&max_points=12')
+            assert client.get('/api/plot?type=daily_steps&max_points=3').status_code == 400
+        
+        assert all(len(trace["x"]) <= 12 for trace in json.loads(response.get_json()["plot"])["data"])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
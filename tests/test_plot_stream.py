@@ -0,0 +1,209 @@
+"""
+Tests for the FitTrackAI live plot updates
+"""
+
+import pytest
+import json
+import sqlite3
+from datetime import date, timedelta
+from unittest.mock import patch
+
+# Import the plot streams
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from plot_stream import PlotSubscription, PlotStreams
+from plot_specs import PLOT_SPECS
+import app as app_module
+from app import app, socketio, DataManager, PlotGenerator
+
+
+def add_days(db_path, table, first, values, column="total_value"):
+    """Insert (or replace) consecutive daily values starting at ``first``."""
+    conn = sqlite3.connect(db_path)
+    for i, value in enumerate(values):
+        day = (first + timedelta(days=i)).isoformat()
+        conn.execute(f"DELETE FROM {table} WHERE date = ?", (day,))
+        conn.execute(f"INSERT INTO {table} (date, {column}) VALUES (?, ?)", (day, value))
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Create a database with 40 days of steps (one missing) and sleep."""
+    path = str(tmp_path / "health.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE DailyStepCount (date TEXT, total_value REAL)")
+    conn.execute("CREATE TABLE DailySleepSummary (date TEXT, sleep_minutes REAL)")
+    conn.commit()
+    conn.close()
+    add_days(path, "DailyStepCount", date(2024, 1, 1), [5000.0 + 137 * (i % 9) for i in range(40)])
+    conn = sqlite3.connect(path)
+    conn.execute("DELETE FROM DailyStepCount WHERE date = '2024-01-20'")
+    conn.commit()
+    conn.close()
+    add_days(path, "DailySleepSummary", date(2024, 1, 1), [400.0 + (i % 3) * 20 for i in range(40)],
+             column="sleep_minutes")
+    return path
+
+
+def subscribe(manager, plot_type, figure, resolution="day"):
+    """Start a subscription for a figure the way the web UI does."""
+    generator = PlotGenerator(manager)
+
+    def load(table, columns, start, end):
+        return generator._load_series(table, columns, start, end, resolution, "mean")
+
+    since = max(max(trace["x"]) for trace in figure["data"])
+    subscription = PlotSubscription(PLOT_SPECS[plot_type], resolution, [t["name"] for t in figure["data"]], load)
+    subscription.start_from(since)
+    return subscription
+
+
+def figure(manager, plot_type):
+    """Build a plot's figure dict."""
+    return json.loads(PlotGenerator(manager).generate_plot(plot_type, resolution="day")["plot"])
+
+
+def apply(figure, update):
+    """Apply an update to a figure like the web UI: revise last points, extendTraces, addTraces."""
+    for revision in update["revise"]:
+        figure["data"][revision["index"]]["y"][-1] = revision["y"]
+    for index, x, y in zip(update["indices"], update["update"]["x"], update["update"]["y"]):
+        figure["data"][index]["x"] += x
+        figure["data"][index]["y"] += y
+    figure["data"].extend(update["add"])
+
+
+def assert_same_points(figure, expected):
+    """Check that two figures have the same traces with the same points, in any order."""
+    traces = sorted(figure["data"], key=lambda trace: trace["name"])
+    expected = sorted(expected["data"], key=lambda trace: trace["name"])
+    assert [trace["name"] for trace in traces] == [trace["name"] for trace in expected]
+    for trace, other in zip(traces, expected):
+        assert trace["x"] == other["x"]
+        assert trace["y"] == pytest.approx(other["y"])
+
+
+class TestPlotSubscription:
+    """Test PlotSubscription class."""
+    
+    def test_new_days_extend_the_figure(self, db_path):
+        """Test that the update turns the old figure into the new one, moving average tail included."""
+        manager = DataManager(db_path)
+        client = figure(manager, "daily_steps")
+        subscription = subscribe(manager, "daily_steps", client)
+        assert subscription.update() is None
+        
+        add_days(db_path, "DailyStepCount", date(2024, 2, 10), [9000.0, 12000.0, 3000.0])
+        update = subscription.update()
+        
+        assert update["indices"] == [0, 1]
+        assert [len(x) for x in update["update"]["x"]] == [3, 3]
+        assert update["revise"] == [] and update["add"] == []
+        apply(client, update)
+        assert_same_points(client, figure(manager, "daily_steps"))
+    
+    def test_updates_load_only_the_tail(self, db_path):
+        """Test that updates query from the newest date on, not the whole history."""
+        manager = DataManager(db_path)
+        subscription = subscribe(manager, "daily_steps", figure(manager, "daily_steps"))
+        add_days(db_path, "DailyStepCount", date(2024, 2, 10), [9000.0])
+        
+        with patch.object(DataManager, 'query', autospec=True, side_effect=DataManager.query) as query:
+            subscription.update()
+        (_, table, _, start, _), _ = query.call_args
+        assert table == "DailyStepCount" and str(start)[:10] == "2024-02-09"
+        assert len(subscription._history["DailyStepCount"]) == 6
+    
+    def test_revised_last_day(self, db_path):
+        """Test that a changed value on the last plotted day is revised in place."""
+        manager = DataManager(db_path)
+        client = figure(manager, "daily_steps")
+        subscription = subscribe(manager, "daily_steps", client)
+        
+        add_days(db_path, "DailyStepCount", date(2024, 2, 10), [7777.0, 8888.0])
+        add_days(db_path, "DailyStepCount", date(2024, 2, 11), [9999.0])
+        apply(client, subscription.update())
+        add_days(db_path, "DailyStepCount", date(2024, 2, 11), [1234.0])
+        update = subscription.update()
+        
+        assert [revision["index"] for revision in update["revise"]] == [0, 1]
+        assert update["indices"] == []
+        apply(client, update)
+        assert_same_points(client, figure(manager, "daily_steps"))
+    
+    def test_bands(self, db_path):
+        """Test that new points join their band and a new band is added as a trace."""
+        manager = DataManager(db_path)
+        client = figure(manager, "sleep_analysis")
+        subscription = subscribe(manager, "sleep_analysis", client)
+        assert [trace["name"] for trace in client["data"]] == ["Good", "Fair"]
+        
+        add_days(db_path, "DailySleepSummary", date(2024, 2, 10), [370.0, 500.0], column="sleep_minutes")
+        update = subscription.update()
+        
+        assert [trace["name"] for trace in update["add"]] == ["Excellent"]
+        apply(client, update)
+        assert_same_points(client, figure(manager, "sleep_analysis"))
+    
+    def test_band_change_resets(self, db_path):
+        """Test that the last point moving to another band asks the client to refetch."""
+        manager = DataManager(db_path)
+        subscription = subscribe(manager, "sleep_analysis", figure(manager, "sleep_analysis"))
+        add_days(db_path, "DailySleepSummary", date(2024, 2, 9), [500.0], column="sleep_minutes")
+        
+        assert subscription.update() == {"reset": True}
+
+
+class TestPlotStreams:
+    """Test PlotStreams class."""
+    
+    def test_polls_on_version_change(self, db_path):
+        """Test that updates are sent once per database change and stop after unsubscribing."""
+        sent = []
+        streams = PlotStreams(lambda event, data, sid: sent.append((event, data, sid)))
+        manager = DataManager(db_path)
+        subscription = subscribe(manager, "daily_steps", figure(manager, "daily_steps"))
+        assert streams.subscribe("sid1", "plot-1", manager, subscription) is None
+        assert streams.poll() == 0
+        
+        add_days(db_path, "DailyStepCount", date(2024, 2, 10), [9000.0])
+        assert streams.poll() == 1
+        assert streams.poll() == 0
+        assert sent[0][0] == "plot_update" and sent[0][1]["id"] == "plot-1" and sent[0][2] == "sid1"
+        
+        assert streams.unsubscribe("sid1") == 1
+        assert streams.stats()["subscriptions"] == 0
+
+
+class TestSubscribeEvent:
+    """Test the subscribe_plot event."""
+    
+    def test_subscribe_and_catch_up(self, db_path, monkeypatch):
+        """Test a catch-up update for days added after the client's figure, and invalid requests."""
+        manager = DataManager(db_path)
+        monkeypatch.setattr(app_module, "data_manager", manager)
+        monkeypatch.setattr(app_module, "plot_streams", PlotStreams(lambda *args: None))
+        monkeypatch.setattr(app_module.plot_streams, "start", lambda *args: True)
+        client = figure(manager, "daily_steps")
+        add_days(db_path, "DailyStepCount", date(2024, 2, 10), [9000.0])
+        
+        socket = socketio.test_client(app)
+        socket.get_received()
+        socket.emit('subscribe_plot', {"id": "p1", "type": "daily_steps", "resolution": "day",
+                                       "since": "2024-02-09", "traces": [t["name"] for t in client["data"]]})
+        socket.emit('subscribe_plot', {"id": "p2", "type": "custom", "since": "2024-02-09", "traces": []})
+        events = [event["args"][0] for event in socket.get_received()]
+        
+        assert events[0]["id"] == "p1" and events[0]["update"]["x"] == [["2024-02-10T00:00:00"]] * 2
+        assert "error" in events[1]
+        assert app_module.plot_streams.stats()["subscriptions"] == 1
+        socket.disconnect()
+        assert app_module.plot_streams.stats()["subscriptions"] == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
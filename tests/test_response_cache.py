@@ -0,0 +1,197 @@
+"""
+Tests for the FitTrackAI LLM response cache
+"""
+
+import pytest
+import os
+import sqlite3
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Import the response cache
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_cache import ResponseCache, normalize_message, response_key
+from ollama_service import OllamaService
+from app import DataManager, AdvancedAI
+
+
+class Clock:
+    """Clock that only moves when told to."""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+class CountingLLM:
+    """LLM client that answers every call with a numbered reply."""
+    
+    def __init__(self):
+        self.calls = 0
+    
+    def invoke(self, messages):
+        self.calls += 1
+        return SimpleNamespace(content=f"Reply {self.calls}")
+    
+    def stream(self, messages):
+        self.calls += 1
+        for word in f"Reply {self.calls}".split(" "):
+            yield SimpleNamespace(content=word + " ")
+
+
+@pytest.fixture
+def clock():
+    """Create a fake clock."""
+    return Clock()
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    """Create a response cache holding 100 bytes for an hour."""
+    return ResponseCache(str(tmp_path / "cache" / "responses.db"), max_bytes=100, ttl=3600, clock=clock)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Create a steps database."""
+    path = str(tmp_path / "health.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE DailyStepCount (date TEXT, total_value REAL)")
+    conn.executemany("INSERT INTO DailyStepCount VALUES (?, ?)",
+                     [(f"2024-01-{day:02d}", 1000.0 * day) for day in range(1, 11)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def ai(db_path, cache):
+    """Create an AI system over the steps database, a counting LLM and the cache."""
+    llm = CountingLLM()
+    with patch.object(AdvancedAI, '_build_messages', lambda self, message, context="": [message]):
+        system = AdvancedAI(DataManager(db_path), OllamaService(client_factory=lambda: llm), cache)
+        system.llm = llm
+        yield system
+
+
+class TestResponseKey:
+    """Test cache keys."""
+    
+    def test_normalized_message(self):
+        """Test that case, spacing and end punctuation do not change the key, but the context and model do."""
+        assert normalize_message("  How did I   sleep this week? ") == "how did i sleep this week"
+        assert normalize_message("Hi, did I sleep 7.5 hours?!") == "hi did i sleep 7.5 hours"
+        key = response_key("Show my steps", "context", "llama2")
+        assert response_key("show my  steps!", "context", "llama2") == key
+        assert response_key("Show my steps", "other context", "llama2") != key
+        assert response_key("Show my steps", "context", "mistral") != key
+
+
+class TestResponseCache:
+    """Test ResponseCache class."""
+    
+    def test_hit_and_miss(self, cache):
+        """Test that a stored response is found for its data version only, and is counted."""
+        assert not os.path.exists(cache.path)
+        assert cache.get("db", 1, "k") is None
+        cache.put("db", 1, "k", "Hello!")
+        
+        assert cache.get("db", 1, "k") == "Hello!"
+        assert cache.get("other", 1, "k") is None
+        stats = cache.stats()
+        assert stats["entries"] == 1 and stats["hits"] == 1 and stats["misses"] == 2 and stats["hit_rate"] == 0.333
+    
+    def test_new_data_version_drops_entries(self, cache):
+        """Test that a new data version of a scope deletes its older entries but not other scopes'."""
+        cache.put("db", 1, "a", "A")
+        cache.put("other", 1, "b", "B")
+        
+        assert cache.get("db", 2, "a") is None
+        assert cache.stats()["invalidated"] == 1 and cache.stats()["entries"] == 1
+        assert cache.get("other", 1, "b") == "B"
+    
+    def test_ttl(self, cache, clock):
+        """Test that entries expire after the TTL."""
+        cache.put("db", 1, "k", "Hello!")
+        clock.now += 3601
+        
+        assert cache.get("db", 1, "k") is None
+        cache.put("db", 1, "new", "Hi")
+        assert cache.stats()["entries"] == 1
+    
+    def test_evicts_least_recently_used(self, cache, clock):
+        """Test that entries over the size budget are evicted, least recently used first."""
+        for key in "abc":
+            clock.now += 1
+            cache.put("db", 1, key, key * 40)
+        assert cache.get("db", 1, "a") is None
+        clock.now += 1
+        assert cache.get("db", 1, "b") == "b" * 40
+        
+        clock.now += 1
+        cache.put("db", 1, "d", "d" * 40)
+        assert cache.get("db", 1, "c") is None and cache.get("db", 1, "b") is not None
+        assert cache.stats()["bytes"] <= 100 and cache.stats()["evictions"] == 2
+    
+    def test_persists(self, cache, clock):
+        """Test that responses survive a restart."""
+        cache.put("db", 1, "k", "Hello!")
+        reopened = ResponseCache(cache.path, clock=clock)
+        assert reopened.get("db", 1, "k") == "Hello!"
+
+
+class TestCachedChat:
+    """Test AdvancedAI with a response cache."""
+    
+    def test_repeated_question_is_not_generated_again(self, ai):
+        """Test that the same question about the same data is answered from the cache."""
+        assert ai.chat("How did I sleep?")["response"] == "Reply 1"
+        assert ai.chat("how did i sleep")["response"] == "Reply 1"
+        assert ai.llm.calls == 1
+    
+    def test_data_change_invalidates(self, ai, db_path):
+        """Test that new health data gets a new answer."""
+        ai.chat("How did I sleep?")
+        conn = sqlite3.connect(db_path)
+        conn.execute("INSERT INTO DailyStepCount VALUES ('2024-01-11', 5000.0)")
+        conn.commit()
+        conn.close()
+        
+        assert ai.chat("How did I sleep?")["response"] == "Reply 2"
+    
+    def test_shared_between_processes(self, ai, db_path, cache, clock):
+        """Test that separate data managers and caches over the same files reuse each other's answers."""
+        ai.chat("How did I sleep?")
+        conn = sqlite3.connect(db_path)
+        conn.execute("INSERT INTO DailyStepCount VALUES ('2024-01-11', 5000.0)")
+        conn.commit()
+        conn.close()
+        assert ai.chat("How did I sleep?")["response"] == "Reply 2"
+        
+        llm = CountingLLM()
+        responses = ResponseCache(cache.path, max_bytes=100, ttl=3600, clock=clock)
+        with patch.object(AdvancedAI, '_build_messages', lambda self, message, context="": [message]):
+            other = AdvancedAI(DataManager(db_path), OllamaService(client_factory=lambda: llm), responses)
+            other.llm = llm
+            assert other.chat("How did I sleep?")["response"] == "Reply 2"
+        assert ai.chat("How did I sleep?")["response"] == "Reply 2"
+        assert llm.calls == 0 and ai.llm.calls == 2
+    
+    def test_streamed(self, ai):
+        """Test that a streamed answer is cached once read to the end, and replayed in one piece."""
+        chunks = ai.stream_chat("Hello")
+        next(chunks)
+        chunks.close()
+        assert list(ai.stream_chat("Hello"))[-1]["response"] == "Reply 2 "
+        
+        items = list(ai.stream_chat("Hello"))
+        assert items == [{"delta": "Reply 2 "}, {"response": "Reply 2 ", "provider": "OLLAMA"}]
+        assert ai.llm.calls == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
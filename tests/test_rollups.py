@@ -0,0 +1,147 @@
+"""
+Tests for the FitTrackAI daily rollups
+"""
+
+import pytest
+import sqlite3
+
+# Import the rollups
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest import ensure_schema, INSERT_SQL
+from rollups import refresh_rollups, ROLLUPS
+
+STEPS = "HKQuantityTypeIdentifierStepCount"
+SLEEP = "HKCategoryTypeIdentifierSleepAnalysis"
+
+
+def steps(start, value, source="iPhone"):
+    """Build a step count Record row."""
+    return (STEPS, source, "count", value, None, start, start, start, "+0000")
+
+
+def sleep(start, end, stage="HKCategoryValueSleepAnalysisAsleepCore"):
+    """Build a sleep analysis Record row."""
+    return (SLEEP, "Watch", None, None, stage, start, end, end, "+0000")
+
+
+def insert(db_path, rows):
+    """Insert raw records the way the ingester does."""
+    conn = sqlite3.connect(db_path)
+    ensure_schema(conn)
+    conn.executemany(INSERT_SQL, rows)
+    conn.commit()
+    conn.close()
+
+
+def read_table(db_path, table):
+    """Get the rows of a table ordered by date."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(f'SELECT * FROM "{table}" ORDER BY date').fetchall()
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Create a database with a few days of raw steps and sleep."""
+    path = str(tmp_path / "health.db")
+    insert(path, [
+        steps("2023-01-01 08:00:00", 100.0),
+        steps("2023-01-01 12:00:00", 300.0),
+        steps("2023-01-02 09:00:00", 50.0),
+        sleep("2023-01-01 23:00:00", "2023-01-02 06:30:00"),
+        sleep("2023-01-02 06:30:00", "2023-01-02 06:45:00", "HKCategoryValueSleepAnalysisAwake"),
+        sleep("2023-01-02 06:45:00", "2023-01-02 07:15:00"),
+    ])
+    return path
+
+
+class TestRollups:
+    """Test building and refreshing rollup tables."""
+    
+    def test_full_build(self, db_path):
+        """Test totals, averages and counts per day, and sleep dated by its end."""
+        result = refresh_rollups(db_path)
+        assert result["tables"]["DailyStepCount"] == "rebuilt"
+        assert result["tables"]["DailyActiveCalories"] == "no records"
+        
+        assert read_table(db_path, "DailyStepCount") == [
+            ("2023-01-01", 400.0, 200.0, 100.0, 300.0, 2),
+            ("2023-01-02", 50.0, 50.0, 50.0, 50.0, 1),
+        ]
+        (day, minutes, sessions), = read_table(db_path, "DailySleepSummary")
+        assert (day, sessions) == ("2023-01-02", 2)
+        assert minutes == pytest.approx(480)
+    
+    def test_incremental_refresh_matches_rebuild(self, db_path, tmp_path):
+        """Test that only dirty days are recomputed, with the same result as a full build."""
+        refresh_rollups(db_path)
+        insert(db_path, [
+            steps("2023-01-02 18:00:00", 25.0),
+            steps("2023-01-03 09:00:00", 70.0),
+            steps("2023-01-02 09:00:00", 50.0),  # duplicate: ignored, not dirty
+            sleep("2023-01-02 22:30:00", "2023-01-03 06:00:00"),
+        ])
+        
+        result = refresh_rollups(db_path)
+        assert result["tables"]["DailyStepCount"] == "incremental"
+        assert result["dirty_days"] == 4
+        incremental = {t: read_table(db_path, t) for t in ("DailyStepCount", "DailySleepSummary")}
+        
+        refresh_rollups(db_path, full=True)
+        assert incremental == {t: read_table(db_path, t) for t in incremental}
+        assert incremental["DailyStepCount"][1] == ("2023-01-02", 75.0, 37.5, 25.0, 50.0, 2)
+        
+        assert refresh_rollups(db_path)["tables"]["DailyStepCount"] == "unchanged"
+    
+    def test_overlapping_sources_are_not_double_counted(self, db_path):
+        """Test that each day keeps only the source with the highest total, in full builds and refreshes."""
+        insert(db_path, [
+            steps("2023-01-01 08:00:00", 90.0, source="Watch"),
+            steps("2023-01-01 12:00:00", 280.0, source="Watch"),
+        ])
+        refresh_rollups(db_path)
+        assert read_table(db_path, "DailyStepCount")[0] == ("2023-01-01", 400.0, 200.0, 100.0, 300.0, 2)
+        
+        insert(db_path, [steps("2023-01-01 18:00:00", 500.0, source="Watch")])
+        assert refresh_rollups(db_path)["tables"]["DailyStepCount"] == "incremental"
+        assert read_table(db_path, "DailyStepCount")[0] == ("2023-01-01", 870.0, 290.0, 90.0, 500.0, 3)
+    
+    def test_new_spec_is_built(self, db_path):
+        """Test that a rollup added to the specs is built on the next refresh."""
+        refresh_rollups(db_path)
+        specs = dict(ROLLUPS, DailyStepPeak={
+            "type": STEPS,
+            "columns": {"peak": ("REAL", "MAX(value)")},
+            "where": "source_name = 'iPhone'",
+        })
+        
+        result = refresh_rollups(db_path, specs)
+        assert result["tables"]["DailyStepPeak"] == "rebuilt"
+        assert result["tables"]["DailyStepCount"] == "unchanged"
+        assert read_table(db_path, "DailyStepPeak") == [("2023-01-01", 300.0), ("2023-01-02", 50.0)]
+    
+    def test_foreign_tables_without_records_are_kept(self, db_path):
+        """Test that a Daily* table from elsewhere survives when there is nothing to replace it with."""
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE DailyFlightsClimbed (date TEXT, total_value REAL)")
+        conn.execute("INSERT INTO DailyFlightsClimbed VALUES ('2023-01-01', 12)")
+        conn.commit()
+        conn.close()
+        
+        refresh_rollups(db_path)
+        assert read_table(db_path, "DailyFlightsClimbed") == [("2023-01-01", 12.0)]
+    
+    def test_database_without_records(self, tmp_path):
+        """Test that a database without raw records is left untouched."""
+        path = str(tmp_path / "empty.db")
+        sqlite3.connect(path).close()
+        assert refresh_rollups(path)["tables"] == {}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,94 @@
+"""
+Tests for the FitTrackAI table statistics
+"""
+
+import pytest
+import sqlite3
+import numpy as np
+import pandas as pd
+
+# Import the table statistics
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_pool import ConnectionPool
+from table_stats import table_stats, build_stats_query
+
+
+@pytest.fixture
+def pool(tmp_path):
+    """Create a database with heart rate samples and a pool over it."""
+    path = str(tmp_path / "health.db")
+    rng = np.random.default_rng(7)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE HeartRate (date TEXT, value REAL, beats INTEGER, source TEXT, mixed)")
+    conn.executemany("INSERT INTO HeartRate VALUES (?, ?, ?, ?, ?)", [
+        (f"2024-01-{1 + i // 100:02d} 08:00:00", float(v), int(b), "Watch", 1 if i % 2 else "n/a")
+        for i, (v, b) in enumerate(zip(rng.normal(70, 10, 999).round(1), rng.integers(40, 180, 999)))
+    ])
+    conn.execute("INSERT INTO HeartRate (date) VALUES (NULL)")
+    conn.commit()
+    conn.close()
+    return ConnectionPool(path)
+
+
+def frame(pool):
+    """Load the whole table to compare against."""
+    with pool.connection() as conn:
+        return pd.read_sql_query("SELECT * FROM HeartRate", conn)
+
+
+class TestTableStats:
+    """Test table_stats function."""
+    
+    def test_matches_pandas(self, pool):
+        """Test the statistics against pandas on the loaded table."""
+        df = frame(pool)
+        stats = table_stats(pool, "HeartRate")
+        
+        assert stats["total_records"] == 1000
+        assert stats["missing_values"] == df.isnull().sum().to_dict()
+        assert stats["data_types"] == df.dtypes.to_dict()
+        assert stats["date_range"] == {"start": "2024-01-01", "end": "2024-01-10", "total_days": 9}
+        assert list(stats["numeric_analysis"]) == ["value", "beats"]
+        for col, col_stats in stats["numeric_analysis"].items():
+            values = df[col].dropna()
+            assert col_stats["count"] == len(values)
+            assert col_stats["mean"] == pytest.approx(values.mean())
+            assert col_stats["median"] == pytest.approx(values.median())
+            assert col_stats["std"] == pytest.approx(values.std())
+            assert (col_stats["min"], col_stats["max"]) == (values.min(), values.max())
+    
+    def test_one_query_per_table(self, pool):
+        """Test that every column is aggregated by a single statement, medians aside."""
+        statements = []
+        with pool.connection() as conn:
+            conn.set_trace_callback(statements.append)
+        table_stats(pool, "HeartRate", medians=False)
+        with pool.connection() as conn:
+            conn.set_trace_callback(None)
+        
+        assert sum(statement.startswith("SELECT") for statement in statements) == 1
+        assert statements[-1] == build_stats_query("HeartRate", ["date", "value", "beats", "source", "mixed"],
+                                                 ["date", "source"], True)
+    
+    def test_columns_and_edge_cases(self, pool, tmp_path):
+        """Test restricted columns, integer overflow and a missing table."""
+        stats = table_stats(pool, "HeartRate", ["beats", "nope"], medians=False)
+        assert stats["columns"] == ["beats"]
+        assert stats["numeric_analysis"]["beats"]["median"] is None
+        assert table_stats(pool, "Missing") is None
+        
+        conn = sqlite3.connect(str(tmp_path / "health.db"))
+        conn.execute("CREATE TABLE Big (n INTEGER)")
+        conn.executemany("INSERT INTO Big VALUES (?)", [(2 ** 62,), (2 ** 62,)])
+        conn.commit()
+        conn.close()
+        big = table_stats(pool, "Big")["numeric_analysis"]["n"]
+        assert big["mean"] == pytest.approx(2.0 ** 62) and big["std"] == 0.0
+        assert "date_range" not in table_stats(pool, "Big")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,132 @@
+"""
+Tests for the FitTrackAI user router
+"""
+
+import pytest
+import sqlite3
+
+# Import the router
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from user_router import UserRouter
+from frame_cache import FrameCache
+import app as app_module
+from app import app, DataManager
+
+
+def make_user_db(db_dir, user_id, steps):
+    """Create a user's database with one step count per day."""
+    path = os.path.join(db_dir, f"{user_id}.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE DailyStepCount (date TEXT, total_value REAL)")
+    conn.executemany("INSERT INTO DailyStepCount VALUES (?, ?)",
+                     [(f"2023-01-0{i + 1}", value) for i, value in enumerate(steps)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def users_dir(tmp_path):
+    """Create databases for three users."""
+    make_user_db(str(tmp_path), "alice", [1000, 2000])
+    make_user_db(str(tmp_path), "bob", [2000, 4000])
+    make_user_db(str(tmp_path), "carol", [3000, 6000, 9000])
+    return str(tmp_path)
+
+
+@pytest.fixture
+def router(users_dir):
+    """Create a router over the user databases with room for two open users."""
+    cache = FrameCache()
+    return UserRouter(users_dir, lambda path: DataManager(path, pool_size=2, frame_cache=cache), max_open=2)
+
+
+class TestUserRouter:
+    """Test UserRouter class."""
+    
+    def test_routes_to_each_users_database(self, router):
+        """Test that the same query on a shared cache returns each user's own data."""
+        alice = router.get("alice").query("DailyStepCount")
+        bob = router.get("bob").query("DailyStepCount")
+        
+        assert alice["total_value"].tolist() == [1000, 2000]
+        assert bob["total_value"].tolist() == [2000, 4000]
+        assert router.get("alice") is router.get("alice")
+    
+    def test_lru_eviction_closes_managers(self, router):
+        """Test that evicted users release their connections and cache partition."""
+        alice = router.get("alice")
+        alice.query("DailyStepCount")
+        router.get("bob").query("DailyStepCount")
+        router.get("carol").query("DailyStepCount")
+        
+        assert router.stats()["open"] == 2
+        assert router.stats()["evictions"] == 1
+        assert alice.pool.stats()["size"] == 0
+        assert all(key[0] != alice.cache_partition for key in alice.frame_cache._entries)
+        
+        # Coming back reopens the user
+        assert router.get("alice").query("DailyStepCount")["total_value"].tolist() == [1000, 2000]
+        assert router.get("alice") is not alice
+    
+    def test_invalid_and_unknown_users(self, router):
+        """Test that IDs cannot escape the database directory and unknown users are not created."""
+        for user_id in ["../alice", "a/b", "", "x" * 65]:
+            with pytest.raises(ValueError):
+                router.get(user_id)
+        with pytest.raises(FileNotFoundError):
+            router.get("dave")
+        assert not os.path.exists(router.db_path("dave"))
+
+
+class TestUserRoutes:
+    """Test user selection in the Flask routes."""
+    
+    @pytest.fixture
+    def client(self, users_dir, monkeypatch):
+        """Create a test client whose router serves the test user databases."""
+        cache = FrameCache()
+        monkeypatch.setattr(app_module, "user_router",
+                            UserRouter(users_dir, lambda path: DataManager(path, frame_cache=cache)))
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            yield client
+    
+    def test_data_summary_per_user(self, client):
+        """Test that the X-User-Id header selects the database."""
+        response = client.get('/api/data_summary', headers={'X-User-Id': 'carol'})
+        assert response.status_code == 200
+        tables = response.get_json()["tables"]
+        assert tables[0]["date_range"] == "2023-01-01 to 2023-01-03"
+    
+    def test_plot_for_user(self, client):
+        """Test that a user_id field routes plot requests."""
+        response = client.post('/api/plot', json={"type": "custom", "table_name": "DailyStepCount",
+                                                  "user_id": "bob"})
+        assert response.status_code == 200
+        assert '"y":[2000.0,4000.0]' in response.get_json()["plot"].replace(" ", "")
+    
+    def test_unknown_and_invalid_users(self, client):
+        """Test that unknown users are not found and malformed IDs are bad requests."""
+        assert client.get('/api/data_summary', headers={'X-User-Id': 'dave'}).status_code == 404
+        assert client.get('/api/data_summary?user_id=../etc').status_code == 400
+
+    
+    def test_user_mirrors_are_opt_in(self, users_dir, monkeypatch):
+        """Test that user databases get a columnar mirror only when enabled."""
+        path = os.path.join(users_dir, "alice.db")
+        manager = app_module.open_user_data(path)
+        assert manager.mirror is None
+        manager.close()
+        
+        monkeypatch.setattr(app_module, "USER_DB_MIRRORS", True)
+        manager = app_module.open_user_data(path)
+        assert manager.mirror is not None
+        manager.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,96 @@
+"""
+FitTrackAI User Router
+
+Maps user IDs to their own health databases and keeps a bounded LRU of the
+data managers (connection pools, catalogs, mirrors) opened for them.
+"""
+
+import os
+import re
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Callable
+
+logger = logging.getLogger(__name__)
+
+USER_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class UserRouter:
+    """LRU of per-user data managers, one database file per user.
+
+    ``factory`` opens a manager for a database path; managers must have a
+    ``close()`` method, which is called when they are evicted. At most
+    ``max_open`` managers are open at once, so file descriptors and
+    per-user memory stay bounded however many users there are.
+    """
+
+    def __init__(self, db_dir: str, factory: Callable[[str], Any], max_open: int = 32):
+        self.db_dir = db_dir
+        self.factory = factory
+        self.max_open = max_open
+        self._lock = threading.Lock()
+        self._open: "OrderedDict[str, Any]" = OrderedDict()
+        self.opened = 0
+        self.evictions = 0
+
+    def db_path(self, user_id: str) -> str:
+        """Get the database file of a user, rejecting IDs that are not plain names."""
+        if not isinstance(user_id, str) or not USER_ID_PATTERN.match(user_id):
+            raise ValueError("user_id must be 1-64 letters, digits, '-' or '_'")
+        return os.path.join(self.db_dir, f"{user_id}.db")
+
+    def get(self, user_id: str) -> Any:
+        """Get the data manager of a user, opening it (and evicting the least recent) if needed."""
+        path = self.db_path(user_id)
+        with self._lock:
+            manager = self._open.get(user_id)
+            if manager is not None:
+                self._open.move_to_end(user_id)
+                return manager
+
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No health database for user {user_id}")
+        manager = self.factory(path)
+
+        evicted = []
+        with self._lock:
+            current = self._open.get(user_id)
+            if current is not None:
+                # Another request opened it meanwhile; keep theirs
+                evicted.append(manager)
+                manager = current
+            else:
+                self._open[user_id] = manager
+                self.opened += 1
+            self._open.move_to_end(user_id)
+            while len(self._open) > self.max_open:
+                _, old = self._open.popitem(last=False)
+                evicted.append(old)
+                self.evictions += 1
+
+        for old in evicted:
+            try:
+                old.close()
+            except Exception as e:
+                logger.warning(f"Error closing evicted user data: {e}")
+        return manager
+
+    def close(self):
+        """Close every open manager."""
+        with self._lock:
+            managers = list(self._open.values())
+            self._open.clear()
+        for manager in managers:
+            manager.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get how many users are open and how often managers were opened and evicted."""
+        with self._lock:
+            return {
+                "open": len(self._open),
+                "max_open": self.max_open,
+                "opened": self.opened,
+                "evictions": self.evictions,
+            }